@@ -0,0 +1,251 @@
+'''
+Adaptive refinement of tensor product grids in time and energy for spectra spanning many decades.
+
+Intervals are bisected at their logarithmic midpoints wherever a grid line, or the trapezoid time
+integral across it, deviates from log-log interpolation of its neighbours by more than a tolerance.
+Starting from a coarse grid, smooth regions stay coarse and only the structure near the spindown time,
+the cooling break and the kinematic edges is resolved. Lines that turn out to be interpolated well by
+their neighbours are dropped again afterwards.
+
+	Functions
+	---------
+		refine_grid
+			Returns non-uniform time and energy axes with the spectra evaluated on their tensor product
+
+		interpolate
+			Returns spectra on a non-uniform grid interpolated to arbitrary time and energy values
+
+'''
+import numpy as np
+from warnings import warn
+
+
+def _deviation(S, x, s, I):
+	'''
+	Returns the largest relative deviation of every interior point from its neighbours along the last axis.
+
+	Parameters
+	----------
+	S : ndarray
+		The values on the grid
+	x : ndarray
+		The strictly increasing positive axis
+	s : ndarray
+		The floor of value scales, broadcast against the values
+	I : ndarray or None
+		The scale of trapezoid integrals along the last axis, ignored if `None`
+
+	Returns
+	-------
+	ndarray
+		The largest relative deviation of every interior point from log-log interpolation of its neighbours
+		and, if `I` is given, of the two interval trapezoid integral from the single interval one
+	'''
+	S0 = S[..., :-2]
+	Sm = S[..., 1:-1]
+	S1 = S[..., 2:]
+	x0 = x[:-2]
+	xm = x[1:-1]
+	x1 = x[2:]
+	w = np.log(xm / x0) / np.log(x1 / x0)
+	pos = (S0 > 0) & (S1 > 0)
+	lin = (1 - w) * S0 + w * S1
+	log = np.exp((1 - w) * np.log(np.where(pos, S0, 1.0)) + w * np.log(np.where(pos, S1, 1.0)))
+	dev = np.abs(Sm - np.where(pos, log, lin)) / np.maximum(np.abs(Sm), s)
+	if I is not None:
+		whole = 0.5 * (S0 + S1) * (x1 - x0)
+		half = 0.5 * (S0 + Sm) * (xm - x0) + 0.5 * (Sm + S1) * (x1 - xm)
+		dev = np.maximum(dev, np.abs(half - whole) / I)
+	return dev.reshape(-1, dev.shape[-1]).max(axis=0)
+
+
+def _bisect(x, dev, tol, K):
+	'''
+	Returns the indices and logarithmic midpoints of the intervals next to points deviating too much.
+
+	Intervals are ranked by the larger deviation of their two end points, so that a limited number of
+	axis values goes to the worst resolved intervals first.
+
+	Parameters
+	----------
+	x : ndarray
+		The strictly increasing positive axis
+	dev : ndarray
+		The deviation of every interior point
+	tol : float
+		The requested relative deviation
+	K : int
+		The largest number of axis values
+
+	Returns
+	-------
+	ndarray
+		The insertion indices into `x`
+	ndarray
+		The inserted values
+	'''
+	d = np.zeros(len(x) - 1)
+	d[:-1] = dev
+	d[1:] = np.maximum(d[1:], dev)
+	j = np.flatnonzero(d > tol)
+	j = np.sort(j[np.argsort(-d[j], kind='stable')][:max(K - len(x), 0)])
+	return j + 1, np.sqrt(x[j] * x[j + 1])
+
+
+def _coarsen(x, dev, tol, R):
+	'''
+	Returns the indices of interior points that are interpolated well enough by their neighbours to be dropped.
+
+	Points are taken in order of increasing deviation and never next to one another, so that every
+	dropped point keeps both neighbours its deviation was measured against.
+
+	Parameters
+	----------
+	x : ndarray
+		The strictly increasing positive axis
+	dev : ndarray
+		The deviation of every interior point
+	tol : float
+		The largest relative deviation of dropped points
+	R : array_like
+		The axis values that are never dropped
+
+	Returns
+	-------
+	ndarray
+		The deletion indices into `x`
+	'''
+	free = np.ones(len(x), dtype=bool)
+	free[[0, -1]] = False
+	free[np.isin(x, R)] = False
+	j = []
+	for i in np.argsort(dev, kind='stable') + 1:
+		if dev[i - 1] >= tol:
+			break
+		if free[i]:
+			j.append(i)
+			free[i - 1:i + 2] = False
+	return np.sort(np.array(j, dtype=int))
+
+
+def refine_grid(func, t, E, tol = 1e-2, a = 1e-4, K = (2000, 1000), L = 12, C = 0.25, R = ((), ()), full = False):
+	'''
+	Returns non-uniform time and energy axes with the spectra evaluated on their tensor product.
+
+	Every interior grid line is compared to log-log interpolation of its two neighbouring lines, and
+	both intervals next to it are bisected if it deviates by more than `tol` relative to its own values,
+	bounded below by `a` times the largest value of each leading index. Along time, the intervals are also
+	bisected if dropping the line changes the trapezoid time integral by more than `tol` relative to the
+	whole integral. The estimate uses evaluated lines only, so every evaluation ends up on the grid.
+	If the number of values is bounded, the intervals next to the largest deviations are bisected first.
+	After refinement, interior lines deviating by less than `C` times `tol` are dropped, never two
+	neighbouring ones at once, so that initial axes denser than needed end up coarse as well.
+
+	Parameters
+	----------
+	func : callable
+		The spectra `func(t, E)` for time and energy arrays of shape (1, n) and (m, 1), returning shape (..., m, n)
+	t : array_like
+		The initial strictly increasing positive time axis
+	E : array_like
+		The initial strictly increasing positive energy axis
+	tol : float, optional
+		The requested relative deviation
+	a : float, optional
+		The relative floor of values below which deviations are measured absolutely
+	K : tuple of int, optional
+		The largest number of time and energy values
+	L : int, optional
+		The largest number of bisection passes
+	C : float, optional
+		The fraction of `tol` below which interior lines are dropped after refinement, none if zero
+	R : tuple of array_like, optional
+		The time and energy values that are never dropped
+	full : bool, optional
+		The option to also return the number of evaluated grid points
+
+	Returns
+	-------
+	ndarray
+		The refined time axis
+	ndarray
+		The refined energy axis
+	ndarray
+		The spectra on the refined grid
+	int
+		The number of evaluated grid points, only if `full` is set
+	'''
+	t = np.asarray(t, dtype=float)
+	E = np.asarray(E, dtype=float)
+	S = func(t[None, :], E[:, None])
+	n = len(t) * len(E)
+	for _ in range(L):
+		s = a * np.abs(S).reshape(*S.shape[:-2], -1).max(axis=-1)[..., None, None]
+		I = np.maximum(np.abs(np.trapezoid(S, t, axis=-1))[..., None], s * (t[-1] - t[0]))
+		kt, tm = _bisect(t, _deviation(S, t, s, I), tol, K[0])
+		kE, Em = _bisect(E, _deviation(np.swapaxes(S, -1, -2), E, s, None), tol, K[1])
+		if len(kt) == 0 and len(kE) == 0:
+			break
+		if len(kt):
+			S = np.insert(S, kt, func(tm[None, :], E[:, None]), axis=-1)
+			t = np.insert(t, kt, tm)
+			n += len(tm) * len(E)
+		if len(kE):
+			S = np.insert(S, kE, func(t[None, :], Em[:, None]), axis=-2)
+			E = np.insert(E, kE, Em)
+			n += len(t) * len(Em)
+	else:
+		warn(f'grid refinement stopped after {L} passes short of the requested deviation', stacklevel=2)
+	if C > 0:
+		s = a * np.abs(S).reshape(*S.shape[:-2], -1).max(axis=-1)[..., None, None]
+		I = np.maximum(np.abs(np.trapezoid(S, t, axis=-1))[..., None], s * (t[-1] - t[0]))
+		jt = _coarsen(t, _deviation(S, t, s, I), C * tol, R[0])
+		S = np.delete(S, jt, axis=-1)
+		t = np.delete(t, jt)
+		jE = _coarsen(E, _deviation(np.swapaxes(S, -1, -2), E, s, None), C * tol, R[1])
+		S = np.delete(S, jE, axis=-2)
+		E = np.delete(E, jE)
+	if full:
+		return t, E, S, n
+	return t, E, S
+
+
+def interpolate(S, t, E, ti, Ei):
+	'''
+	Returns spectra on a non-uniform grid interpolated to arbitrary time and energy values.
+
+	The interpolation is linear in the logarithms of time, energy and values, and linear in values
+	wherever one of the neighbouring values vanishes. Points outside of the grid take the nearest edge.
+
+	Parameters
+	----------
+	S : array_like
+		The spectra on the grid of shape (..., len(E), len(t))
+	t : array_like
+		The strictly increasing positive time axis
+	E : array_like
+		The strictly increasing positive energy axis
+	ti : array_like
+		The requested times
+	Ei : array_like
+		The requested energies
+
+	Returns
+	-------
+	ndarray
+		The interpolated spectra of shape (..., len(Ei), len(ti))
+	'''
+	S = np.asarray(S, dtype=float)
+	for ax, x, xi in ((-1, t, ti), (-2, E, Ei)):
+		lx = np.log(np.asarray(x, dtype=float))
+		lxi = np.clip(np.log(np.atleast_1d(np.asarray(xi, dtype=float))), lx[0], lx[-1])
+		j = np.clip(np.searchsorted(lx, lxi, side='right') - 1, 0, len(lx) - 2)
+		w = (lxi - lx[j]) / (lx[j + 1] - lx[j])
+		S0 = np.take(S, j, axis=ax)
+		S1 = np.take(S, j + 1, axis=ax)
+		w = w.reshape((-1,) + (1,) * (-ax - 1))
+		pos = (S0 > 0) & (S1 > 0)
+		lin = (1 - w) * S0 + w * S1
+		log = np.exp((1 - w) * np.log(np.where(pos, S0, 1.0)) + w * np.log(np.where(pos, S1, 1.0)))
+		S = np.where(pos, log, lin)
+	return S
@@ -0,0 +1,398 @@
+'''
+Timing comparison of array parametrizations against per element evaluation on the grids of the thesis document.
+
+	Functions
+	---------
+		benchmark_nucleus_grid
+			Prints elapsed times for the production and decay kernels on the nucleus grid
+
+		benchmark_magnetar_grid
+			Prints elapsed times for the production kernels on the magnetar grid
+
+		benchmark_charm_convolution
+			Prints elapsed times of the batched fragmentation convolution for all charmed hadrons
+
+		benchmark_adaptive_convolution
+			Prints errors and evaluation counts of fixed and adaptive fragmentation convolutions
+
+		benchmark_log_convolution
+			Prints elapsed times and deviations of log energy convolutions against dense matrix products
+
+		benchmark_decay_transfer
+			Prints elapsed times and deviations of closed form decay transfer matrices against nested quadrature
+
+		benchmark_time_windows
+			Prints elapsed times and deviations of prefix sum window integrals against trapezoid integration
+
+		benchmark_streamed_pipeline
+			Prints elapsed times and deviations of the streamed magnetar pipeline against the staged tables
+
+'''
+import numpy as np
+from scipy.integrate import quad
+from warnings import catch_warnings, simplefilter
+
+import time
+import tempfile
+
+import code.functional as fn
+import code.magnetar as mg
+import code.parametrizations.cross_sections as cr
+import code.parametrizations.species as sp
+import code.store as st
+import code.transfer as tf
+
+
+def _compare(name, func, *args):
+	'''
+	Prints elapsed times of per element and array evaluation for a single kernel.
+
+	Parameters
+	----------
+	name : string
+		The label printed in front of the timings
+	func : callable
+		The array implementation taken from the functional module
+	*args
+		The arguments passed to both evaluations
+
+	Returns
+	-------
+		The ratio of per element to array evaluation time
+	'''
+	with catch_warnings():
+		simplefilter('ignore')
+		start = time.perf_counter()
+		a = np.vectorize(func)(*args)
+		mid = time.perf_counter()
+		b = func(*args)
+		end = time.perf_counter()
+	dev = np.nanmax(np.abs(a - b) / np.where(a == 0, 1.0, np.abs(a)))
+	print(f'{name}\t\t{mid - start:.3f} s\t\t{end - mid:.3f} s\t\t{(mid - start) / (end - mid):.1f}\t\t{dev:.1e}')
+	return (mid - start) / (end - mid)
+
+
+def benchmark_nucleus_grid(KE = 1000, Kp = 200, N = 100):
+	'''
+	Prints elapsed times for the production and decay kernels on the nucleus grid.
+
+	Parameters
+	----------
+	KE : int, optional
+		The number of hadron and neutrino energy values
+	Kp : int, optional
+		The number of proton energy values
+	N : int, optional
+		The number of steps for integration accuracy
+
+	Returns
+	-------
+		None
+	'''
+	Ep = np.logspace(5, 12, Kp)
+	Eh = np.logspace(5, 12, KE)
+	Enu = np.logspace(5, 12, KE)
+	x = Eh[:, None] / Ep[None, :]
+	print(f'\nnucleus grid: {KE} x {Kp} production, {KE} x {KE} decay\n')
+	print('kernel:\t\telement:\tarray:\t\tspeedup:\tdeviation:')
+	_compare('pi prod', fn.meson_production, x, Ep, 'pi')
+	_compare('K prod', fn.meson_production, x, Ep, 'k')
+	for h in ['d0', 'd+', 'd+s', 'lam+c']:
+		_compare(f'{h} prod', fn.charmed_hadron_production, x, Ep, h, N)
+	_compare('pi dec', fn.meson_decay_neutrinos, Enu[:, None], Eh[None, :], 'pi')
+	_compare('K dec', fn.meson_decay_neutrinos, Enu[:, None], Eh[None, :], 'k')
+	for h in ['d0', 'd+', 'd+s', 'lam+c']:
+		_compare(f'{h} dec', fn.charmed_hadron_decay_neutrinos, Enu[:, None], Eh[None, :], h)
+	_compare('pi cool', fn.hadron_proton_cooling_factor, Eh, 1e14, 'pi', 1e15)
+	_compare('pp depth', fn.proton_proton_optical_depth, Ep, 1e14, 1e15)
+
+
+def benchmark_magnetar_grid(Kt = 500, KE = 100, N = 100, E0 = 5.274e11, tsd = 3.243e3):
+	'''
+	Prints elapsed times for the production kernels on the magnetar grid.
+
+	Parameters
+	----------
+	Kt : int, optional
+		The number of points in time
+	KE : int, optional
+		The number of energy values
+	N : int, optional
+		The number of steps for integration accuracy
+	E0 : float, optional
+		The initial proton energy in GeV, default taken from `magnetar(B = 10**14.5)`
+	tsd : float, optional
+		The spindown time in s, default taken from `magnetar(B = 10**14.5)`
+
+	Returns
+	-------
+		None
+	'''
+	t = np.logspace(1, 8, Kt)
+	E = np.logspace(5, 12, KE)
+	Ep = E0 / (1 + t / tsd)
+	x = E[:, None] / Ep[None, :]
+	print(f'\nmagnetar grid: {KE} x {Kt}\n')
+	print('kernel:\t\telement:\tarray:\t\tspeedup:\tdeviation:')
+	_compare('pi prod', fn.meson_production, x, Ep[None, :], 'pi')
+	_compare('K prod', fn.meson_production, x, Ep[None, :], 'k')
+	for h in ['d0', 'd+', 'd+s', 'lam+c']:
+		_compare(f'{h} prod', fn.charmed_hadron_production, x, Ep[None, :], h, N)
+	_compare('pi cool', fn.hadron_proton_cooling_factor, E[:, None], 3.09e18 * (3.243e3 / t[None, :])**3, 'pi')
+	_compare('pp depth', fn.proton_proton_optical_depth, Ep, 3.09e18 * (3.243e3 / t)**3, 3e9 * t)
+
+
+def benchmark_charm_convolution(Kt = 500, KE = 100, N = 100, E0 = 5.274e11, tsd = 3.243e3):
+	'''
+	Prints elapsed times of the batched fragmentation convolution for all charmed hadrons.
+
+	Parameters
+	----------
+	Kt : int, optional
+		The number of points in time
+	KE : int, optional
+		The number of energy values
+	N : int, optional
+		The number of steps for integration accuracy
+	E0 : float, optional
+		The initial proton energy in GeV, default taken from `magnetar(B = 10**14.5)`
+	tsd : float, optional
+		The spindown time in s, default taken from `magnetar(B = 10**14.5)`
+
+	Returns
+	-------
+		None
+	'''
+	t = np.logspace(1, 8, Kt)
+	E = np.logspace(5, 12, KE)
+	Ep = E0 / (1 + t / tsd)
+	x = E[:, None] / Ep[None, :]
+	print(f'\ncharm convolution: {KE} x {Kt} x {N}\n')
+	print('batch:\t\telapsed:')
+	for B in [256, 1024, 4096, 16384]:
+		with catch_warnings():
+			simplefilter('ignore')
+			start = time.perf_counter()
+			for h in ['d0', 'd+', 'd+s', 'lam+c']:
+				fn.charmed_hadron_differential_production(x, Ep[None, :], h, N, B)
+			end = time.perf_counter()
+		print(f'{B}\t\t{end - start:.3f} s')
+
+
+def benchmark_adaptive_convolution(K = 200, R = 200001):
+	'''
+	Prints errors and evaluation counts of fixed and adaptive fragmentation convolutions.
+
+	Parameters
+	----------
+	K : int, optional
+		The number of random cells drawn from the nucleus grid
+	R : int, optional
+		The number of steps of the reference convolution
+
+	Returns
+	-------
+		None
+	'''
+	rng = np.random.default_rng(0)
+	Ep = 10**rng.uniform(5, 12, K)
+	x = 10**rng.uniform(np.log10(2 / Ep), 0, K)
+	print(f'\nadaptive convolution: {K} cells\n')
+	print('hadron:\t\tsetting:\tevaluations:\terror:')
+	with catch_warnings():
+		simplefilter('ignore')
+		for h in ['d0', 'd+', 'd+s', 'lam+c']:
+			ref = cr.charmed_hadron_fragmentation_convolution(x, Ep, h, R, 8)
+			for N in [20, 100, 400]:
+				dev = np.max(np.abs(cr.charmed_hadron_fragmentation_convolution(x, Ep, h, N) / ref - 1))
+				print(f'{h}\t\tN = {N}\t\t{N}\t\t{dev:.1e}')
+			for tol in [1e-3, 1e-6, 1e-9]:
+				sig, n = cr.charmed_hadron_adaptive_convolution(x, Ep, h, tol, full=True)
+				dev = np.max(np.abs(sig / ref - 1))
+				print(f'{h}\t\ttol = {tol:.0e}\t{n.mean():.0f}\t\t{dev:.1e}')
+
+
+def benchmark_log_convolution(K = (100, 1000, 2000), B = (4, 16), n = 1e14, d = 1e15):
+	'''
+	Prints elapsed times and deviations of log energy convolutions against dense matrix products.
+
+	Deviations are taken over values within twenty decades of the maximum, below which the round off
+	of the transforms dominates close to the kinematic end point.
+
+	Parameters
+	----------
+	K : tuple of int, optional
+		The numbers of proton, hadron and neutrino energy values
+	B : tuple of int, optional
+		The numbers of proton energy bands of the production convolution
+	n : float, optional
+		The ionized hydrogen number density of the nucleus model
+	d : float, optional
+		The distance or accretion disk height of the nucleus model
+
+	Returns
+	-------
+		None
+	'''
+	print(f'\nlog convolution: nucleus spectra\n')
+	print('hadron:\t\tpoints:\t\tbands:\t\tdense:\t\tfft:\t\tproduction:\tneutrinos:')
+	with catch_warnings():
+		simplefilter('ignore')
+		for k in K:
+			E = np.logspace(5, 12, k)
+			e = fn.energy_bin_edges(E)
+			w = np.insert(E[1:] - E[:-1], 0, 0.0)
+			Sp = fn.proton_proton_optical_depth(E, n, d) * 1e30 / E**2
+			for h in ['pi', 'd0']:
+				start = time.perf_counter()
+				F = fn.hadron_production(E[:, None] / E[None, :], E[None, :], h)
+				Sh = np.nan_to_num(np.where(E[:, None] < E[None, :], F, 0.0) @ (w * Sp))
+				Snu = fn.hadron_decay_transfer(e, e, h) @ Sh
+				dense = time.perf_counter() - start
+				mh = Sh > 1e-20 * Sh.max()
+				mnu = Snu > 1e-20 * Snu.max()
+				for b in B:
+					start = time.perf_counter()
+					sh = tf.hadron_production_convolution(E, E, h, w, B=b) @ Sp
+					snu = tf.hadron_decay_convolution(e, e, h) @ sh
+					fft = time.perf_counter() - start
+					dh = np.max(np.abs(sh[mh] / Sh[mh] - 1))
+					dnu = np.max(np.abs(snu[mnu] / Snu[mnu] - 1))
+					print(f'{h}\t\t{k}\t\t{b}\t\t{dense:.3f} s\t\t{fft:.3f} s\t\t{dh:.1e}\t\t{dnu:.1e}')
+
+
+def benchmark_decay_transfer(K = 100, C = 20):
+	'''
+	Prints elapsed times and deviations of closed form decay transfer matrices against nested quadrature.
+
+	The reference integrates the decay spectrum with `quad` over the hadron energy bin from the
+	kinematic limit and over the neutrino energy bin with its kinks as break points, for random cells
+	with a nonzero transfer.
+
+	Parameters
+	----------
+	K : int, optional
+		The number of hadron and neutrino energy values
+	C : int, optional
+		The number of random cells per hadron
+
+	Returns
+	-------
+		None
+	'''
+	rng = np.random.default_rng(0)
+	e = fn.energy_bin_edges(np.logspace(5, 12, K))
+	print(f'\ndecay transfer: {K} x {K}, {C} cells\n')
+	print('hadron:\t\tmatrix:\t\tquadrature:\tdeviation:')
+	with catch_warnings():
+		simplefilter('ignore')
+		for h in ['pi', 'k', 'd0', 'd+', 'd+s', 'lam+c']:
+			c = 1 - sp.l[sp.code(h, sp.HADRONS)]
+			start = time.perf_counter()
+			T = fn.hadron_decay_transfer(e, e, h)
+			mid = time.perf_counter()
+			j, k = np.nonzero(T)
+			dev = 0.0
+			for q in rng.choice(len(j), C, replace=False):
+				a, b = e[k[q]], e[k[q] + 1]
+				lo, hi = e[j[q]], e[j[q] + 1]
+				inner = lambda v: quad(lambda u: fn.hadron_decay_neutrinos(v, u, h), max(a, v / c), b, epsrel=1e-12)[0] if v < c * b else 0.0
+				pts = [v for v in (c * a, c * b) if lo < v < hi]
+				ref = quad(inner, lo, hi, points=pts or None, epsrel=1e-12, limit=200)[0] / (hi - lo)
+				dev = max(dev, abs(T[j[q], k[q]] / ref - 1))
+			end = time.perf_counter()
+			print(f'{h}\t\t{mid - start:.3f} s\t\t{end - mid:.3f} s\t\t{dev:.1e}')
+
+
+def benchmark_time_windows(Kt = 500, KE = 50, R = (1, 10, 100)):
+	'''
+	Prints elapsed times and deviations of prefix sum window integrals against trapezoid integration.
+
+	Window bounds are drawn at random between grid points, and the reference integrates every window
+	with `np.trapezoid` over the grid points inside it and the linearly interpolated bounds.
+
+	Parameters
+	----------
+	Kt : int, optional
+		The number of points in time
+	KE : int, optional
+		The number of energy values
+	R : tuple of int, optional
+		The numbers of random windows
+
+	Returns
+	-------
+		None
+	'''
+	rng = np.random.default_rng(0)
+	t = np.logspace(1, 8, Kt)
+	E = np.logspace(5, 12, KE)
+	with catch_warnings():
+		simplefilter('ignore')
+		S = mg.magnetar(B = 10**14.5).hadron_spectra(t[None, :], E[:, None], S = False)
+	rows = S.reshape(-1, Kt)
+	print(f'\ntime windows: {S.shape[0]} x {KE} x {Kt}\n')
+	print('windows:\ttrapezoid:\tprefix:\t\tdeviation:')
+	for r in R:
+		W = np.sort(10**rng.uniform(1, 8, (r, 2)), axis=1)
+		start = time.perf_counter()
+		ref = np.empty((len(rows), r))
+		for k, (a, b) in enumerate(W):
+			tt = np.concatenate(([a], t[(t > a) & (t < b)], [b]))
+			ref[:, k] = [np.trapezoid(np.interp(tt, t, y), tt) for y in rows]
+		mid = time.perf_counter()
+		C = mg.cumulative_time_integral(S, t)
+		I = mg.time_integral_at(C, S, t, W[:, 1]) - mg.time_integral_at(C, S, t, W[:, 0])
+		end = time.perf_counter()
+		I = I.reshape(-1, r)
+		m = ref > 1e-12 * ref.max()
+		dev = np.max(np.abs(I[m] / ref[m] - 1))
+		print(f'{r}\t\t{mid - start:.3f} s\t\t{end - mid:.4f} s\t{dev:.1e}')
+
+
+def benchmark_streamed_pipeline(C = (1, 50, 500), O = False):
+	'''
+	Prints elapsed times and deviations of the streamed magnetar pipeline against the staged tables.
+
+	The staged reference saves the hadron, neutrino and integrated tables one after another, and every
+	pipeline runs on a fresh magnetar object in a temporary directory, so that no cached spectra are
+	shared.
+
+	Parameters
+	----------
+	C : tuple of int, optional
+		The numbers of points in time per chunk
+	O : bool, optional
+		The option to include an effective optical depth
+
+	Returns
+	-------
+		None
+	'''
+	print(f'\nstreamed pipeline: magnetar spectra\n')
+	print('chunk:\t\tstaged:\t\tstreamed:\tdeviation:')
+	with catch_warnings(), tempfile.TemporaryDirectory() as reg:
+		simplefilter('ignore')
+		mag = mg.magnetar(B = 10**14.5)
+		start = time.perf_counter()
+		mg.magnetar_hadron_spectrum(mag, reg, O = O)
+		mg.magnetar_neutrino_spectrum(mag, reg)
+		mg.magnetar_integrated_neutrino_spectrum(mag, reg)
+		staged = time.perf_counter() - start
+		ref = np.array(st.dataset(f'{reg}/integrate'))
+		m = ref > 1e-12 * ref.max()
+		for c in C:
+			start = time.perf_counter()
+			spec = mg.magnetar_streamed_neutrino_spectrum(mg.magnetar(B = 10**14.5), tempfile.mkdtemp(dir=reg), C = c, O = O)
+			streamed = time.perf_counter() - start
+			dev = np.max(np.abs(spec[m] / ref[m] - 1))
+			print(f'{c}\t\t{staged:.3f} s\t\t{streamed:.3f} s\t\t{dev:.1e}')
+
+benchmark_nucleus_grid()
+benchmark_magnetar_grid()
+benchmark_charm_convolution()
+benchmark_adaptive_convolution()
+benchmark_log_convolution()
+benchmark_decay_transfer()
+benchmark_time_windows()
+benchmark_streamed_pipeline()
@@ -0,0 +1,270 @@
+'''
+Content addressed skipping of tabulation stages keyed by a hash of all their inputs.
+
+A stage is a function saving its result to the binary store. Its key hashes the stage name, all bound
+arguments including defaults, the keys of stored tables it reads, the parametrization backend in use
+and the source version of the model code. The key is kept in the metadata block of the stored result, so a stage whose key is present is
+skipped. Running `python -m code.cache` prints the state of all stored tables and the hits and misses
+of recent runs.
+
+	Functions
+	---------
+		source_version
+			Returns the hash of the source files the tabulated results depend on
+
+		stage_key
+			Returns the key and inputs of a stage call
+
+		status
+			Returns the state of a stored table with respect to a key
+
+		run
+			Runs a stage unless its stored result carries the same key
+
+		inspect
+			Prints the state of all stored tables and the hit and miss counts of recent runs
+
+'''
+import numpy as np
+
+import datetime
+import inspect as ins
+import hashlib
+import json
+import glob
+import os
+
+import code.functional as fn
+import code.store as st
+
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SOURCES = ('parametrizations/*.py', 'functional.py', 'transfer.py', 'tables.py', 'store.py', 'adaptive.py', 'diffuse.py', 'detector.py')
+_LOG = os.path.join(_ROOT, 'tabulate', 'cache', 'stages.txt')
+
+
+def source_version(*files):
+	'''
+	Returns the hash of the source files the tabulated results depend on.
+
+	Parameters
+	----------
+	*files : string
+		Further source files relative to the `code` directory, glob patterns are expanded
+
+	Returns
+	-------
+	string
+		The hexadecimal SHA-256 digest of all matched files in sorted order
+	'''
+	h = hashlib.sha256()
+	for f in sorted({p for s in _SOURCES + files for p in glob.glob(os.path.join(_ROOT, s))}):
+		h.update(os.path.relpath(f, _ROOT).encode())
+		with open(f, 'rb') as file:
+			h.update(file.read())
+	return h.hexdigest()
+
+
+def _canonical(v):
+	'''
+	Returns a JSON serializable canonical form of an argument.
+
+	Parameters
+	----------
+	v : object
+		The argument, objects are represented by their class name and public attributes
+
+	Returns
+	-------
+		The canonical form with floats written exactly and arrays by their digest
+	'''
+	if v is None or isinstance(v, (bool, str)):
+		return v
+	if isinstance(v, (int, np.integer)):
+		return int(v)
+	if isinstance(v, (float, np.floating)):
+		return float(v).hex()
+	if isinstance(v, np.ndarray):
+		return {'ndarray': hashlib.sha256(np.ascontiguousarray(v).tobytes()).hexdigest(), 'shape': list(v.shape), 'dtype': str(v.dtype)}
+	if isinstance(v, (list, tuple)):
+		return [_canonical(u) for u in v]
+	if isinstance(v, dict):
+		return {str(k): _canonical(u) for k, u in sorted(v.items())}
+	if callable(v) and hasattr(v, '__qualname__'):
+		return f'{v.__module__}.{v.__qualname__}'
+	if hasattr(v, '__dict__'):
+		return {type(v).__name__: {k: _canonical(u) for k, u in sorted(vars(v).items()) if not k.startswith('_')}}
+	raise ValueError(f'arguments of type `{type(v).__name__}` cannot be hashed into a stage key')
+
+
+def stage_key(func, args = (), kwargs = None, deps = ()):
+	'''
+	Returns the key and inputs of a stage call.
+
+	Parameters
+	----------
+	func : callable
+		The stage function
+	args : tuple, optional
+		The positional arguments of the call
+	kwargs : dict, optional
+		The keyword arguments of the call
+	deps : sequence of string, optional
+		The stored tables read by the stage, given by path without file extension
+
+	Returns
+	-------
+	string
+		The hexadecimal SHA-256 digest of the stage inputs
+	dict
+		The canonical stage inputs
+	'''
+	bound = ins.signature(func).bind(*args, **(kwargs or {}))
+	bound.apply_defaults()
+	src = os.path.relpath(ins.getsourcefile(func), _ROOT)
+	inputs = {
+		'stage': func.__qualname__,
+		'file': src,
+		'arguments': _canonical(dict(bound.arguments)),
+		'deps': {d: _stored_key(d) for d in deps},
+		'backend': fn.get_backend(),
+		'source': source_version(src),
+	}
+	key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+	return key, inputs
+
+
+def _stored_key(path):
+	'''
+	Returns the stage key kept in the metadata block of a stored table.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+
+	Returns
+	-------
+	string or None
+		The stage key, `None` if the table or its key is missing
+	'''
+	try:
+		with open(f'{path}.json') as file:
+			return json.load(file).get('key')
+	except FileNotFoundError:
+		return None
+
+
+def status(path, key):
+	'''
+	Returns the state of a stored table with respect to a key.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+	key : string
+		The current stage key
+
+	Returns
+	-------
+	{'hit', 'miss', 'stale'}
+		The state, `miss` if the table is missing and `stale` if it carries no or a different key
+	'''
+	if not os.path.exists(f'{path}.npy'):
+		return 'miss'
+	return 'hit' if _stored_key(path) == key else 'stale'
+
+
+def run(func, path, /, *args, depends = (), force = False, **kwargs):
+	'''
+	Runs a stage unless its stored result carries the same key.
+
+	The options of `run` are named so that they do not shadow stage parameters, and stages with a
+	parameter of the same name are rejected.
+
+	Parameters
+	----------
+	func : callable
+		The stage function saving its result to the binary store
+	path : string
+		The path of the stored result without file extension
+	*args
+		The positional arguments passed to the stage
+	depends : sequence of string, optional
+		The stored tables read by the stage, given by path without file extension
+	force : bool, optional
+		The option to force the stage to run regardless of its key
+	**kwargs
+		The keyword arguments passed to the stage
+
+	Returns
+	-------
+	bool
+		Whether the stage was run
+
+	Raises
+	------
+	ValueError
+		If the stage has a parameter named like an option of `run`
+	'''
+	clash = {'depends', 'force'} & set(ins.signature(func).parameters)
+	if clash:
+		raise ValueError(f'stage `{func.__qualname__}` has parameters {sorted(clash)} shadowed by options of `run`')
+	key, inputs = stage_key(func, args, kwargs, depends)
+	state = status(path, key)
+	os.makedirs(os.path.dirname(_LOG), exist_ok=True)
+	with open(_LOG, 'a') as file:
+		file.write(f'{datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}   {state}   {key[:12]}   {os.path.relpath(path)}\n')
+	if state == 'hit' and not force:
+		return False
+	func(*args, **kwargs)
+	st.annotate(path, key = key, inputs = inputs)
+	return True
+
+
+def inspect(reg = os.path.join(_ROOT, 'tabulate')):
+	'''
+	Prints the state of all stored tables and the hit and miss counts of recent runs.
+
+	A table is current if the source version and the keys of the tables it read are unchanged since
+	it was computed, stale otherwise, and untracked if it was not computed through `run`.
+
+	Parameters
+	----------
+	reg : string, optional
+		The directory string searched for stored tables
+
+	Returns
+	-------
+	dict
+		The state of every stored table keyed by path
+	'''
+	res = {}
+	for f in sorted(glob.glob(os.path.join(reg, '**', '*.json'), recursive=True)):
+		path = f[:-5]
+		if not os.path.exists(f'{path}.npy'):
+			continue
+		with open(f) as file:
+			meta = json.load(file)
+		inputs = meta.get('inputs')
+		if inputs is None:
+			res[path] = 'untracked'
+			continue
+		src = source_version(inputs['file'])
+		deps = {d: _stored_key(d) for d in inputs['deps']}
+		res[path] = 'current' if src == inputs['source'] and deps == inputs['deps'] else 'stale'
+	print(f'# Stored tables')
+	for path, state in res.items():
+		print(f'{state:<12}{os.path.relpath(path)}')
+	if os.path.exists(_LOG):
+		with open(_LOG) as file:
+			log = [line.split() for line in file if line.strip()]
+		print(f'\n# Stage runs ({len(log)} logged)')
+		for state in ('hit', 'miss', 'stale'):
+			print(f'{state:<12}{sum(row[2] == state for row in log)}')
+	return res
+
+
+if __name__ == '__main__':
+	inspect()
@@ -0,0 +1,212 @@
+'''
+Expected neutrino events from tabulated spectra folded with detector effective areas.
+
+Effective areas are read from text tables with one row per bin, giving the decimal logarithms of the
+lower and upper neutrino energy in GeV, the lower and upper declination in deg and the effective area in
+cm**2, as in public IceCube releases. Spectra are bin averages over logarithmic bins centred on their
+energy grid, so the energy integral is exact through the overlap lengths of both sets of bins. The
+overlaps and areas are combined once per grid and table into a folding matrix, after which folding is a
+single matrix product.
+
+	Functions
+	---------
+		read_effective_area
+			Returns the energy and declination bin edges and effective areas of a text table
+
+		overlap_matrix
+			Returns the overlap lengths of two sets of energy bins
+
+		folding_matrix
+			Returns the matrix mapping bin averaged spectra to energy integrals weighted by effective areas
+
+		fold
+			Returns spectra folded with effective areas of several flavors
+
+		detector_events
+			Saves expected events or event rates for all types from stored spectra to the binary store
+
+'''
+import numpy as np
+
+import time
+import os
+
+import code.store as st
+from code.functional import *
+
+
+_areas = {}
+_folding = {}
+
+
+def read_effective_area(path):
+	'''
+	Returns the energy and declination bin edges and effective areas of a text table.
+
+	Tables are read once per path and modification time and cached.
+
+	Parameters
+	----------
+	path : string
+		The path of the table with columns log10(Emin / GeV), log10(Emax / GeV), decmin / deg, decmax / deg
+		and effective area / cm**2, lines starting with `#` are skipped
+
+	Returns
+	-------
+	ndarray
+		The ascending energy bin edges in GeV
+	ndarray
+		The ascending declination bin edges in deg
+	ndarray
+		The effective areas in cm**2 of shape (energy bins, declination bins)
+	'''
+	key = (os.path.abspath(path), os.path.getmtime(path))
+	if key not in _areas:
+		a = np.loadtxt(path, comments='#', ndmin=2)
+		if a.shape[1] != 5:
+			raise ValueError(f'effective area table `{path}` must have 5 columns, got {a.shape[1]}')
+		E = np.unique(a[:, :2])
+		D = np.unique(a[:, 2:4])
+		i = np.searchsorted(E, a[:, 0])
+		j = np.searchsorted(D, a[:, 2])
+		if len(a) != (len(E) - 1) * (len(D) - 1) or np.any(E[i + 1] != a[:, 1]) or np.any(D[j + 1] != a[:, 3]):
+			raise ValueError(f'effective area table `{path}` does not cover a complete grid of adjacent bins')
+		A = np.zeros((len(E) - 1, len(D) - 1))
+		A[i, j] = a[:, 4]
+		_areas[key] = (10**E, D, A)
+	return _areas[key]
+
+
+def overlap_matrix(e, Ea):
+	'''
+	Returns the overlap lengths of two sets of energy bins.
+
+	Parameters
+	----------
+	e : array_like
+		The ascending energy bin edges of the spectra in GeV
+	Ea : array_like
+		The ascending energy bin edges of the effective areas in GeV
+
+	Returns
+	-------
+	ndarray
+		The overlap lengths in GeV of shape (len(Ea) - 1, len(e) - 1)
+	'''
+	e = np.asarray(e, dtype=float)
+	Ea = np.asarray(Ea, dtype=float)
+	lo = np.maximum(Ea[:-1, None], e[None, :-1])
+	hi = np.minimum(Ea[1:, None], e[None, 1:])
+	return np.maximum(hi - lo, 0.0)
+
+
+def folding_matrix(E, F, r = None):
+	'''
+	Returns the matrix mapping bin averaged spectra to energy integrals weighted by effective areas.
+
+	Matrices are computed once per energy grid, tables and flavor fractions and cached.
+
+	Parameters
+	----------
+	E : array_like
+		The ascending energy grid of the spectra in GeV
+	F : dict
+		The paths of the effective area tables keyed by flavor, all with the same declination bins
+	r : sequence of float, optional
+		The fractions of the spectra per flavor at Earth in the order of `F`, equal if `None`
+
+	Returns
+	-------
+	ndarray
+		The folding matrix in cm**2 * GeV of shape (flavors, declination bins, len(E))
+	ndarray
+		The declination bin edges in deg
+	'''
+	E = np.asarray(E, dtype=float)
+	r = np.full(len(F), 1 / len(F)) if r is None else np.asarray(r, dtype=float)
+	if len(r) != len(F):
+		raise ValueError(f'`r` has {len(r)} flavor fractions but {len(F)} effective area tables are given')
+	key = (E.tobytes(), tuple((f, os.path.abspath(p), os.path.getmtime(p)) for f, p in F.items()), r.tobytes())
+	if key not in _folding:
+		e = energy_bin_edges(E)
+		M = []
+		D = None
+		for (f, p), x in zip(F.items(), r):
+			Ea, Da, A = read_effective_area(p)
+			if D is not None and not np.array_equal(D, Da):
+				raise ValueError(f'effective area table of `{f}` has different declination bins')
+			D = Da
+			M.append(x * A.T @ overlap_matrix(e, Ea))
+		_folding[key] = (np.stack(M), D)
+	return _folding[key]
+
+
+def fold(E, S, F, r = None):
+	'''
+	Returns spectra folded with effective areas of several flavors.
+
+	Parameters
+	----------
+	E : array_like
+		The ascending energy grid of the spectra in GeV
+	S : array_like
+		The bin averaged spectra of shape (species, len(E), ...) in 1 / (GeV cm**2) or per time and solid angle
+	F : dict
+		The paths of the effective area tables keyed by flavor, all with the same declination bins
+	r : sequence of float, optional
+		The fractions of the spectra per flavor at Earth in the order of `F`, equal if `None`
+
+	Returns
+	-------
+	ndarray
+		The folded spectra of shape (species, flavors, declination bins, ...), integrated over energy
+	'''
+	M, _ = folding_matrix(E, F, r)
+	return np.moveaxis(np.tensordot(M, np.asarray(S, dtype=float), axes=([-1], [1])), 2, 0)
+
+
+def detector_events(src, out, F, r = None, d = 3.0856775814913673e22):
+	'''
+	Saves expected events or event rates for all types from stored spectra to the binary store.
+
+	Integrated source spectra in 1 / GeV give the expected events of a single source at distance `d`
+	for every declination bin of the tables. Diffuse fluxes in 1 / (GeV cm**2 s sr) give the event rates
+	from every declination band, integrated over its solid angle. Further trailing axes such as time
+	windows are kept.
+
+	Parameters
+	----------
+	src : string
+		The path of the stored spectra without file extension, over species and energy first
+	out : string
+		The path of the saved events without file extension
+	F : dict
+		The paths of the effective area tables keyed by flavor, all with the same declination bins
+	r : sequence of float, optional
+		The fractions of the spectra per flavor at Earth in the order of `F`, equal if `None`
+	d : float, optional
+		The source distance in cm, ignored for diffuse fluxes
+
+	Returns
+	-------
+		None
+	'''
+	start = time.perf_counter()
+	ds = st.dataset(src)
+	E = ds.axis('energy')
+	N = fold(E, np.asarray(ds), F, r)
+	_, D = folding_matrix(E, F, r)
+	match ds.unit:
+		case '1/GeV':
+			N = N / (4 * np.pi * d**2)
+			unit, title, info = '', 'Expected Events', f'{ds.meta["info"]}\n# Distance / cm\n# {d:.3}'
+		case '1/(GeVcm**2ssr)':
+			O = 2 * np.pi * np.diff(np.sin(np.radians(D)))
+			N = N * O.reshape((-1,) + (1,) * (N.ndim - 3))
+			unit, title, info = '1/s', 'Event Rate', ds.meta['info']
+		case _:
+			raise ValueError(f'`{ds.unit}` is not a foldable unit, use integrated spectra in `1/GeV` or diffuse fluxes in `1/(GeVcm**2ssr)` instead')
+	end = time.perf_counter()
+	axes = [('species', '', ds.axis('species')), ('flavor', '', list(F)), ('declination', 'deg', np.column_stack((D[:-1], D[1:])))]
+	axes += [(ax['name'], ax['unit'], ax['values']) for ax in ds.meta['axes'][2:]]
+	st.save(out, N, axes, unit, title, info, elapsed = end - start, tables = {f: os.path.relpath(p) for f, p in F.items()})
@@ -0,0 +1,250 @@
+'''
+Diffuse neutrino flux from a cosmological population of sources with cached distance tables.
+
+The diffuse flux of sources with time integrated spectrum N(E) and comoving rate density R(z) is
+
+	phi(E) = c / (4 pi) * int dz R(z) N((1 + z) E) / H(z)
+
+evaluated in ln(1 + z) on a logarithmic energy grid, where redshifting is a shift by whole steps.
+The source spectrum is refined once onto a grid whose step divides the redshift step, so that the
+integral over redshift becomes a single correlation with precomputed weights.
+
+	Functions
+	---------
+		cosmology_table
+			Returns tabulated redshift, comoving distance and redshift derivative of cosmic time
+
+		comoving_distance
+			Returns the comoving distance interpolated from the cached cosmology table
+
+		source_evolution
+			Returns the source rate density relative to the local value
+
+		diffuse_flux
+			Returns the diffuse flux of a population of sources with a given time integrated spectrum
+
+		diffuse_neutrino_flux
+			Saves diffuse neutrino fluxes for all types from stored integrated spectra to the binary store
+
+'''
+import numpy as np
+
+import time
+
+import code.store as st
+
+
+_tables = {}
+
+C = 2.99792458e10
+MPC = 3.0856775814913673e24
+YR = 3.15576e7
+
+
+def cosmology_table(z = 10.0, K = 4000, H0 = 67.7, Om = 0.31, OL = 0.69):
+	'''
+	Returns tabulated redshift, comoving distance and redshift derivative of cosmic time.
+
+	Tables are computed once per set of arguments and cached.
+
+	Parameters
+	----------
+	z : float, optional
+		The largest tabulated redshift
+	K : int, optional
+		The number of redshift values, evenly spaced in ln(1 + z)
+	H0 : float, optional
+		The Hubble constant in km / (s Mpc)
+	Om : float, optional
+		The matter density fraction
+	OL : float, optional
+		The dark energy density fraction
+
+	Returns
+	-------
+	ndarray
+		The redshift values
+	ndarray
+		The comoving distance in cm
+	ndarray
+		The absolute derivative |dt / dz| of cosmic time in s
+	'''
+	key = (z, K, H0, Om, OL)
+	if key not in _tables:
+		zz = np.expm1(np.linspace(0.0, np.log1p(z), K))
+		H = H0 * 1e5 / MPC * np.sqrt(Om * (1 + zz)**3 + (1 - Om - OL) * (1 + zz)**2 + OL)
+		dz = np.diff(zz)
+		D = np.concatenate(([0.0], np.cumsum(0.5 * (C / H[1:] + C / H[:-1]) * dz)))
+		_tables[key] = (zz, D, 1 / ((1 + zz) * H))
+	return _tables[key]
+
+
+def comoving_distance(z, **kwargs):
+	'''
+	Returns the comoving distance interpolated from the cached cosmology table.
+
+	Parameters
+	----------
+	z : array_like
+		The redshift, no larger than the largest tabulated redshift
+	**kwargs
+		The cosmology passed to `cosmology_table`
+
+	Returns
+	-------
+	ndarray
+		The comoving distance in cm
+	'''
+	zz, D, _ = cosmology_table(**kwargs)
+	z = np.asarray(z, dtype=float)
+	if np.any(z > zz[-1]):
+		raise ValueError(f'`z` exceeds the largest tabulated redshift {zz[-1]:.3}')
+	return np.interp(np.log1p(z), np.log1p(zz), D)
+
+
+def source_evolution(z, m = 'sfr'):
+	'''
+	Returns the source rate density relative to the local value.
+
+	Parameters
+	----------
+	z : array_like
+		The redshift
+	m : {'sfr', 'none'} or callable, optional
+		The evolution model, the star formation rate of Madau and Dickinson (2014), no evolution, or a
+		function of redshift that is normalized here to its local value
+
+	Returns
+	-------
+	ndarray
+		The unitless source rate density relative to redshift zero
+	'''
+	z = np.asarray(z, dtype=float)
+	if callable(m):
+		return np.asarray(m(z), dtype=float) / float(m(0.0))
+	match m.lower():
+		case 'sfr':
+			psi = lambda y: (1 + y)**2.7 / (1 + ((1 + y) / 2.9)**5.6)
+			return psi(z) / psi(0.0)
+		case 'none':
+			return np.ones_like(z)
+		case _:
+			raise ValueError(f'`{m.lower()}` is not a valid source evolution model, use `sfr`, `none` or a callable instead')
+
+
+def _resample(S, x, xi):
+	'''
+	Returns values interpolated log-log from one logarithmic energy grid to another.
+
+	Parameters
+	----------
+	S : ndarray
+		The values along the last axis
+	x : ndarray
+		The strictly increasing logarithmic energies of the values
+	xi : ndarray
+		The requested logarithmic energies within `x`
+
+	Returns
+	-------
+	ndarray
+		The interpolated values, linear wherever a neighbouring value vanishes
+	'''
+	j = np.clip(np.searchsorted(x, xi, side='right') - 1, 0, len(x) - 2)
+	w = (xi - x[j]) / (x[j + 1] - x[j])
+	a = S[..., j]
+	b = S[..., j + 1]
+	pos = (a > 0) & (b > 0)
+	return np.where(pos, np.exp((1 - w) * np.log(np.where(pos, a, 1.0)) + w * np.log(np.where(pos, b, 1.0))), (1 - w) * a + w * b)
+
+
+def diffuse_flux(E, N, R0 = 1e-4, m = 'sfr', z = 6.0, P = 8, **kwargs):
+	'''
+	Returns the diffuse flux of a population of sources with a given time integrated spectrum.
+
+	The source spectrum is interpolated log-log onto a logarithmic grid with `P` steps per smallest
+	step of `E`, and taken to vanish above the largest energy of `E`. Redshifts are sampled on the same
+	steps in ln(1 + z), so that no source spectrum is evaluated off the refined grid.
+
+	Parameters
+	----------
+	E : array_like
+		The ascending positive energy grid in GeV, not necessarily evenly spaced
+	N : array_like
+		The time integrated source spectrum in 1 / GeV along the last axis, with further leading axes
+	R0 : float, optional
+		The local source rate density in 1 / (Mpc**3 yr)
+	m : {'sfr', 'none'} or callable, optional
+		The source evolution model as taken by `source_evolution`
+	z : float, optional
+		The largest source redshift
+	P : int, optional
+		The number of refined steps per smallest step of `E`
+	**kwargs
+		The cosmology passed to `cosmology_table`
+
+	Returns
+	-------
+	ndarray
+		The diffuse flux in 1 / (GeV cm**2 s sr) on the grid `E`
+	'''
+	E = np.asarray(E, dtype=float)
+	N = np.asarray(N, dtype=float)
+	zt, _, dt = cosmology_table(**kwargs)
+	if z > zt[-1]:
+		raise ValueError(f'`z` exceeds the largest tabulated redshift {zt[-1]:.3}')
+	lE = np.log(E)
+	d = np.min(np.diff(lE)) / P
+	u = lE[0] + d * np.arange(int((lE[-1] - lE[0]) / d + 1e-9) + 1)
+	Nu = _resample(N, lE, u)
+	y = d * np.arange(int(np.log1p(z) / d + 1e-9) + 1)
+	zy = np.expm1(y)
+	g = C / (4 * np.pi) * R0 / (MPC**3 * YR) * source_evolution(zy, m) * (1 + zy)**2 * np.interp(y, np.log1p(zt), dt) * d
+	g[[0, -1]] *= 0.5
+	pad = np.concatenate((Nu, np.zeros(Nu.shape[:-1] + (len(y) - 1,))), axis=-1)
+	phi = np.zeros(Nu.shape)
+	for k in range(len(y)):
+		phi += g[k] * pad[..., k:k + len(u)]
+	return _resample(phi, u, lE)
+
+
+def diffuse_neutrino_flux(src, out, k = -1, R0 = 1e-4, m = 'sfr', z = 6.0, P = 8):
+	'''
+	Saves diffuse neutrino fluxes for all types from stored integrated spectra to the binary store.
+
+	Parameters
+	----------
+	src : string
+		The path of the stored integrated spectra without file extension, over species and energy and
+		optionally a last window axis
+	out : string
+		The path of the saved diffuse fluxes without file extension
+	k : int, optional
+		The index of the time window used if the integrated spectra have a window axis
+	R0 : float, optional
+		The local source rate density in 1 / (Mpc**3 yr)
+	m : {'sfr', 'none'} or callable, optional
+		The source evolution model as taken by `source_evolution`
+	z : float, optional
+		The largest source redshift
+	P : int, optional
+		The number of refined steps per smallest energy step
+
+	Returns
+	-------
+		None
+	'''
+	start = time.perf_counter()
+	ds = st.dataset(src)
+	E = ds.axis('energy')
+	N = np.asarray(ds)
+	if 'window' in ds.names:
+		N = np.take(N, k, axis=ds.names.index('window'))
+		info = f'{ds.meta["info"]}\n# Window / s\n# {" - ".join(f"{v:.0e}" for v in ds.axis("window")[k])}'
+	else:
+		info = ds.meta['info']
+	phi = diffuse_flux(E, N, R0, m, z, P)
+	end = time.perf_counter()
+	axes = [('species', '', ds.axis('species')), ('energy', 'GeV', E)]
+	evolution = m if isinstance(m, str) else f'{m.__module__}.{m.__qualname__}'
+	st.save(out, phi, axes, '1/(GeVcm**2ssr)', 'Diffuse Flux', info, elapsed = end - start, rate = R0, evolution = evolution, redshift = z)
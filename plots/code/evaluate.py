@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 import time
 
 from code.functional import *
+import code.store as st
+import code.cache as ca
 
 
 def sample_inelastic_hadron_scattering():
@@ -12,12 +14,8 @@ def sample_inelastic_hadron_scattering():
 	pi = inelastic_hadron_proton_scattering(s, 'pi')
 	K = inelastic_hadron_proton_scattering(s, 'k')
 
-	with open('code/tabulate/other/sample_inelastic_scattering.txt', 'w') as f:
-		f.write(f'# Hadron Inelastic Scattering Cross Section\n')
-		f.write(f'# s / GeV**2 # sig (proton) / mb # sig (pion) / mb # sig (kaon) / mb\n')
-		for row in zip(s, p, pi, K):
-			f.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			f.write(f'\n')
+	axes = [('particle', '', ['proton', 'pion', 'kaon']), ('s', 'GeV**2', s)]
+	st.save('code/tabulate/other/sample_inelastic_scattering', [p, pi, K], axes, 'mb', 'Hadron Inelastic Scattering Cross Section')
 
 
 def sample_charmed_hadron_cross_section():
@@ -27,12 +25,8 @@ def sample_charmed_hadron_cross_section():
 	sig2 = charmed_hadron_differential_production(x, 1e10, 'd0')
 	sig3 = charmed_hadron_differential_production(x, 1e8, 'd0')
 
-	with open('code/tabulate/other/sample_charm_hadron.txt', 'w') as f:
-		f.write(f'# `D0` Sample Charmed Hadron Cross Section\n')
-		f.write(f'# x # sig (1e12 GeV) / mb # sig (1e10 GeV) / mb # sig (1e8 GeV) / mb\n')
-		for row in zip(x, sig1, sig2, sig3):
-			f.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			f.write(f'\n')
+	axes = [('energy', 'GeV', [1e12, 1e10, 1e8]), ('x', '', x)]
+	st.save('code/tabulate/other/sample_charm_hadron', [sig1, sig2, sig3], axes, 'mb', '`D0` Sample Charmed Hadron Cross Section')
 
 
 def test_charmed_hadron_cross_section():
@@ -68,6 +62,8 @@ def test_charmed_hadron_cross_section():
 	print(f'\nelapsed: {end - start:.3f} s\n')
 
 
-sample_inelastic_hadron_scattering()
-sample_charmed_hadron_cross_section()
-test_charmed_hadron_cross_section()
+ca.run(sample_inelastic_hadron_scattering, 'code/tabulate/other/sample_inelastic_scattering')
+ca.run(sample_charmed_hadron_cross_section, 'code/tabulate/other/sample_charm_hadron')
+
+if __name__ == '__main__':
+	test_charmed_hadron_cross_section()
@@ -1,5 +1,5 @@
 '''
-Vectorization of given parametrizations.
+Array interface of given parametrizations, broadcasting over arbitrary shapes.
 
 	Functions
 	---------
@@ -33,38 +33,187 @@ Vectorization of given parametrizations.
 	charmed_hadron_production
 		Returns the proton-proton to charmed hadron singular production spectrum
 
+	tabulated_charmed_hadron_production
+		Returns the proton-proton to charmed hadron singular production spectrum from a cached table
+
 	charmed_hadron_decay_neutrinos
 		Returns the charmed hadron to neutrino singular decay spectrum
 
+	hadron_production
+		Returns the proton-proton to hadron singular production spectrum for any species
+
+	hadron_decay_neutrinos
+		Returns the hadron to neutrino singular decay spectrum for any species
+
+	stacked_hadron_production
+		Returns the proton-proton to hadron singular production spectra of several species in one pass
+
+	tabulated_stacked_hadron_production
+		Returns the proton-proton to hadron singular production spectra of several species with cached charm tables
+
 	charmed_hadron_fragmentation_function
 		Returns the charmed hadrons from charm quarks fragmentation function
 
-'''
+	energy_bin_edges
+		Returns logarithmic bin edges centred on the given energies
 
-import numpy as np
+	meson_decay_transfer
+		Returns the bin averaged pion or kaon to neutrino decay transfer matrix
 
-import code.parametrizations.collisions_decay as cd
-import code.parametrizations.cross_sections as cr
-import code.parametrizations.distribution_spectra as ds
-import code.parametrizations.fragmentation_function as ff
+	charmed_hadron_decay_transfer
+		Returns the bin averaged charmed hadron to neutrino decay transfer matrix
+
+	hadron_decay_transfer
+		Returns the bin averaged hadron to neutrino decay transfer matrix for any species
+
+	hadron_production_operator
+		Returns the sparse operator mapping a proton spectrum to the hadron spectrum
 
+	hadron_decay_operator
+		Returns the sparse operator mapping a hadron spectrum to the bin averaged neutrino spectrum
 
-hadron_proton_cooling_factor = np.vectorize(cd.hadron_proton_cooling_factor)
-proton_proton_optical_depth = np.vectorize(cd.proton_proton_optical_depth)
+	hadron_production_convolution
+		Returns the log energy convolution mapping a proton spectrum to the hadron spectrum
 
-total_hadron_proton_scattering = np.vectorize(cr.total_hadron_proton_scattering)
-hadron_elastic_total_ratio = np.vectorize(cr.hadron_elastic_total_ratio)
-inelastic_hadron_proton_scattering = np.vectorize(cr.inelastic_hadron_proton_scattering)
-charm_quark_differential_production = np.vectorize(cr.charm_quark_differential_production)
-charmed_hadron_differential_production = np.vectorize(cr.charmed_hadron_differential_production)
+	hadron_decay_convolution
+		Returns the log energy convolution mapping a hadron spectrum to the bin averaged neutrino spectrum
 
-meson_production = np.vectorize(ds.meson_production)
-meson_decay_neutrinos = np.vectorize(ds.meson_decay_neutrinos)
-charmed_hadron_production = np.vectorize(ds.charmed_hadron_production)
-charmed_hadron_decay_neutrinos = np.vectorize(ds.charmed_hadron_decay_neutrinos)
+	set_backend
+		Selects the implementation behind all exported parametrizations
 
-charmed_hadron_fragmentation_function = np.vectorize(ff.charmed_hadron_fragmentation_function)
+	get_backend
+		Returns the name of the backend in use
 
+	set_bounds_policy
+		Selects the default policy for out of bounds values
+
+	get_bounds_policy
+		Returns the default policy for out of bounds values
+
+The NumPy implementation is used unless the environment variable `BACHELOR_BACKEND` or a call to
+`set_backend` selects the compiled numba kernels of `code.parametrizations.compiled`.
+
+'''
+
+import numpy as np
+from warnings import warn
+
+import functools
+import os
+
+import code.parametrizations.bounds as bd
+import code.parametrizations.collisions_decay as cd
+import code.parametrizations.cross_sections as cr
+import code.parametrizations.distribution_spectra as ds
+import code.parametrizations.fragmentation_function as ff
+import code.tables as tb
+import code.transfer as tf
+
+
+_numpy = {
+	'hadron_proton_cooling_factor': cd.hadron_proton_cooling_factor,
+	'proton_proton_optical_depth': cd.proton_proton_optical_depth,
+	'total_hadron_proton_scattering': cr.total_hadron_proton_scattering,
+	'hadron_elastic_total_ratio': cr.hadron_elastic_total_ratio,
+	'inelastic_hadron_proton_scattering': cr.inelastic_hadron_proton_scattering,
+	'charm_quark_differential_production': cr.charm_quark_differential_production,
+	'charmed_hadron_differential_production': cr.charmed_hadron_differential_production,
+	'meson_production': ds.meson_production,
+	'meson_decay_neutrinos': ds.meson_decay_neutrinos,
+	'charmed_hadron_production': ds.charmed_hadron_production,
+	'charmed_hadron_decay_neutrinos': ds.charmed_hadron_decay_neutrinos,
+	'hadron_production': ds.hadron_production,
+	'hadron_decay_neutrinos': ds.hadron_decay_neutrinos,
+	'stacked_hadron_production': ds.stacked_hadron_production,
+	'charmed_hadron_fragmentation_function': ff.charmed_hadron_fragmentation_function,
+}
+
+_backend = {'name': 'numpy', **_numpy}
+
+
+def set_backend(name):
+	'''
+	Selects the implementation behind all exported parametrizations.
+
+	Parameters
+	----------
+	name : {'numpy', 'numba'}
+		The backend to use, numba falls back to numpy if it cannot be imported
+
+	Returns
+	-------
+	string
+		The name of the backend in use
+
+	Raises
+	------
+	ValueError
+		If the backend name is unknown
+	'''
+	match name.lower():
+		case 'numpy':
+			_backend.update(_numpy, name='numpy')
+		case 'numba':
+			try:
+				import code.parametrizations.compiled as jit
+			except ImportError as err:
+				warn(f'numba backend is unavailable, falling back to numpy: {err}')
+				_backend.update(_numpy, name='numpy')
+			else:
+				_backend.update({k: getattr(jit, k) for k in _numpy}, name='numba')
+		case _:
+			raise ValueError(f'`{name}` is an invalid backend identifyer, use `numpy` or `numba` instead')
+	return _backend['name']
+
+
+def get_backend():
+	'''Returns the name of the backend in use.'''
+	return _backend['name']
+
+
+def _dispatch(name):
+	'''Returns a wrapper calling the named parametrization of the backend in use.'''
+	@functools.wraps(_numpy[name])
+	def func(*args, **kwargs):
+		return _backend[name](*args, **kwargs)
+	return func
+
+
+hadron_proton_cooling_factor = _dispatch('hadron_proton_cooling_factor')
+proton_proton_optical_depth = _dispatch('proton_proton_optical_depth')
+
+total_hadron_proton_scattering = _dispatch('total_hadron_proton_scattering')
+hadron_elastic_total_ratio = _dispatch('hadron_elastic_total_ratio')
+inelastic_hadron_proton_scattering = _dispatch('inelastic_hadron_proton_scattering')
+charm_quark_differential_production = _dispatch('charm_quark_differential_production')
+charmed_hadron_differential_production = _dispatch('charmed_hadron_differential_production')
+
+meson_production = _dispatch('meson_production')
+meson_decay_neutrinos = _dispatch('meson_decay_neutrinos')
+charmed_hadron_production = _dispatch('charmed_hadron_production')
+tabulated_charmed_hadron_production = tb.tabulated_charmed_hadron_production
+charmed_hadron_decay_neutrinos = _dispatch('charmed_hadron_decay_neutrinos')
+hadron_production = _dispatch('hadron_production')
+hadron_decay_neutrinos = _dispatch('hadron_decay_neutrinos')
+stacked_hadron_production = _dispatch('stacked_hadron_production')
+tabulated_stacked_hadron_production = tb.tabulated_stacked_hadron_production
+
+charmed_hadron_fragmentation_function = _dispatch('charmed_hadron_fragmentation_function')
+
+energy_bin_edges = ds.energy_bin_edges
+meson_decay_transfer = ds.meson_decay_transfer
+charmed_hadron_decay_transfer = ds.charmed_hadron_decay_transfer
+hadron_decay_transfer = ds.hadron_decay_transfer
+
+hadron_production_operator = tf.hadron_production_operator
+hadron_decay_operator = tf.hadron_decay_operator
+hadron_production_convolution = tf.hadron_production_convolution
+hadron_decay_convolution = tf.hadron_decay_convolution
+
+set_bounds_policy = bd.set_policy
+get_bounds_policy = bd.get_policy
+
+set_backend(os.environ.get('BACHELOR_BACKEND', 'numpy'))
 
 
 # import matplotlib.pyplot as plt
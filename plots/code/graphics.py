@@ -2,6 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from code.functional import *
+import code.store as st
 
 
 plt.figure(figsize=(5.4, 3.1))
@@ -28,7 +29,9 @@ plt.close()
 
 
 
-s, p, pi, K = np.genfromtxt('code/tabulate/other/sample_inelastic_scattering.txt', unpack=True)
+sig = st.dataset('code/tabulate/other/sample_inelastic_scattering')
+s = sig.axis('s')
+p, pi, K = np.asarray(sig)
 
 plt.figure(figsize=(5.0, 3.2))
 
@@ -51,7 +54,9 @@ plt.close()
 
 
 
-x, y1, y2, y3 = np.genfromtxt('code/tabulate/other/sample_charm_hadron.txt', unpack=True)
+sig = st.dataset('code/tabulate/other/sample_charm_hadron')
+x = sig.axis('x')
+y1, y2, y3 = np.asarray(sig)
 
 plt.figure(figsize=(5.0, 3.2))
 
@@ -76,26 +81,11 @@ plt.close()
 
 
 
-t = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/axes.txt', skip_footer=1)
-E = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/axes.txt', skip_header=15)
+neu = st.dataset('code/tabulate/magnetar/without/neutrinos').sel(energy = 1e9)
+t = neu.axis('time')
+en = neu.meta['selected']['energy']
 
-en = 1e9
-i = (np.abs(E - en)).argmin()
-en = E[i]
-
-pi = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/pi.txt')
-K = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/K.txt')
-D0 = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/D0.txt')
-Dplus = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/Dplus.txt')
-DplusS = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/DplusS.txt')
-LAMplusC = np.genfromtxt('code/tabulate/magnetar/without/neutrinos/LAMplusC.txt')
-
-pi = pi[i, :]
-K = K[i, :]
-D0 = D0[i, :]
-Dplus = Dplus[i, :]
-DplusS = DplusS[i, :]
-LAMplusC = LAMplusC[i, :]
+pi, K, D0, Dplus, DplusS, LAMplusC = np.asarray(neu)
 
 c = D0 + Dplus + DplusS + LAMplusC
 
@@ -145,12 +135,9 @@ plt.close()
 
 
 
-E, pi1, pi2, pi3 = np.genfromtxt('code/tabulate/magnetar/without/integrate/pi.txt', unpack=True)
-E, K1, K2, K3 = np.genfromtxt('code/tabulate/magnetar/without/integrate/K.txt', unpack=True)
-E, D01, D02, D03 = np.genfromtxt('code/tabulate/magnetar/without/integrate/D0.txt', unpack=True)
-E, Dplus1, Dplus2, Dplus3 = np.genfromtxt('code/tabulate/magnetar/without/integrate/Dplus.txt', unpack=True)
-E, DplusS1, DplusS2, DplusS3 = np.genfromtxt('code/tabulate/magnetar/without/integrate/DplusS.txt', unpack=True)
-E, LAMplusC1, LAMplusC2, LAMplusC3 = np.genfromtxt('code/tabulate/magnetar/without/integrate/LAMplusC.txt', unpack=True)
+spec = st.dataset('code/tabulate/magnetar/without/integrate')
+E = spec.axis('energy')
+(pi1, pi2, pi3), (K1, K2, K3), (D01, D02, D03), (Dplus1, Dplus2, Dplus3), (DplusS1, DplusS2, DplusS3), (LAMplusC1, LAMplusC2, LAMplusC3) = np.moveaxis(np.asarray(spec), 2, 1)
 
 c1 = D01 + Dplus1 + DplusS1 + LAMplusC1
 c2 = D02 + Dplus2 + DplusS2 + LAMplusC2
@@ -191,26 +178,11 @@ plt.close()
 
 
 
-t = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/axes.txt', skip_footer=1)
-E = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/axes.txt', skip_header=15)
-
-en = 1e9
-i = (np.abs(E - en)).argmin()
-en = E[i]
-
-pi = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/pi.txt')
-K = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/K.txt')
-D0 = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/D0.txt')
-Dplus = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/Dplus.txt')
-DplusS = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/DplusS.txt')
-LAMplusC = np.genfromtxt('code/tabulate/magnetar/with/neutrinos/LAMplusC.txt')
+neu = st.dataset('code/tabulate/magnetar/with/neutrinos').sel(energy = 1e9)
+t = neu.axis('time')
+en = neu.meta['selected']['energy']
 
-pi = pi[i, :]
-K = K[i, :]
-D0 = D0[i, :]
-Dplus = Dplus[i, :]
-DplusS = DplusS[i, :]
-LAMplusC = LAMplusC[i, :]
+pi, K, D0, Dplus, DplusS, LAMplusC = np.asarray(neu)
 
 c = D0 + Dplus + DplusS + LAMplusC
 
@@ -260,12 +232,9 @@ plt.close()
 
 
 
-E, pi1, pi2, pi3 = np.genfromtxt('code/tabulate/magnetar/with/integrate/pi.txt', unpack=True)
-E, K1, K2, K3 = np.genfromtxt('code/tabulate/magnetar/with/integrate/K.txt', unpack=True)
-E, D01, D02, D03 = np.genfromtxt('code/tabulate/magnetar/with/integrate/D0.txt', unpack=True)
-E, Dplus1, Dplus2, Dplus3 = np.genfromtxt('code/tabulate/magnetar/with/integrate/Dplus.txt', unpack=True)
-E, DplusS1, DplusS2, DplusS3 = np.genfromtxt('code/tabulate/magnetar/with/integrate/DplusS.txt', unpack=True)
-E, LAMplusC1, LAMplusC2, LAMplusC3 = np.genfromtxt('code/tabulate/magnetar/with/integrate/LAMplusC.txt', unpack=True)
+spec = st.dataset('code/tabulate/magnetar/with/integrate')
+E = spec.axis('energy')
+(pi1, pi2, pi3), (K1, K2, K3), (D01, D02, D03), (Dplus1, Dplus2, Dplus3), (DplusS1, DplusS2, DplusS3), (LAMplusC1, LAMplusC2, LAMplusC3) = np.moveaxis(np.asarray(spec), 2, 1)
 
 c1 = D01 + Dplus1 + DplusS1 + LAMplusC1
 c2 = D02 + Dplus2 + DplusS2 + LAMplusC2
@@ -306,12 +275,9 @@ plt.close()
 
 
 
-E, pi = np.genfromtxt('code/tabulate/nucleus/neutrinos/pi.txt', unpack=True)
-E, K = np.genfromtxt('code/tabulate/nucleus/neutrinos/K.txt', unpack=True)
-E, D0 = np.genfromtxt('code/tabulate/nucleus/neutrinos/D0.txt', unpack=True)
-E, Dplus = np.genfromtxt('code/tabulate/nucleus/neutrinos/Dplus.txt', unpack=True)
-E, DplusS = np.genfromtxt('code/tabulate/nucleus/neutrinos/DplusS.txt', unpack=True)
-E, LAMplusC = np.genfromtxt('code/tabulate/nucleus/neutrinos/LAMplusC.txt', unpack=True)
+spec = st.dataset('code/tabulate/nucleus/neutrinos')
+E = spec.axis('energy')
+pi, K, D0, Dplus, DplusS, LAMplusC = np.asarray(spec)
 
 c = D0 + Dplus + DplusS + LAMplusC
 
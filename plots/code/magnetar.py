@@ -6,27 +6,57 @@ Object oriented implementation of magnetar class as described in the thesis docu
 	magnetar
 		Collects parameters and methods associated with the magnetar model
 
+	magnetar_ensemble
+		Collects parameters and methods of many magnetars as arrays for evaluation in one broadcast pass
+
 	Functions
 	---------
+		cumulative_time_integral
+			Returns the cumulative trapezoid integral of spectra along time
+			
+
+		time_integral_at
+			Returns cumulative time integrals at arbitrary times within the time axis
+			
+
+		time_integral_index
+			Returns the time axis, spectra and cumulative time integrals of a stored table
+			
+
 		magnetar_hadron_spectrum
-			Prints calculated hadron spectra for all types to tabulated text files
+			Saves calculated hadron spectra for all types to the binary store
+			
+
+		magnetar_adaptive_hadron_spectrum
+			Saves hadron spectra for all types on an adaptively refined grid to the binary store
 			
 
 		magnetar_neutrino_spectrum
-			Prints calculated neutrino spectra for all types to tabulated text files
+			Saves calculated neutrino spectra for all types to the binary store
 			
 
 		magnetar_integrated_neutrino_spectrum
-			Prints integrated neutrino spectra for all types to tabulated text files
+			Saves integrated neutrino spectra for all types to the binary store
+			
+
+		magnetar_streamed_neutrino_spectrum
+			Saves integrated neutrino spectra for all types from a single pass over chunks in time
 
 '''
 import numpy as np
 from warnings import warn
 
-import datetime
+import collections
 import time
+import os
 
 from code.functional import *
+import code.parametrizations.species as sp
+import code.store as st
+import code.adaptive as ad
+
+
+SPECTRA_BYTES = 2**28
 
 
 class magnetar:
@@ -91,6 +121,9 @@ class magnetar:
 	hadron_spectrum
 		Returns the hadron spectrum from injection of protons
 
+	hadron_spectra
+		Returns the hadron spectra of all types from injection of protons in one pass
+
 	'''
 
 	def __init__(self, R = 1e6, B = 1e15, o = 1e4, chi = 95e-2, I = 1e45, m = 'force free'):
@@ -132,6 +165,7 @@ class magnetar:
 				raise ValueError(f'`{m.lower()}` is not a valid magnetosphere model, use `force free` or `vacuum` instead')
 		self.tsd = I / (2 * K * o**2)
 		self.lum = K * o**4
+		self._spectra = collections.OrderedDict()
 
 	def __str__(self):
 		'''Defines string output for printing the magnetar object.'''
@@ -147,7 +181,7 @@ class magnetar:
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 
 		Returns
@@ -162,7 +196,7 @@ class magnetar:
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 		f : float, optional
 			The efficiency fraction of potential drop acceleration
@@ -179,7 +213,7 @@ class magnetar:
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 
 		Returns
@@ -194,7 +228,7 @@ class magnetar:
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 		b : float, optional
 			The relativistic velocity fraction
@@ -211,7 +245,7 @@ class magnetar:
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 		b : float, optional
 			The relativistic velocity fraction
@@ -225,48 +259,18 @@ class magnetar:
 		r = self.ejecta_radius(t, b)
 		return 3 * M * 1.9884e30/ (4 * np.pi * r**3 * 1.672621926e-27)
 
-	def _cooling_factor(self, t, E, h, b = 1e-1, M = 1e1, D = False):
-		'''
-		Returns the ejecta material cooling factor.
-
-		Parameters
-		----------
-		t : float
-			The time passed from magnetar formation in s
-		E : float
-			The projectile energy Eh as viewed from target rest coordinates in GeV
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic particle
-		b : float, optional
-			The relativistic velocity fraction
-		M : float, optional
-			The total ejecta mass in solar masses
-		D : bool, optional
-			The option to consider ejecta size for cooling, assumed to be infinite if `False`
-
-		Returns
-		-------
-			The unitless ejecta material cooling factor
-		'''
-		n = self.number_density(t, b, M)
-		if D is True:
-			d = self.ejecta_radius(t, b)
-			return hadron_proton_cooling_factor(E, n, h, d)
-		else:
-			return hadron_proton_cooling_factor(E, n, h)
-
 	def cooling_factor(self, t, E, h, b = 1e-1, M = 1e1, D = False):
 		'''
 		Returns the ejecta material cooling factor.
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
-		E : float
+		E : array_like
 			The projectile energy Eh as viewed from target rest coordinates in GeV
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic particle
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic particle, species codes broadcast against `t` and `E`
 		b : float, optional
 			The relativistic velocity fraction
 		M : float, optional
@@ -278,15 +282,17 @@ class magnetar:
 		-------
 			The unitless ejecta material cooling factor
 		'''
-		return np.vectorize(self._cooling_factor)(t, E, h, b, M, D)
+		n = self.number_density(np.asarray(t, dtype=float), b, M)
+		d = self.ejecta_radius(np.asarray(t, dtype=float), b) if D is True else None
+		return hadron_proton_cooling_factor(E, n, h, d)
 
-	def _optical_depth(self, t, f = 1e-1, b = 1e-1, M = 1e1):
+	def optical_depth(self, t, f = 1e-1, b = 1e-1, M = 1e1):
 		'''
 		Returns the ejecta material proton effective optical depth.
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
 		f : float, optional
 			The efficiency fraction of potential drop acceleration
@@ -299,44 +305,24 @@ class magnetar:
 		-------
 			The unitless ejecta material proton effective optical depth
 		'''
+		t = np.asarray(t, dtype=float)
 		Ep = self.E(t, f)
 		n = self.number_density(t, b, M)
 		d = self.ejecta_radius(t, b)
 		return proton_proton_optical_depth(Ep, n, d)
 
-	def optical_depth(self, t, f = 1e-1, b = 1e-1, M = 1e1):
-		'''
-		Returns the ejecta material proton effective optical depth.
-
-		Parameters
-		----------
-		t : float
-			The time passed from magnetar formation in s
-		f : float, optional
-			The efficiency fraction of potential drop acceleration
-		b : float, optional
-			The relativistic velocity fraction
-		M : float, optional
-			The total ejecta mass in solar masses
-
-		Returns
-		-------
-			The unitless ejecta material proton effective optical depth
-		'''
-		return np.vectorize(self._optical_depth)(t, f, b, M)
-
 	def collision_factor(self, t, E, h, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False):
 		'''
 		Returns the ejecta material combined attenuation factor.
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
-		E : float
+		E : array_like
 			The projectile energy Eh as viewed from target rest coordinates in GeV
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic particle
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic particle, species codes broadcast against `t` and `E`
 		f : float, optional
 			The efficiency fraction of potential drop acceleration
 		b : float, optional
@@ -357,18 +343,18 @@ class magnetar:
 		else:
 			return cf
 
-	def _hadron_spectrum(self, t, E, h, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100):
+	def hadron_spectrum(self, t, E, h, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False):
 		'''
-		Returns the hadron production spectrum from injection of protons.
+		Returns the hadron spectrum from injection of protons.
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
-		E : float
-			The projectile energy Eh as viewed from target rest coordinates in GeV
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic particle
+		E : array_like
+			The energy Eh as viewed from target rest coordinates in GeV
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic particle, species codes broadcast against `t` and `E`
 		f : float, optional
 			The efficiency fraction of potential drop acceleration
 		b : float, optional
@@ -377,46 +363,49 @@ class magnetar:
 			The total ejecta mass in solar masses
 		D : bool, optional
 			The option to consider ejecta size for cooling, assumed to be infinite if `False`
+		O : bool, optional
+			The option to include an effective optical depth, ignored if `False`
 		N : int, optional
 			The number of steps for integration accuracy
+		T : bool, optional
+			The option to look up charmed hadron production in cached interpolation tables
 
 		Returns
 		-------
 			The hadron production spectrum from injection of protons in 1 / (GeV s)
 		'''
+		i = sp.code(h, sp.HADRONS)
+		t, E, i = np.broadcast_arrays(np.asarray(t, dtype=float), np.asarray(E, dtype=float), i)
 		Ep = self.E(t, f)
 		x = E / Ep
-		match h.lower():
-			case 'pi':
-				prod = meson_production(x, Ep, h)
-			case 'k':
-				prod = meson_production(x, Ep, h)
-			case 'd0':
-				prod = charmed_hadron_production(x, Ep, h, N)
-			case 'd+':
-				prod = charmed_hadron_production(x, Ep, h, N)
-			case 'd+s':
-				prod = charmed_hadron_production(x, Ep, h, N)
-			case 'lam+c':
-				prod = charmed_hadron_production(x, Ep, h, N)
-			case _:
-				raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `pi`, `k`, `d0`, `d+`, `d+s` or `lam+c` instead')
+		if T:
+			prod = np.empty(x.shape)
+			c = np.isin(i, sp.CHARMED)
+			for k in np.unique(i[c]):
+				sel = i == k
+				prod[sel] = tabulated_charmed_hadron_production(x[sel], Ep[sel], k, N)
+			prod[~c] = hadron_production(x[~c], Ep[~c], i[~c], N)
+		else:
+			prod = hadron_production(x, Ep, i, N)
 		sig = self.proton_spectrum_prefactor(t)
-		f = self.collision_factor(t, E, h, f, b, M, D, O)
+		f = self.collision_factor(t, E, i, f, b, M, D, O)
 		return prod * sig * f
 
-	def hadron_spectrum(self, t, E, h, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100):
+	def hadron_spectra(self, t, E, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False, S = True):
 		'''
-		Returns the hadron spectrum from injection of protons.
+		Returns the hadron spectra of all types from injection of protons in one pass.
+
+		The proton energy, spectrum prefactor, shell density and radius and optical depth depend on time
+		only and are computed once per time column and shared by all species and energies. The spectra
+		without optical depth are kept per grid and parameter set, so that a repeated call differing in
+		`O` only costs a multiplication.
 
 		Parameters
 		----------
-		t : float
+		t : array_like
 			The time passed from magnetar formation in s
-		E : float
-			The energy Eh as viewed from target rest coordinates in GeV
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic particle
+		E : array_like
+			The energy Eh as viewed from target rest coordinates in GeV, broadcast against `t`
 		f : float, optional
 			The efficiency fraction of potential drop acceleration
 		b : float, optional
@@ -429,17 +418,338 @@ class magnetar:
 			The option to include an effective optical depth, ignored if `False`
 		N : int, optional
 			The number of steps for integration accuracy
+		T : bool, optional
+			The option to look up charmed hadron production in cached interpolation tables
+		S : bool, optional
+			The option to keep the spectra without optical depth for repeated calls, least recently used
+			spectra are dropped beyond `SPECTRA_BYTES` in total
 
 		Returns
 		-------
-			The hadron production spectrum from injection of protons in 1 / (GeV s)
+			The hadron production spectra from injection of protons in 1 / (GeV s), stacked in the order of `species.HADRONS`
+		'''
+		t = np.asarray(t, dtype=float)
+		E = np.asarray(E, dtype=float)
+		Ep = self.E(t, f)
+		n = self.number_density(t, b, M)
+		d = self.ejecta_radius(t, b)
+		par = tuple((np.shape(v), np.asarray(v, dtype=float).tobytes()) for v in (f, b, M))
+		key = (t.shape, t.tobytes(), E.shape, E.tobytes(), par, bool(D), N, bool(T)) if S else None
+		spec = self._spectra.get(key) if S else None
+		if spec is not None:
+			self._spectra.move_to_end(key)
+		else:
+			x = E / Ep
+			H = sp.HADRONS.reshape((-1,) + (1,) * x.ndim)
+			if T:
+				prod = tabulated_stacked_hadron_production(x, Ep, sp.HADRONS, N)
+			else:
+				prod = stacked_hadron_production(x, Ep, sp.HADRONS, N)
+			cf = hadron_proton_cooling_factor(E, n, H, d if D is True else None)
+			spec = prod * (self.proton_spectrum_prefactor(t) * cf)
+			if S:
+				self._spectra[key] = spec
+				while sum(v.nbytes for v in self._spectra.values()) > SPECTRA_BYTES:
+					self._spectra.popitem(last=False)
+		if O:
+			return spec * proton_proton_optical_depth(Ep, n, d)
+		else:
+			return spec.copy() if S else spec
+
+
+class magnetar_ensemble:
+	'''
+	Collects parameters and methods of many magnetars as arrays for evaluation in one broadcast pass.
+
+	All parameters are stored along a leading member axis followed by two unit axes, so that methods
+	shared with the magnetar class evaluate times and energies broadcast against the trailing two axes
+	for all members at once.
+
+	Attributes
+	----------
+	R : ndarray
+		The stellar radii in cm
+	B : ndarray
+		The polar magnetic field strengths in G
+	o : ndarray
+		The initial angular frequencies in rad / s
+	chi : ndarray
+		The relative dipole tilt to rotational axis angles in rad
+	I : ndarray
+		The moments of inertia in g * cm**2
+	m : ndarray
+		The global magnetosphere models
+	mu : ndarray
+		The magnetic moments in erg / G
+	tsd : ndarray
+		The spindown times in s
+	lum : ndarray
+		The initital luminosities in erg / s
+	c : float
+		The vacuum speed of light in cm / s
+	e : float
+		The elementary charge in esu
+
+	Methods
+	-------
+	__init__
+		Constructs all attributes of the magnetar ensemble class
+
+	__len__
+		Returns the number of members
+
+	__getitem__
+		Returns a single member as magnetar object or a selection of members as ensemble
+
+	__str__
+		Defines string output for printing the magnetar ensemble object
+
+	L, E, proton_spectrum_prefactor, ejecta_radius, number_density, cooling_factor, optical_depth, collision_factor, hadron_spectra
+		As for the magnetar class, with a leading member axis
+
+	neutrino_spectra
+		Returns the neutrino spectra of all types from decay of all hadron spectra
+
+	'''
+
+	__slots__ = ('R', 'B', 'o', 'chi', 'I', 'm', 'mu', 'tsd', 'lum', 'c', 'e', '_spectra')
+
+	def __init__(self, R = 1e6, B = 1e15, o = 1e4, chi = 95e-2, I = 1e45, m = 'force free'):
+		'''
+		Constructs all attributes of the magnetar ensemble class, broadcasting all parameters to one dimension.
+
+		Parameters
+		----------
+		R : array_like, optional
+			The stellar radii in cm
+		B : array_like, optional
+			The polar magnetic field strengths in G
+		o : array_like, optional
+			The initial angular frequencies in rad / s
+		chi : array_like, optional
+			The relative dipole tilt to rotational axis angles in rad
+		I : array_like, optional
+			The moments of inertia in g * cm**2
+		m : {'force free', 'vacuum'} or array_like of str, optional
+			The global magnetosphere models
+		'''
+		R, B, o, chi, I, m = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (R, B, o, chi, I)), np.atleast_1d(np.char.lower(np.asarray(m, dtype=str))))
+		if R.ndim != 1:
+			raise ValueError(f'parameters must broadcast to one dimension, got shape {R.shape}')
+		bad = ~np.isin(m, ('force free', 'vacuum'))
+		if bad.any():
+			raise ValueError(f'`{m[bad][0]}` is not a valid magnetosphere model, use `force free` or `vacuum` instead')
+		u = (-1, 1, 1)
+		self.R = R.reshape(u)
+		self.B = B.reshape(u)
+		self.o = o.reshape(u)
+		self.chi = chi.reshape(u)
+		self.I = I.reshape(u)
+		self.m = m.copy()
+		c = 2.99792458e10
+		e = 4.80320471e-10
+		mu = self.B * self.R**3 / 2
+		self.mu = mu
+		self.c = c
+		self.e = e
+		K = np.where(m.reshape(u) == 'vacuum', 2 * mu**2 * np.sin(self.chi)**2 / (3 * c**3), mu**2 * (1 + np.sin(self.chi)**2) / c**3)
+		self.tsd = self.I / (2 * K * self.o**2)
+		self.lum = K * self.o**4
+		self._spectra = collections.OrderedDict()
+
+	def __len__(self):
+		'''Returns the number of members.'''
+		return len(self.m)
+
+	def __getitem__(self, i):
+		'''
+		Returns a single member as magnetar object or a selection of members as ensemble.
+
+		Parameters
+		----------
+		i : int, slice or array_like
+			The member index or indices
+
+		Returns
+		-------
+		magnetar or magnetar_ensemble
+			The selected members
+		'''
+		if isinstance(i, (int, np.integer)):
+			return magnetar(self.R[i, 0, 0], self.B[i, 0, 0], self.o[i, 0, 0], self.chi[i, 0, 0], self.I[i, 0, 0], str(self.m[i]))
+		return magnetar_ensemble(self.R[i, 0, 0], self.B[i, 0, 0], self.o[i, 0, 0], self.chi[i, 0, 0], self.I[i, 0, 0], self.m[i])
+
+	def __str__(self):
+		'''Defines string output for printing the magnetar ensemble object.'''
+		str1 = f'# Magnetar Ensemble:\n#     N = {len(self)}\n'
+		str2 = ''.join(f'#     {k} = {getattr(self, k).min():.3} - {getattr(self, k).max():.3}\n' for k in ('R', 'B', 'o', 'chi', 'I', 'tsd', 'lum'))
+		return str1 + str2.rstrip('\n')
+
+	L = magnetar.L
+	E = magnetar.E
+	proton_spectrum_prefactor = magnetar.proton_spectrum_prefactor
+	ejecta_radius = magnetar.ejecta_radius
+	number_density = magnetar.number_density
+	cooling_factor = magnetar.cooling_factor
+	optical_depth = magnetar.optical_depth
+	collision_factor = magnetar.collision_factor
+	hadron_spectra = magnetar.hadron_spectra
+
+	def neutrino_spectra(self, t, Eh, Enu, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False):
+		'''
+		Returns the neutrino spectra of all types from decay of all hadron spectra.
+
+		Parameters
+		----------
+		t : array_like
+			The one dimensional time axis in s
+		Eh : array_like
+			The one dimensional ascending hadron energy axis in GeV
+		Enu : array_like
+			The one dimensional ascending neutrino energy axis in GeV
+		f : float, optional
+			The efficiency fraction of potential drop acceleration
+		b : float or array_like, optional
+			The relativistic velocity fraction, per member of shape (members, 1, 1)
+		M : float or array_like, optional
+			The total ejecta mass in solar masses, per member of shape (members, 1, 1)
+		D : bool, optional
+			The option to consider ejecta size for cooling, assumed to be infinite if `False`
+		O : bool, optional
+			The option to include an effective optical depth, ignored if `False`
+		N : int, optional
+			The number of steps for integration accuracy
+		T : bool, optional
+			The option to look up charmed hadron production in cached interpolation tables
+
+		Returns
+		-------
+		ndarray
+			The neutrino spectra in 1 / (GeV s) of shape (hadrons, members, len(Enu), len(t))
 		'''
-		return np.vectorize(self._hadron_spectrum)(t, E, h, f, b, M, D, O, N)
+		t = np.asarray(t, dtype=float)
+		Eh = np.asarray(Eh, dtype=float)
+		had = self.hadron_spectra(t[None, :], Eh[:, None], f, b, M, D, O, N, T, S = False)
+		eh = energy_bin_edges(Eh)
+		enu = energy_bin_edges(np.asarray(Enu, dtype=float))
+		return np.stack([np.moveaxis(hadron_decay_operator(enu, eh, i) @ np.moveaxis(had[i], 1, 0), 0, 1) for i in sp.HADRONS])
+
+
+_index = {}
+
+
+def _windows(W, t):
+	'''
+	Returns time windows as array clipped to the time axis.
+
+	Parameters
+	----------
+	W : sequence of tuple of float
+		The lower and upper temporal bounds of integration in s
+	t : ndarray
+		The ascending time axis in s
+
+	Returns
+	-------
+	ndarray
+		The windows of shape (windows, 2)
+	'''
+	W = np.asarray(W, dtype=float).reshape(-1, 2)
+	if np.any(W[:, 0] > W[:, 1]):
+		raise ValueError(f'lower bounds of `W` must not exceed upper bounds, got {W[W[:, 0] > W[:, 1]][0]}')
+	if np.any((W < t[0]) | (W > t[-1])):
+		warn(f'time windows are clipped to the time axis from {t[0]:.3} to {t[-1]:.3} s', stacklevel=3)
+	return np.clip(W, t[0], t[-1])
+
+
+def cumulative_time_integral(S, t, I0 = 0.0):
+	'''
+	Returns the cumulative trapezoid integral of spectra along time.
+
+	Parameters
+	----------
+	S : array_like
+		The spectra with time along the last axis
+	t : array_like
+		The ascending time axis in s
+	I0 : array_like, optional
+		The integral at the first time, broadcast against all but the last axis of `S`
+
+	Returns
+	-------
+	ndarray
+		The integrals from the first time to every time, of the same shape as `S`
+	'''
+	S = np.asarray(S, dtype=float)
+	t = np.asarray(t, dtype=float)
+	I0 = np.broadcast_to(np.asarray(I0, dtype=float), S.shape[:-1])[..., None]
+	return np.concatenate((I0, I0 + np.cumsum(0.5 * (S[..., 1:] + S[..., :-1]) * np.diff(t), axis=-1)), axis=-1)
+
+
+def time_integral_at(C, S, t, x):
+	'''
+	Returns cumulative time integrals at arbitrary times within the time axis.
+
+	Spectra are interpolated linearly within the cell containing each time, consistent with the
+	trapezoid rule, so integrals over windows ending between grid points include their partial cells.
+
+	Parameters
+	----------
+	C : ndarray
+		The cumulative time integrals as returned by `cumulative_time_integral`
+	S : ndarray
+		The spectra with time along the last axis
+	t : ndarray
+		The ascending time axis in s
+	x : array_like
+		The times in s, clipped to the time axis
+
+	Returns
+	-------
+	ndarray
+		The integrals from the first time to `x`, of shape (..., len(x))
+	'''
+	x = np.clip(np.atleast_1d(np.asarray(x, dtype=float)), t[0], t[-1])
+	j = np.clip(np.searchsorted(t, x, side='right') - 1, 0, len(t) - 2)
+	h = x - t[j]
+	Sx = S[..., j] + h / (t[j + 1] - t[j]) * (S[..., j + 1] - S[..., j])
+	return C[..., j] + 0.5 * (S[..., j] + Sx) * h
+
+
+def time_integral_index(path):
+	'''
+	Returns the time axis, spectra and cumulative time integrals of a stored table.
+
+	The cumulative integrals of the most recently used table are cached until it is modified, so that
+	integrals over any number of windows follow from `time_integral_at` at two times per window.
+
+	Parameters
+	----------
+	path : string
+		The path of a stored table with time along the last axis without file extension
+
+	Returns
+	-------
+	ndarray
+		The time axis in s
+	ndarray
+		The tabulated spectra
+	ndarray
+		The cumulative time integrals
+	'''
+	key = (os.path.abspath(path), os.path.getmtime(f'{path}.npy'))
+	if key not in _index:
+		ds = st.dataset(path)
+		t = ds.axis('time')
+		S = np.asarray(ds)
+		_index.clear()
+		_index[key] = (t, S, cumulative_time_integral(S, t))
+	return _index[key]
 
 
-def magnetar_hadron_spectrum(mag, reg, Kt = 500, KE = 100, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100):
+def magnetar_hadron_spectrum(mag, reg, Kt = 500, KE = 100, f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False):
 	'''
-	Prints calculated hadron spectra for all types to tabulated text files.
+	Saves calculated hadron spectra for all types to the binary store.
 
 	Parameters
 	----------
@@ -463,6 +773,8 @@ def magnetar_hadron_spectrum(mag, reg, Kt = 500, KE = 100, f = 1e-1, b = 1e-1, M
 		The option to include an effective optical depth, ignored if `False`
 	N : int, optional
 		The number of steps for integration accuracy
+	T : bool, optional
+		The option to look up charmed hadron production in cached interpolation tables
 
 	Returns
 	-------
@@ -471,57 +783,68 @@ def magnetar_hadron_spectrum(mag, reg, Kt = 500, KE = 100, f = 1e-1, b = 1e-1, M
 	start = time.perf_counter()
 	t = np.logspace(1, 8, Kt)
 	E = np.logspace(5, 12, KE)
-	with open(f'{reg}/hadrons/pi.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'pi', f, b, M, D, O, N)
-		file.write(f'# `pi` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
-	with open(f'{reg}/hadrons/K.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'k', f, b, M, D, O, N)
-		file.write(f'# `K` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
-	with open(f'{reg}/hadrons/D0.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'd0', f, b, M, D, O, N)
-		file.write(f'# `D0` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
-	with open(f'{reg}/hadrons/Dplus.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'd+', f, b, M, D, O, N)
-		file.write(f'# `D+` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
-	with open(f'{reg}/hadrons/DplusS.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'd+s', f, b, M, D, O, N)
-		file.write(f'# `D+s` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
-	with open(f'{reg}/hadrons/LAMplusC.txt', 'w') as file:
-		spec = mag.hadron_spectrum(t[None, :], E[:, None], 'lam+c', f, b, M, D, O, N)
-		file.write(f'# `Lam+c` Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, spec)
+	spec = mag.hadron_spectra(t[None, :], E[:, None], f, b, M, D, O, N, T)
+	end = time.perf_counter()
+	axes = [('species', '', [sp.FILES[i] for i in sp.HADRONS]), ('energy', 'GeV', E), ('time', 's', t)]
+	st.save(f'{reg}/hadrons', spec, axes, '1/(GeVs)', 'Hadron Spectrum', f'{mag}', elapsed = end - start)
+
+
+def magnetar_adaptive_hadron_spectrum(mag, reg, tol = 5e-3, Kt = 15, KE = 15, W = ((1e3, 1e4), (1e4, 1e5), (1e3, 1e7)), f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False):
+	'''
+	Saves hadron spectra for all types on an adaptively refined grid to the binary store.
+
+	The time and energy axes span the same ranges as for `magnetar_hadron_spectrum` and are refined
+	from `Kt` and `KE` logarithmic points, wherever log-log interpolation or the trapezoid time integral
+	deviates by more than `tol`. The time integration bounds `W` are included, so that integrals over
+	them need no interpolation and are never dropped when well interpolated lines are removed after
+	refinement. The grid is non-uniform, with the interpolation scheme, tolerance and number of
+	evaluations kept in the metadata block.
+
+	Parameters
+	----------
+	mag : magnetar
+		The magnetar object of which respective methods are used
+	reg : string
+		The directory string to which files are saved
+	tol : float, optional
+		The requested relative deviation of interpolated spectra and time integrals
+	Kt : int, optional
+		The number of initial points in time
+	KE : int, optional
+		The number of initial energy values
+	W : sequence of tuple of float, optional
+		The lower and upper temporal bounds of integration in s included in the time axis
+	f : float, optional
+		The efficiency fraction of potential drop acceleration
+	b : float, optional
+		The relativistic velocity fraction
+	M : float, optional
+		The total ejecta mass in solar masses
+	D : bool, optional
+		The option to consider ejecta size for cooling, assumed to be infinite if `False`
+	O : bool, optional
+		The option to include an effective optical depth, ignored if `False`
+	N : int, optional
+		The number of steps for integration accuracy
+	T : bool, optional
+		The option to look up charmed hadron production in cached interpolation tables
+
+	Returns
+	-------
+		None
+	'''
+	start = time.perf_counter()
+	func = lambda t, E: mag.hadron_spectra(t, E, f, b, M, D, O, N, T, S = False)
+	t = np.unique(np.concatenate((np.logspace(1, 8, Kt), np.ravel(W))))
+	t, E, spec, n = ad.refine_grid(func, t, np.logspace(5, 12, KE), tol, R = (np.ravel(W), ()), full = True)
 	end = time.perf_counter()
-	with open(f'{reg}/hadrons/axes.txt', 'w') as file:
-		file.write(f'# Hadron Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}')
-		file.write(f'\n# Time / s (horizontal axis)\n')
-		np.savetxt(file, t, newline=' ')
-		file.write(f'\n# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, E, newline=' ')
-		file.write(f'\n# Elapsed Time / s\n')
-		file.write(f'# {end - start}')
+	axes = [('species', '', [sp.FILES[i] for i in sp.HADRONS]), ('energy', 'GeV', E), ('time', 's', t)]
+	st.save(f'{reg}/hadrons', spec, axes, '1/(GeVs)', 'Hadron Spectrum', f'{mag}', elapsed = end - start, interpolation = 'log-log linear', tolerance = tol, evaluations = n)
 
 
 def magnetar_neutrino_spectrum(mag, reg, K = 100):
 	'''
-	Prints calculated neutrino spectra for all types to tabulated text files.
+	Saves calculated neutrino spectra for all types to the binary store.
 
 	Parameters
 	----------
@@ -537,73 +860,24 @@ def magnetar_neutrino_spectrum(mag, reg, K = 100):
 		None
 	'''
 	start = time.perf_counter()
+	had = st.dataset(f'{reg}/hadrons')
+	x = had.axis('energy')
+	t = had.axis('time')
 	E = np.logspace(5, 12, K)
-	t = np.genfromtxt(f'{reg}/hadrons/axes.txt', skip_footer=1)
-	x = np.genfromtxt(f'{reg}/hadrons/axes.txt', skip_header=15)
-	d = np.diag(np.insert((x[1:] - x[:-1]), 0, 0.0))
-	with open(f'{reg}/neutrinos/pi.txt', 'w') as file:
-		file.write(f'# `pi` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/pi.txt')
-		dec = meson_decay_neutrinos(E[:, None], x[None, :], 'pi')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
-	with open(f'{reg}/neutrinos/K.txt', 'w') as file:
-		file.write(f'# `K` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/K.txt')
-		dec = meson_decay_neutrinos(E[:, None], x[None, :], 'k')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
-	with open(f'{reg}/neutrinos/D0.txt', 'w') as file:
-		file.write(f'# `D0` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/D0.txt')
-		dec = charmed_hadron_decay_neutrinos(E[:, None], x[None, :], 'd0')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
-	with open(f'{reg}/neutrinos/Dplus.txt', 'w') as file:
-		file.write(f'# `D+` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/Dplus.txt')
-		dec = charmed_hadron_decay_neutrinos(E[:, None], x[None, :], 'd+')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
-	with open(f'{reg}/neutrinos/DplusS.txt', 'w') as file:
-		file.write(f'# `D+s` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/DplusS.txt')
-		dec = charmed_hadron_decay_neutrinos(E[:, None], x[None, :], 'd+s')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
-	with open(f'{reg}/neutrinos/LAMplusC.txt', 'w') as file:
-		file.write(f'# `Lam+c` Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Time / s (horizontal axis)\n')
-		file.write(f'# Energy / GeV (vertical axis)\n')
-		had = np.genfromtxt(f'{reg}/hadrons/LAMplusC.txt')
-		dec = charmed_hadron_decay_neutrinos(E[:, None], x[None, :], 'lam+c')
-		spec = dec @ d @ had
-		np.savetxt(file, spec)
+	Enu = energy_bin_edges(E)
+	Eh = energy_bin_edges(x)
+	spec = np.stack([hadron_decay_operator(Enu, Eh, i) @ np.asarray(had.sel(species = sp.FILES[i])) for i in sp.HADRONS])
 	end = time.perf_counter()
-	with open(f'{reg}/neutrinos/axes.txt', 'w') as file:
-		file.write(f'# Neutrino Spectrum / 1/(GeVs) - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}')
-		file.write(f'\n# Time / s (horizontal axis)\n')
-		np.savetxt(file, t, newline=' ')
-		file.write(f'\n# Energy / GeV (vertical axis)\n')
-		np.savetxt(file, E, newline=' ')
-		file.write(f'\n# Elapsed Time / s\n')
-		file.write(f'# {end - start}')
-
-
-def magnetar_integrated_neutrino_spectrum(mag, reg):
+	axes = [('species', '', had.axis('species')), ('energy', 'GeV', E), ('time', 's', t)]
+	st.save(f'{reg}/neutrinos', spec, axes, '1/(GeVs)', 'Neutrino Spectrum', f'{mag}', elapsed = end - start)
+
+
+def magnetar_integrated_neutrino_spectrum(mag, reg, W = ((1e3, 1e4), (1e4, 1e5), (1e3, 1e7))):
 	'''
-	Prints integrated neutrino spectra for all types to tabulated text files.
+	Saves integrated neutrino spectra for all types to the binary store.
+
+	Integrals follow from the cumulative time integrals of the neutrino table at the window bounds,
+	so that any number of windows costs one lookup per bound.
 
 	Parameters
 	----------
@@ -611,140 +885,126 @@ def magnetar_integrated_neutrino_spectrum(mag, reg):
 		The magnetar object of which respective methods are used
 	reg : string
 		The directory string to which files are saved
-	ta : float
-		The lower temproal bound of integration
-	tb : float
-		The upper temproal bound of integration
+	W : sequence of tuple of float, optional
+		The lower and upper temporal bounds of integration in s, interpolated within cells
 
 	Returns
 	-------
 		None
 	'''
-	t = np.genfromtxt(f'{reg}/neutrinos/axes.txt', skip_footer=1)
-	str1 = '(1e3 - 1e3)'
-	str2 = '(1e4 - 1e5)'
-	str3 = '(1e3 - 1e7)'
-	con1 = (t > 1e3) & (t < 1e4)
-	con2 = (t > 1e4) & (t < 1e5)
-	con3 = (t > 1e3) & (t < 1e7)
-	t1 = t[con1]
-	t2 = t[con2]
-	t3 = t[con3]
-	E = np.genfromtxt(f'{reg}/neutrinos/axes.txt', skip_header=15)
-	with open(f'{reg}/integrate/pi.txt', 'w') as file:
-		file.write(f'# `pi` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/pi.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/integrate/K.txt', 'w') as file:
-		file.write(f'# `K` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/K.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/integrate/D0.txt', 'w') as file:
-		file.write(f'# `D0` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/D0.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/integrate/Dplus.txt', 'w') as file:
-		file.write(f'# `D+` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/Dplus.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/integrate/DplusS.txt', 'w') as file:
-		file.write(f'# `D+s` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/DplusS.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/integrate/LAMplusC.txt', 'w') as file:
-		file.write(f'# `Lam+c` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'{mag}\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum {str1} / 1/GeV ')
-		file.write(f'# Spectrum {str2} / 1/GeV ')
-		file.write(f'# Spectrum {str3} / 1/GeV\n')
-		neu = np.genfromtxt(f'{reg}/neutrinos/LAMplusC.txt')
-		y1 = neu[:, con1]
-		y2 = neu[:, con2]
-		y3 = neu[:, con3]
-		spec1 = np.trapezoid(y1, t1, axis=1)
-		spec2 = np.trapezoid(y2, t2, axis=1)
-		spec3 = np.trapezoid(y3, t3, axis=1)
-		for row in zip(E, spec1, spec2, spec3):
-			file.write(r'{0}   {1}   {2}   {3}'.format(*row))
-			file.write(f'\n')
-
-
-mag = magnetar(B = 10**14.5)
-
-
-magnetar_hadron_spectrum(mag, 'code/tabulate/magnetar/without', D = False, O = False)
-magnetar_neutrino_spectrum(mag, 'code/tabulate/magnetar/without')
-magnetar_integrated_neutrino_spectrum(mag, 'code/tabulate/magnetar/without')
-
-magnetar_hadron_spectrum(mag, 'code/tabulate/magnetar/with', D = False, O = True)
-magnetar_neutrino_spectrum(mag, 'code/tabulate/magnetar/with')
-magnetar_integrated_neutrino_spectrum(mag, 'code/tabulate/magnetar/with')
-
-
-print(f'\n# Default\n{magnetar()}\n')
+	t, S, C = time_integral_index(f'{reg}/neutrinos')
+	neu = st.dataset(f'{reg}/neutrinos')
+	W = _windows(W, t)
+	spec = time_integral_at(C, S, t, W[:, 1]) - time_integral_at(C, S, t, W[:, 0])
+	axes = [('species', '', neu.axis('species')), ('energy', 'GeV', neu.axis('energy')), ('window', 's', W)]
+	st.save(f'{reg}/integrate', spec, axes, '1/GeV', 'Integrated Spectrum', f'{mag}')
+
+
+def magnetar_streamed_neutrino_spectrum(mag, reg, Kt = 500, KE = 100, K = 100, C = 50, W = ((1e3, 1e4), (1e4, 1e5), (1e3, 1e7)), f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False, P = False):
+	'''
+	Saves integrated neutrino spectra for all types from a single pass over chunks in time.
+
+	Hadron columns of `C` points in time are computed, folded with the decay transfer matrices and
+	integrated over the time windows on the fly, so that peak memory is bounded by the chunk size. The
+	hadron and neutrino tables are only kept and saved as with the separate functions if `P` is `True`.
+
+	Parameters
+	----------
+	mag : magnetar
+		The magnetar object of which respective methods are used
+	reg : string
+		The directory string to which files are saved
+	Kt : int, optional
+		The number of points in time
+	KE : int, optional
+		The number of hadron energy values
+	K : int, optional
+		The number of neutrino energy values
+	C : int, optional
+		The number of points in time per chunk
+	W : sequence of tuple of float, optional
+		The lower and upper temporal bounds of integration in s, interpolated within cells
+	f : float, optional
+		The efficiency fraction of potential drop acceleration
+	b : float, optional
+		The relativistic velocity fraction
+	M : float, optional
+		The total ejecta mass in solar masses
+	D : bool, optional
+		The option to consider ejecta size for cooling, assumed to be infinite if `False`
+	O : bool, optional
+		The option to include an effective optical depth, ignored if `False`
+	N : int, optional
+		The number of steps for integration accuracy
+	T : bool, optional
+		The option to look up charmed hadron production in cached interpolation tables
+	P : bool, optional
+		The option to also save the full hadron and neutrino tables
+
+	Returns
+	-------
+	ndarray
+		The integrated neutrino spectra in 1 / GeV of shape (hadrons, `K`, windows)
+	'''
+	if C < 1:
+		raise ValueError(f'`C` must be positive, got {C}')
+	start = time.perf_counter()
+	t = np.logspace(1, 8, Kt)
+	Eh = np.logspace(5, 12, KE)
+	E = np.logspace(5, 12, K)
+	W = _windows(W, t)
+	dec = [hadron_decay_operator(energy_bin_edges(E), energy_bin_edges(Eh), i) for i in sp.HADRONS]
+	x = W.ravel()
+	Ix = np.zeros((len(sp.HADRONS), K, len(x)))
+	done = np.zeros(len(x), dtype=bool)
+	if P:
+		had = np.empty((len(sp.HADRONS), KE, Kt))
+		neu = np.empty((len(sp.HADRONS), K, Kt))
+	tp = None
+	Ip = 0.0
+	for j in range(0, Kt, C):
+		tc = t[j:j + C]
+		hc = mag.hadron_spectra(tc[None, :], Eh[:, None], f, b, M, D, O, N, T, S = False)
+		nc = np.stack([dec[i] @ hc[i] for i in sp.HADRONS])
+		if P:
+			had[:, :, j:j + C] = hc
+			neu[:, :, j:j + C] = nc
+		if tp is not None:
+			tc = np.concatenate(([tp], tc))
+			nc = np.concatenate((yp[:, :, None], nc), axis=2)
+		if len(tc) > 1:
+			Cc = cumulative_time_integral(nc, tc, Ip)
+			m = ~done & (x <= tc[-1])
+			Ix[:, :, m] = time_integral_at(Cc, nc, tc, x[m])
+			done |= m
+			Ip = Cc[:, :, -1]
+		tp, yp = tc[-1], nc[:, :, -1]
+	spec = Ix[:, :, 1::2] - Ix[:, :, ::2]
+	end = time.perf_counter()
+	h = ('species', '', [sp.FILES[i] for i in sp.HADRONS])
+	if P:
+		st.save(f'{reg}/hadrons', had, [h, ('energy', 'GeV', Eh), ('time', 's', t)], '1/(GeVs)', 'Hadron Spectrum', f'{mag}', elapsed = end - start)
+		st.save(f'{reg}/neutrinos', neu, [h, ('energy', 'GeV', E), ('time', 's', t)], '1/(GeVs)', 'Neutrino Spectrum', f'{mag}', elapsed = end - start)
+	st.save(f'{reg}/integrate', spec, [h, ('energy', 'GeV', E), ('window', 's', W)], '1/GeV', 'Integrated Spectrum', f'{mag}')
+	return spec
+
+
+if __name__ == '__main__':
+	import code.cache as ca
+	import code.diffuse as df
+
+	mag = magnetar(B = 10**14.5)
+
+	reg = 'code/tabulate/magnetar/without'
+	ca.run(magnetar_hadron_spectrum, f'{reg}/hadrons', mag, reg, D = False, O = False)
+	ca.run(magnetar_neutrino_spectrum, f'{reg}/neutrinos', mag, reg, depends = [f'{reg}/hadrons'])
+	ca.run(magnetar_integrated_neutrino_spectrum, f'{reg}/integrate', mag, reg, depends = [f'{reg}/neutrinos'])
+	ca.run(df.diffuse_neutrino_flux, f'{reg}/diffuse', f'{reg}/integrate', f'{reg}/diffuse', depends = [f'{reg}/integrate'])
+
+	reg = 'code/tabulate/magnetar/with'
+	ca.run(magnetar_hadron_spectrum, f'{reg}/hadrons', mag, reg, D = False, O = True)
+	ca.run(magnetar_neutrino_spectrum, f'{reg}/neutrinos', mag, reg, depends = [f'{reg}/hadrons'])
+	ca.run(magnetar_integrated_neutrino_spectrum, f'{reg}/integrate', mag, reg, depends = [f'{reg}/neutrinos'])
+	ca.run(df.diffuse_neutrino_flux, f'{reg}/diffuse', f'{reg}/integrate', f'{reg}/diffuse', depends = [f'{reg}/integrate'])
+
+	print(f'\n# Default\n{magnetar()}\n')
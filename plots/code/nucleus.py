@@ -4,19 +4,21 @@ Functional implementation of nucleus module as described in the thesis document.
 	Functions
 	---------
 		nucleus_hadron_spectrum
-			Prints calculated hadron spectra for all types to tabulated text files
+			Saves calculated neutrino spectra for all types to the binary store
 
 '''
 import matplotlib.pyplot as plt
 import numpy as np
 
-import datetime
-
 from code.functional import *
+import code.parametrizations.species as sp
+import code.store as st
+import code.cache as ca
+import code.diffuse as df
 
-def nucleus_neutrino_spectrum(reg, n = 1e14, d =1e15):
+def nucleus_neutrino_spectrum(reg, n = 1e14, d =1e15, T = False, K = 100, F = False):
 	'''
-	Prints calculated hadron spectra for all types to tabulated text files.
+	Saves calculated neutrino spectra for all types to the binary store.
 
 	Parameters
 	----------
@@ -26,116 +28,44 @@ def nucleus_neutrino_spectrum(reg, n = 1e14, d =1e15):
 		The ionized hydrogen number density
 	d : float
 		The distance or accretion disk height
+	T : bool, optional
+		The option to look up charmed hadron production in cached interpolation tables
+	K : int, optional
+		The number of hadron and neutrino energy values
+	F : bool, optional
+		The option to evaluate production and decay as log energy convolutions, with K proton energy values
 
 	Returns
 	-------
 		None
 	'''
-	Ep = np.logspace(5, 12, 200)
-	dp = np.diag(np.insert((Ep[1:] - Ep[:-1]), 0, 0.0))
+	if F:
+		Ep = np.logspace(5, 12, K)
+		production = hadron_production_convolution
+		decay = hadron_decay_convolution
+	else:
+		Ep = np.logspace(5, 12, 200)
+		production = hadron_production_operator
+		decay = hadron_decay_operator
+	wp = np.insert((Ep[1:] - Ep[:-1]), 0, 0.0)
 	Sp = 1e30 / Ep**2
 	od = proton_proton_optical_depth(Ep, n, d)
 	Sp = od * Sp
-	Eh = np.logspace(5, 12, 1000)
-	dh = np.diag(np.insert((Eh[1:] - Eh[:-1]), 0, 0.0))
-	x = Eh[:, None] / Ep[None, :]
-	Enu = np.logspace(5, 12, 1000)
-	with open(f'{reg}/pi.txt', 'w') as file:
-		file.write(f'# `pi` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = meson_production(x, Ep, 'pi')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'pi', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = meson_decay_neutrinos(Enu[:, None], Eh[None, :], 'pi')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/K.txt', 'w') as file:
-		file.write(f'# `K` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = meson_production(x, Ep, 'k')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'k', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = meson_decay_neutrinos(Enu[:, None], Eh[None, :], 'k')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/D0.txt', 'w') as file:
-		file.write(f'# `D0` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = charmed_hadron_production(x, Ep, 'd0')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'd0', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = charmed_hadron_decay_neutrinos(Enu[:, None], Eh[None, :], 'd0')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/Dplus.txt', 'w') as file:
-		file.write(f'# `D+` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = charmed_hadron_production(x, Ep, 'd+')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'd+', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = charmed_hadron_decay_neutrinos(Enu[:, None], Eh[None, :], 'd+')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/DplusS.txt', 'w') as file:
-		file.write(f'# `D+s` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = charmed_hadron_production(x, Ep, 'd+s')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'd+s', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = charmed_hadron_decay_neutrinos(Enu[:, None], Eh[None, :], 'd+s')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
-	with open(f'{reg}/LAMplusC.txt', 'w') as file:
-		file.write(f'# `Lam+c` Integrated Spectrum / 1/GeV - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
-		file.write(f'# Nucleus:\n')
-		file.write(f'#     n = {n:.3} 1/cm**3\n')
-		file.write(f'#     d = {d:.3} cm\n')
-		file.write(f'# Energy / GeV ')
-		file.write(f'# Spectrum / 1/GeV\n')
-		Fph = charmed_hadron_production(x, Ep, 'lam+c')
-		Sh = Fph @ dp @ Sp
-		cf = hadron_proton_cooling_factor(Eh, n, 'lam+c', d)
-		Sh = np.nan_to_num(cf * Sh)
-		Fhnu = charmed_hadron_decay_neutrinos(Enu[:, None], Eh[None, :], 'lam+c')
-		Snu = Fhnu @ dh @ Sh
-		for row in zip(Enu, Snu):
-			file.write(r'{0}   {1}'.format(*row))
-			file.write(f'\n')
+	Eh = np.logspace(5, 12, K)
+	Enu = np.logspace(5, 12, K)
+	eh = energy_bin_edges(Eh)
+	enu = energy_bin_edges(Enu)
+	if T:
+		prod = tabulated_stacked_hadron_production
+	else:
+		prod = stacked_hadron_production
+	Sh = production(Eh, Ep, sp.HADRONS, wp, prod) @ Sp
+	cf = hadron_proton_cooling_factor(Eh[None, :], n, sp.HADRONS[:, None], d)
+	Sh = np.nan_to_num(cf * Sh)
+	Snu = np.stack([decay(enu, eh, i) @ Sh[i] for i in sp.HADRONS])
+	info = f'# Nucleus:\n#     n = {n:.3} 1/cm**3\n#     d = {d:.3} cm'
+	axes = [('species', '', [sp.FILES[i] for i in sp.HADRONS]), ('energy', 'GeV', Enu)]
+	st.save(f'{reg}/neutrinos', Snu, axes, '1/GeV', 'Integrated Spectrum', info)
 
 	print(f'\n# Default')
 	print(f'# Nucleus:')
@@ -143,4 +73,5 @@ def nucleus_neutrino_spectrum(reg, n = 1e14, d =1e15):
 	print(f'#     d = {d:.3} cm\n')
 
 
-nucleus_neutrino_spectrum('code/tabulate/nucleus/neutrinos')
+ca.run(nucleus_neutrino_spectrum, 'code/tabulate/nucleus/neutrinos', 'code/tabulate/nucleus')
+ca.run(df.diffuse_neutrino_flux, 'code/tabulate/nucleus/diffuse', 'code/tabulate/nucleus/neutrinos', 'code/tabulate/nucleus/diffuse', depends = ['code/tabulate/nucleus/neutrinos'])
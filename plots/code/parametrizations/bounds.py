@@ -0,0 +1,209 @@
+'''
+Handling of values outside of the valid range of parametrizations.
+
+All parametrizations check their kinematic bounds on whole arrays and report a single summary of
+the offending values per call. What happens to those cells is decided by a policy, either set for
+the module or passed to the parametrization.
+
+	mask
+		Sets invalid cells to zero and warns
+	clip
+		Evaluates cells outside of a fitted range at the nearest bound and warns, kinematically
+		forbidden cells are set to zero as with `mask`
+	raise
+		Raises a ValueError
+
+	Functions
+	---------
+	set_policy
+		Selects the default policy for out of bounds values
+
+	get_policy
+		Returns the default policy for out of bounds values
+
+	check
+		Applies the policy to values outside of their valid range
+
+	forbidden
+		Applies the policy to kinematically forbidden values, which are never clipped
+
+	report
+		Warns or raises about values outside of a fitted range without changing them
+
+'''
+import numpy as np
+from warnings import warn
+
+
+POLICIES = ('mask', 'clip', 'raise')
+
+_policy = {'name': 'mask'}
+
+
+def set_policy(p):
+	'''
+	Selects the default policy for out of bounds values.
+
+		Parameters
+		----------
+		p : {'mask', 'clip', 'raise'}
+			The policy used by parametrizations called without one
+
+		Returns
+		-------
+		string
+			The previous default policy
+
+		Raises
+		------
+		ValueError
+			If the policy is unknown
+	'''
+	old = _policy['name']
+	_policy['name'] = _resolve(p)
+	return old
+
+
+def get_policy():
+	'''Returns the default policy for out of bounds values.'''
+	return _policy['name']
+
+
+def _resolve(p):
+	'''Returns the lowercase policy name, the module default if `None`.'''
+	if p is None:
+		return _policy['name']
+	if p.lower() not in POLICIES:
+		raise ValueError(f'`{p.lower()}` is not a valid bounds policy, use `mask`, `clip` or `raise` instead')
+	return p.lower()
+
+
+def _bound(b, bad, default):
+	'''Returns a short string of the bound values at offending cells.'''
+	if b is None:
+		return default
+	b = np.unique(np.broadcast_to(b, bad.shape)[bad])
+	return f'{b[0]:.4g}' if b.size == 1 else f'{b.min():.4g}...{b.max():.4g}'
+
+
+def _summary(v, bad, name, lo, hi):
+	'''Returns the diagnostic message for all offending values of a single call.'''
+	return (f'{np.count_nonzero(bad)} of {bad.size} values of `{name}` are outside of bounds '
+		f'{_bound(lo, bad, "-inf")} to {_bound(hi, bad, "inf")}, ranging from {np.min(v[bad]):.4g} to {np.max(v[bad]):.4g}')
+
+
+def check(v, bad, name, lo = None, hi = None, p = None):
+	'''
+	Applies the policy to values outside of their valid range.
+
+		Parameters
+		----------
+		v : ndarray
+			The values to check
+		bad : ndarray of bool
+			The cells outside of the valid range, same shape as `v`
+		name : string
+			The variable name used in the diagnostic
+		lo : array_like, optional
+			The lower bound broadcast against `v`, unbounded if `None`
+		hi : array_like, optional
+			The upper bound broadcast against `v`, unbounded if `None`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy to apply, the module default if `None`
+
+		Returns
+		-------
+		ndarray
+			The values, clipped to the bounds by the `clip` policy
+		ndarray of bool
+			The cells to be set to zero, none unless the `mask` policy applies
+
+		Raises
+		------
+		ValueError
+			If any value is out of bounds under the `raise` policy
+	'''
+	p = _resolve(p)
+	if not np.any(bad):
+		return v, bad
+	msg = _summary(v, bad, name, lo, hi)
+	if p == 'raise':
+		raise ValueError(msg)
+	warn(msg, stacklevel=3)
+	if p == 'clip':
+		return np.clip(v, lo, hi), np.zeros(bad.shape, dtype=bool)
+	return v, bad
+
+
+def forbidden(v, bad, name, lo = None, hi = None, p = None):
+	'''
+	Applies the policy to kinematically forbidden values, which are never clipped.
+
+	Spectra vanish outside of their kinematic range, so the `clip` policy masks these cells as well.
+
+		Parameters
+		----------
+		v : ndarray
+			The values to check
+		bad : ndarray of bool
+			The cells outside of the kinematic range, same shape as `v`
+		name : string
+			The variable name used in the diagnostic
+		lo : array_like, optional
+			The lower bound broadcast against `v`, unbounded if `None`
+		hi : array_like, optional
+			The upper bound broadcast against `v`, unbounded if `None`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy to apply, the module default if `None`
+
+		Returns
+		-------
+		ndarray of bool
+			The cells to be set to zero
+
+		Raises
+		------
+		ValueError
+			If any value is out of bounds under the `raise` policy
+	'''
+	p = _resolve(p)
+	if not np.any(bad):
+		return bad
+	msg = _summary(v, bad, name, lo, hi)
+	if p == 'raise':
+		raise ValueError(msg)
+	warn(msg, stacklevel=3)
+	return bad
+
+
+def report(v, bad, name, lo = None, hi = None, p = None):
+	'''
+	Warns or raises about values outside of a fitted range without changing them.
+
+		Parameters
+		----------
+		v : ndarray
+			The values to check
+		bad : ndarray of bool
+			The cells outside of the fitted range, same shape as `v`
+		name : string
+			The variable name used in the diagnostic
+		lo : array_like, optional
+			The lower bound broadcast against `v`, unbounded if `None`
+		hi : array_like, optional
+			The upper bound broadcast against `v`, unbounded if `None`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy to apply, only `raise` changes the behaviour
+
+		Raises
+		------
+		ValueError
+			If any value is out of bounds under the `raise` policy
+	'''
+	p = _resolve(p)
+	if not np.any(bad):
+		return
+	msg = _summary(v, bad, name, lo, hi)
+	if p == 'raise':
+		raise ValueError(msg)
+	warn(msg, stacklevel=3)
@@ -13,6 +13,7 @@ Parametrization of decay and collision as described in the thesis document.
 import numpy as np
 
 import code.parametrizations.cross_sections as cr
+import code.parametrizations.species as sp
 
 
 def hadron_proton_cooling_factor(E, n, h, d = None):
@@ -21,63 +22,36 @@ def hadron_proton_cooling_factor(E, n, h, d = None):
 
 		Parameters
 		----------
-		E : float
+		E : array_like
 			The energy Eh as viewed from target rest coordinates in GeV
-		n : float
+		n : array_like
 			The nucleon number density in 1 / cm**3
-		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}
-			The incident hadron type
-		d : float, optional
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The incident hadron type, species codes broadcast against `E`
+		d : array_like, optional
 			The target field size, assumed to be infinite if `None`, in cm
 
 		Returns
 		-------
-		float
+		ndarray
 			The dimensionless cooling factor for hadrons scattered by protons
 	'''
-	M = 0.938
-	match h.lower():
-		case 'pi':
-			m   = 0.140
-			tau = 26.03e-9
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'pi') * 1e-24
-		case 'k':
-			m   = 0.494
-			tau = 12.38e-9
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'k') * 1e-24
-		case 'd0':
-			m   = 1.86
-			tau = 0.410e-12
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'k') * 1e-24
-		case 'd+':
-			m   = 1.87
-			tau = 1.033e-12
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'k') * 1e-24
-		case 'd+s':
-			m   = 1.97
-			tau = 0.501e-12
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'k') * 1e-24
-		case 'lam+c':
-			m   = 2.29
-			tau = 0.203e-12
-			s   = 2 * E * M + M**2 + m**2
-			sig = cr.inelastic_hadron_proton_scattering(s, 'k') * 1e-24
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `pi`, `k`, `d0`, `d+`, `d+s` or `lam+c` instead')
+	E = np.asarray(E, dtype=float)
+	i = sp.code(h, sp.HADRONS)
+	M = sp.m[sp.PROTON]
+	m = sp.m[i]
+	tau = sp.tau[i]
+	s = 2 * E * M + M**2 + m**2
+	sig = cr.cached_inelastic_hadron_proton_scattering(s, sp.proxy[i]) * 1e-24
 	kap = 0.8
 	c = 29979245800
 	tcool = 1 / (kap * sig * n * c)
 	tdec = tau * E / m
 	ddec = tdec * c
-	if d is not None and d < ddec:
-		dfree = tcool * c
-		return 1 - np.exp(- dfree / d)
-	return 1 - np.exp(- tcool / tdec)
+	if d is None:
+		return - np.expm1(- tcool / tdec)
+	dfree = tcool * c
+	return np.where(d < ddec, - np.expm1(- dfree / d), - np.expm1(- tcool / tdec))
 
 
 def proton_proton_optical_depth(E, n, d):
@@ -86,21 +60,22 @@ def proton_proton_optical_depth(E, n, d):
 
 		Parameters
 		----------
-		E : float
+		E : array_like
 			The energy Ep as viewed from target rest coordinates in GeV
-		n : float
+		n : array_like
 			The nucleon number density in 1 / cm**3
-		d : float
+		d : array_like
 			The target field size in cm
 
 		Returns
 		-------
-		float
+		ndarray
 			The dimensionless effective optical depth for protons hitting protons
 	'''
-	M = 0.938
+	E = np.asarray(E, dtype=float)
+	M = sp.m[sp.PROTON]
 	s = 2 * (E * M + M**2)
 	kap = 0.5
-	sig = cr.inelastic_hadron_proton_scattering(s, 'p') * 1e-24
+	sig = cr.cached_inelastic_hadron_proton_scattering(s, 'p') * 1e-24
 	dfree = 1 / (kap * sig * n)
 	return d / dfree
@@ -0,0 +1,402 @@
+'''
+Compiled counterparts of the parametrizations for the optional numba backend.
+
+Every function mirrors the signature and bounds policy of its NumPy original. Inputs are broadcast
+and flattened in Python, and a `nopython` kernel with a `parallel` loop evaluates all grid points.
+Compiled kernels are cached in `code/tabulate/cache/numba` unless `NUMBA_CACHE_DIR` is set, so only
+the first run pays for compilation. The directory is set on the numba configuration at import, so it
+also applies if numba was imported before. Species constants are passed to the kernels as arguments rather
+than read as globals, which numba would freeze into the cached machine code.
+
+	Functions
+	---------
+	hadron_proton_cooling_factor
+		Returns the cooling factor for hadrons scattered by protons
+
+	proton_proton_optical_depth
+		Returns the effective optical depth for protons hitting protons
+
+	total_hadron_proton_scattering
+		Returns the total hadron-proton scattering cross section
+
+	hadron_elastic_total_ratio
+		Returns the universal ratio of elastic to total hadron-proton cross section
+
+	inelastic_hadron_proton_scattering
+		Returns the inelastic hadron-proton scattering cross section
+
+	charm_quark_differential_production
+		Returns the charm quark differential cross section for production in proton-proton collisions
+
+	charmed_hadron_differential_production
+		Returns the charmed hadron differential cross section for production in proton-proton collisions
+
+	meson_production
+		Returns the proton-proton to pion or kaon singular production spectrum
+
+	meson_decay_neutrinos
+		Returns the pion or kaon to neutrino singular decay spectrum
+
+	charmed_hadron_production
+		Returns the proton-proton to charmed hadron singular production spectrum
+
+	charmed_hadron_decay_neutrinos
+		Returns the charmed hadron to neutrino singular decay spectrum
+
+	hadron_production
+		Returns the proton-proton to hadron singular production spectrum for any species
+
+	hadron_decay_neutrinos
+		Returns the hadron to neutrino singular decay spectrum for any species
+
+	stacked_hadron_production
+		Returns the proton-proton to hadron singular production spectra of several species in one pass
+
+	charmed_hadron_fragmentation_function
+		Returns the charmed hadrons from charm quarks fragmentation function
+
+'''
+import os
+import numba as nb
+import numpy as np
+
+import code.parametrizations.bounds as bd
+import code.parametrizations.cross_sections as cr
+import code.parametrizations.distribution_spectra as ds
+import code.parametrizations.species as sp
+
+if 'NUMBA_CACHE_DIR' not in os.environ:
+	nb.config.CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'tabulate', 'cache', 'numba')
+
+
+def _cross():
+	'''Returns the total cross section parameters of scattering projectiles passed to the kernels.'''
+	return sp.P, sp.R1, sp.R2, sp.sh
+
+
+def _flat(*args):
+	'''Returns the broadcast shape and contiguous flat copies of all arguments.'''
+	args = np.broadcast_arrays(*args)
+	return args[0].shape, [np.ascontiguousarray(a).ravel() for a in args]
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _total(s, j, P, R1, R2, sh):
+	H  = 0.272
+	n1 = 0.447
+	n2 = 0.5486
+	return H * np.log(s / sh[j])**2 + P[j] + R1[j] * (sh[j] / s)**n1 + R2[j] * (sh[j] / s)**n2
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _ratio(s):
+	A  = 1/2
+	g1 = 0.466
+	g2 = 0.0259
+	g3 = 0.00177
+	return A * np.tanh(g1 - g2 * np.log(s) + g3 * np.log(s)**2)
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _inelastic(s, j, P, R1, R2, sh):
+	return _total(s, j, P, R1, R2, sh) * (1 - _ratio(s))
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _fragmentation(z, i, Nf, eps):
+	return Nf[i] * z * (1 - z)**2 / ((1 - z)**2 + eps[i] * z)**2
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _convolution(x, i, a, b, n, k, N, Nf, eps):
+	acc = 0.0
+	for q in range(N):
+		z = x + (1 - x) * q / (N - 1)
+		r = np.log(x / z)
+		y = a * np.exp(b * r + n * np.log1p(- np.exp(k * r))) * _fragmentation(z, i, Nf, eps) / z
+		if q == 0 or q == N - 1:
+			y = y / 2
+		acc += y
+	return acc * (1 - x) / (N - 1)
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _threshold(x, E, i, m):
+	if m[i] > x * E:
+		return 0.0
+	return (1 - m[i] / (x * E))**(1/2)
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _meson(x, E, i, mass, F):
+	if x <= 0 or x >= 1:
+		return 0.0
+	m = mass[i]
+	C = 3.67 + 0.83 * np.log(E / 1e3) + 0.075 * np.log(E / 1e3)**2
+	B = 0.25 + C
+	a = 0.98 / np.sqrt(C)
+	r = 2.6 / np.sqrt(C)
+	u = 0.0 if m > x * E else (1 - m / (x * E))**(1/2)
+	xa = x**a
+	v = 1 - xa
+	w = 1 + r * xa * v
+	G = 4 * a * B * x**(a - 1) * (v / w)**4 * (1 / v + r * (1 - 2 * xa) / w) * u
+	return F[i] * G / E
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _meson_decay(y, Eh, i, L, f):
+	l = L[i]
+	if y > 1 - l:
+		return 0.0
+	return f[i] / (Eh * (1 - l))
+
+
+@nb.njit(cache=True, error_model='numpy')
+def _charm_decay(y, Eh, i, L, f):
+	l = L[i]
+	if y > 1 - l:
+		return 0.0
+	a = 1 - l
+	b = 1 - 2 * l
+	D = 1 - 8 * l - 12 * l**2 * np.log(l) + 8 * l**3 - l**4
+	F = (6 * b * a**2 - 4 * a**3 - 12 * l**2 * a + 12 * l**2 * y - 6 * b * y**2 + 4 * y**3 + 12 * l**2 * np.log((1 - y) / l)) / D
+	return f[i] * F / Eh
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _total_kernel(s, j, P, R1, R2, sh, out):
+	for q in nb.prange(s.size):
+		out[q] = _total(s[q], j[q], P, R1, R2, sh)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _ratio_kernel(s, out):
+	for q in nb.prange(s.size):
+		out[q] = _ratio(s[q])
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _inelastic_kernel(s, j, P, R1, R2, sh, out):
+	for q in nb.prange(s.size):
+		out[q] = _inelastic(s[q], j[q], P, R1, R2, sh)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _fragmentation_kernel(z, i, Nf, eps, out):
+	for q in nb.prange(z.size):
+		out[q] = _fragmentation(z[q], i[q], Nf, eps)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _charm_quark_kernel(x, a, b, n, k, out):
+	for q in nb.prange(x.size):
+		out[q] = a[q] * x[q]**b[q] * (1 - x[q]**k)**n[q]
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _charm_kernel(x, E, i, a, b, n, k, N, R, m, Nf, eps, p, P, R1, R2, sh, out):
+	M = m[p]
+	for q in nb.prange(x.size):
+		if R and (x[q] < 0 or x[q] > 1):
+			out[q] = 0.0
+			continue
+		u = _threshold(x[q], E[q], i[q], m)
+		if u > 0:
+			out[q] = u * _convolution(x[q], i[q], a[q], b[q], n[q], k, N, Nf, eps)
+		else:
+			out[q] = 0.0
+		if R:
+			out[q] /= E[q] * _inelastic(2 * (E[q] * M + M**2), p, P, R1, R2, sh)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _meson_kernel(x, E, i, m, F, out):
+	for q in nb.prange(x.size):
+		out[q] = _meson(x[q], E[q], i[q], m, F)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _decay_kernel(y, Eh, i, L, f, out):
+	for q in nb.prange(y.size):
+		if i[q] == 0 or i[q] == 1:
+			out[q] = _meson_decay(y[q], Eh[q], i[q], L, f)
+		else:
+			out[q] = _charm_decay(y[q], Eh[q], i[q], L, f)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _cooling_kernel(E, n, i, d, m, tau, proxy, p, P, R1, R2, sh, out):
+	kap = 0.8
+	c = 29979245800
+	M = m[p]
+	for q in nb.prange(E.size):
+		mi = m[i[q]]
+		s = 2 * E[q] * M + M**2 + mi**2
+		sig = _inelastic(s, proxy[i[q]], P, R1, R2, sh) * 1e-24
+		tcool = 1 / (kap * sig * n[q] * c)
+		tdec = tau[i[q]] * E[q] / mi
+		if d[q] < tdec * c:
+			out[q] = - np.expm1(- tcool * c / d[q])
+		else:
+			out[q] = - np.expm1(- tcool / tdec)
+
+
+@nb.njit(parallel=True, cache=True, error_model='numpy')
+def _depth_kernel(E, n, d, m, p, P, R1, R2, sh, out):
+	kap = 0.5
+	M = m[p]
+	for q in nb.prange(E.size):
+		s = 2 * (E[q] * M + M**2)
+		sig = _inelastic(s, p, P, R1, R2, sh) * 1e-24
+		out[q] = d[q] * kap * sig * n[q]
+
+
+def hadron_proton_cooling_factor(E, n, h, d = None):
+	'''Returns the cooling factor for hadrons scattered by protons, see `collisions_decay`.'''
+	i = sp.code(h, sp.HADRONS)
+	shape, (E, n, i, d) = _flat(np.asarray(E, dtype=float), np.asarray(n, dtype=float), i, np.inf if d is None else np.asarray(d, dtype=float))
+	out = np.empty(E.size)
+	_cooling_kernel(E, n, i, d, sp.m, sp.tau, sp.proxy, sp.PROTON, *_cross(), out)
+	return out.reshape(shape)
+
+
+def proton_proton_optical_depth(E, n, d):
+	'''Returns the effective optical depth for protons hitting protons, see `collisions_decay`.'''
+	shape, (E, n, d) = _flat(np.asarray(E, dtype=float), np.asarray(n, dtype=float), np.asarray(d, dtype=float))
+	out = np.empty(E.size)
+	_depth_kernel(E, n, d, sp.m, sp.PROTON, *_cross(), out)
+	return out.reshape(shape)
+
+
+def total_hadron_proton_scattering(s, h):
+	'''Returns the total hadron-proton scattering cross section, see `cross_sections`.'''
+	shape, (s, j) = _flat(np.asarray(s, dtype=float), sp.code(h, sp.PROJECTILES))
+	out = np.empty(s.size)
+	_total_kernel(s, j, *_cross(), out)
+	return out.reshape(shape)
+
+
+def hadron_elastic_total_ratio(s):
+	'''Returns the universal ratio of elastic to total hadron-proton cross section, see `cross_sections`.'''
+	shape, (s,) = _flat(np.asarray(s, dtype=float))
+	out = np.empty(s.size)
+	_ratio_kernel(s, out)
+	return out.reshape(shape)
+
+
+def inelastic_hadron_proton_scattering(s, h):
+	'''Returns the inelastic hadron-proton scattering cross section, see `cross_sections`.'''
+	shape, (s, j) = _flat(np.asarray(s, dtype=float), sp.code(h, sp.PROJECTILES))
+	out = np.empty(s.size)
+	_inelastic_kernel(s, j, *_cross(), out)
+	return out.reshape(shape)
+
+
+def charm_quark_differential_production(x, E, o = 'good', p = None):
+	'''Returns the charm quark differential cross section for production in proton-proton collisions, see `cross_sections`.'''
+	x = np.asarray(x, dtype=float)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	a, b, n, k = cr.charm_quark_parameters(E, o, p)
+	shape, (x, a, b, n) = _flat(x, a, b, n)
+	out = np.empty(x.size)
+	_charm_quark_kernel(x, a, b, n, k, out)
+	return np.where(bad, 0.0, out.reshape(shape))
+
+
+def _charm(x, E, h, N, o, P, p):
+	'''Returns the thresholded fragmentation convolution, divided by the proton rate if `P` is set.'''
+	i = sp.code(h, sp.CHARMED)
+	shape, (x, E, i) = _flat(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	a, b, n, k = cr.charm_quark_parameters(E, o, p)
+	out = np.empty(x.size)
+	_charm_kernel(x, E, i, a, b, n, k, N, P, sp.m, sp.N, sp.eps, sp.PROTON, *_cross(), out)
+	return out.reshape(shape)
+
+
+def charmed_hadron_differential_production(x, E, h, N = 100, B = 1024, o = 'good', tol = None, p = None):
+	'''Returns the charmed hadron differential cross section for production in proton-proton collisions, see `cross_sections`.'''
+	if tol is not None:
+		return cr.charmed_hadron_differential_production(x, E, h, N, B, o, tol, p)
+	return _charm(x, E, h, N, o, False, p)
+
+
+def charmed_hadron_production(x, E, h, N = 100, o = 'good', tol = None, p = None):
+	'''Returns the proton-proton to charmed hadron singular production spectrum, see `distribution_spectra`.'''
+	if tol is not None:
+		return ds.charmed_hadron_production(x, E, h, N, o, tol, p)
+	x = np.asarray(x, dtype=float)
+	bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	return _charm(x, E, h, N, o, True, p)
+
+
+def meson_production(x, E, h, p = None):
+	'''Returns the proton-proton to pion or kaon singular production spectrum, see `distribution_spectra`.'''
+	i = sp.code(h, sp.MESONS)
+	shape, (x, E, i) = _flat(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	out = np.empty(x.size)
+	_meson_kernel(x, E, i, sp.m, sp.F, out)
+	return out.reshape(shape)
+
+
+def _decay(Enu, Eh, h, allowed, p):
+	'''Returns the singular decay spectrum of any species among the allowed codes.'''
+	i = sp.code(h, allowed)
+	shape, (Enu, Eh, i) = _flat(np.asarray(Enu, dtype=float), np.asarray(Eh, dtype=float), i)
+	y = Enu / Eh
+	bd.forbidden(y, y > 1 - sp.l[i], 'Enu / Eh', None, 1 - sp.l[i], p)
+	out = np.empty(y.size)
+	_decay_kernel(y, Eh, i, sp.l, sp.f, out)
+	return out.reshape(shape)
+
+
+def meson_decay_neutrinos(Enu, Eh, h, p = None):
+	'''Returns the pion or kaon to neutrino singular decay spectrum, see `distribution_spectra`.'''
+	return _decay(Enu, Eh, h, sp.MESONS, p)
+
+
+def charmed_hadron_decay_neutrinos(Enu, Eh, h, p = None):
+	'''Returns the charmed hadron to neutrino singular decay spectrum, see `distribution_spectra`.'''
+	return _decay(Enu, Eh, h, sp.CHARMED, p)
+
+
+def hadron_decay_neutrinos(Enu, Eh, h, p = None):
+	'''Returns the hadron to neutrino singular decay spectrum for any species, see `distribution_spectra`.'''
+	return _decay(Enu, Eh, h, sp.HADRONS, p)
+
+
+def hadron_production(x, E, h, N = 100, o = 'good', tol = None, p = None):
+	'''Returns the proton-proton to hadron singular production spectrum for any species, see `distribution_spectra`.'''
+	i = sp.code(h, sp.HADRONS)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	c = (i == sp.PI) | (i == sp.K)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	prod = np.zeros(x.shape)
+	prod[c & ~bad] = meson_production(x[c & ~bad], E[c & ~bad], i[c & ~bad], p)
+	prod[~c & ~bad] = charmed_hadron_production(x[~c & ~bad], E[~c & ~bad], i[~c & ~bad], N, o, tol, p)
+	return prod
+
+
+def stacked_hadron_production(x, E, h = sp.HADRONS, N = 100, o = 'good', tol = None, p = None):
+	'''Returns the proton-proton to hadron singular production spectra of several species in one pass, see `distribution_spectra`.'''
+	i = np.atleast_1d(sp.code(h, sp.HADRONS))
+	x, E = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float))
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	xs = x[~bad]
+	Es = E[~bad]
+	out = np.zeros(i.shape + x.shape)
+	for q, j in enumerate(i):
+		if j == sp.PI or j == sp.K:
+			out[q, ~bad] = meson_production(xs, Es, j, p)
+		else:
+			out[q, ~bad] = charmed_hadron_production(xs, Es, j, N, o, tol, p)
+	return out
+
+
+def charmed_hadron_fragmentation_function(z, h):
+	'''Returns the charmed hadrons from charm quarks fragmentation function, see `fragmentation_function`.'''
+	shape, (z, i) = _flat(np.asarray(z, dtype=float), sp.code(h, sp.CHARMED))
+	out = np.empty(z.size)
+	_fragmentation_kernel(z, i, sp.N, sp.eps, out)
+	return out.reshape(shape)
@@ -1,6 +1,11 @@
 '''
 Parametrizations of hadronic cross sections as described in the thesis document.
 
+	Classes
+	-------
+	cross_section_cache
+		Collects previously evaluated cross sections with least recently used eviction
+
 	Functions
 	---------
 	total_hadron_proton_scattering
@@ -12,14 +17,52 @@ Parametrizations of hadronic cross sections as described in the thesis document.
 	inelastic_hadron_proton_scattering
 		Returns the inelastic hadron-proton scattering cross section
 
+	cached_inelastic_hadron_proton_scattering
+		Returns the inelastic hadron-proton scattering cross section from a shared cache
+
+	charm_quark_parameters
+		Returns the energy dependent parameters of the charm quark differential cross section
+
 	charm_quark_differential_production
 		Returns the charm quark differential cross section for production in proton-proton collisions
 
+	charmed_hadron_threshold_factor
+		Returns the kinematic threshold factor of charmed hadron production
+
+	charmed_hadron_fragmentation_convolution
+		Returns the convolution of charm quark cross section and fragmentation function without threshold factor
+
+	charmed_hadron_stacked_convolution
+		Returns the fragmentation convolutions of several charmed hadrons sharing the charm quark cross section
+
+	charmed_hadron_adaptive_convolution
+		Returns the fragmentation convolution from adaptive quadrature to a requested tolerance
+
+	charmed_hadron_differential_production
+		Returns the charmed hadron differential cross section for production in proton-proton collisions
+
 '''
 import numpy as np
 from warnings import warn
 
+import collections
+import hashlib
+
+import code.parametrizations.bounds as bd
 import code.parametrizations.fragmentation_function as ff
+import code.parametrizations.species as sp
+
+
+_kronrod_nodes = np.array([0.991455371120812639, 0.949107912342758525, 0.864864423359769073, 0.741531185599394440,
+	0.586087235467691130, 0.405845151377397167, 0.207784955007898468, 0.0])
+_kronrod_nodes = np.concatenate([- _kronrod_nodes, _kronrod_nodes[-2::-1]])
+_kronrod_weights = np.array([0.022935322010529225, 0.063092092629978553, 0.104790010322250184, 0.140653259715525919,
+	0.169004726639267903, 0.190350578064785410, 0.204432940075298892, 0.209482141084727828])
+_kronrod_weights = np.concatenate([_kronrod_weights, _kronrod_weights[-2::-1]])
+_gauss_weights = np.zeros(15)
+_gauss_weights[1::2] = [0.129484966168869693, 0.279705391489276668, 0.381830050505118945, 0.417959183673469388,
+	0.381830050505118945, 0.279705391489276668, 0.129484966168869693]
+
 
 def total_hadron_proton_scattering(s, h):
 	'''
@@ -27,34 +70,22 @@ def total_hadron_proton_scattering(s, h):
 
 		Parameters
 		----------
-		s : float
+		s : array_like
 			The squared center of mass energy in GeV
-		h : {'p', 'pi', 'k'}
-			The incident hadron on the proton target
+		h : {'p', 'pi', 'k'} or array_like of int
+			The incident hadron on the proton target, species codes broadcast against `s`
 
 		Returns
 		-------
-		float
+		ndarray
 			The total hadron-proton scattering cross section in mb
 	'''
-	match h.lower():
-		case 'p':
-			P  = 34.41
-			R1 = 13.07
-			R2 =  7.39
-			sh = 15.98
-		case 'pi':
-			P  = 18.75
-			R1 =  9.56
-			R2 =  1.767
-			sh = 10.23
-		case 'k':
-			P  = 16.36
-			R1 =  4.29
-			R2 =  3.408
-			sh = 12.62
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `p`, `pi` or `k` instead')
+	s = np.asarray(s, dtype=float)
+	i = sp.code(h, sp.PROJECTILES)
+	P  = sp.P[i]
+	R1 = sp.R1[i]
+	R2 = sp.R2[i]
+	sh = sp.sh[i]
 	H  = 0.272
 	n1 = 0.447
 	n2 = 0.5486
@@ -67,14 +98,15 @@ def hadron_elastic_total_ratio(s):
 
 		Parameters
 		----------
-		s : float
+		s : array_like
 			The squared center of mass energy in GeV
 
 		Returns
 		-------
-		float
+		ndarray
 			The dimensionless universal ratio of elastic to total hadron-proton cross section
 	'''
+	s = np.asarray(s, dtype=float)
 	A  = 1/2
 	g1 = 0.466
 	g2 = 0.0259
@@ -88,39 +120,176 @@ def inelastic_hadron_proton_scattering(s, h):
 
 		Parameters
 		----------
-		s : float
+		s : array_like
 			The squared center of mass energy in GeV
-		h : {'p', 'pi', 'K'}
-			The incident hadron on the proton target
+		h : {'p', 'pi', 'k'} or array_like of int
+			The incident hadron on the proton target, species codes broadcast against `s`
 
 		Returns
 		-------
-		float
+		ndarray
 			The inelastic hadron-proton scattering cross section in mb
 	'''
 	return total_hadron_proton_scattering(s, h) * (1 - hadron_elastic_total_ratio(s))
 
 
-def charm_quark_differential_production(x, E, o = 'good'):
+class cross_section_cache:
 	'''
-	Returns the charm quark differential cross section for production in proton-proton collisions.
+	Collects previously evaluated cross sections with least recently used eviction.
+
+	Scalar queries are keyed on the species code and the value of `s`, array queries on their
+	shapes, the species codes and a digest of the `s` values, so repeated grids are served
+	without recomputing. Cached arrays are returned read only. The cache is bounded by the total
+	size of the cached values, and queries larger than `L` are passed on without hashing or storing.
+
+	Attributes
+	----------
+	func : callable
+		The cross section of squared center of mass energy and hadron type
+	B : int
+		The maximal total size of cached values in bytes
+	L : int
+		The maximal size of a single cached query in bytes
+	nbytes : int
+		The total size of cached values in bytes
+	hits : int
+		The number of queries served from the cache
+	misses : int
+		The number of queries passed on to `func`
+
+	Methods
+	-------
+	__init__
+		Sets up an empty cache
+
+	__call__
+		Returns the cross section, from the cache if possible
+
+	clear
+		Removes all entries and resets the statistics
+
+	info
+		Returns the cache statistics
+
+	'''
+
+	def __init__(self, func, B = 2**26, L = 2**22):
+		'''
+		Sets up an empty cache.
 
 		Parameters
 		----------
-		x : float
-			The energy ratio Ec / Ep of charm quark to incident proton in target rest coordinates
-		E : float
+		func : callable
+			The cross section of squared center of mass energy and hadron type
+		B : int, optional
+			The maximal total size of cached values in bytes
+		L : int, optional
+			The maximal size of a single cached query in bytes
+		'''
+		self.func = func
+		self.B = B
+		self.L = min(L, B)
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self._entries = collections.OrderedDict()
+
+	def __call__(self, s, h):
+		'''
+		Returns the cross section, from the cache if possible.
+
+		Parameters
+		----------
+		s : array_like
+			The squared center of mass energy in GeV
+		h : {'p', 'pi', 'k'} or array_like of int
+			The incident hadron on the proton target, species codes broadcast against `s`
+
+		Returns
+		-------
+		ndarray
+			The cross section in mb
+		'''
+		if np.ndim(s) == 0 and isinstance(h, (str, int, np.integer)):
+			key = (h.lower() if isinstance(h, str) else int(h), float(s))
+		else:
+			s = np.ascontiguousarray(s, dtype=float)
+			if s.nbytes > self.L:
+				self.misses += 1
+				return np.asarray(self.func(s, h))
+			i = sp.code(h, sp.PROJECTILES)
+			key = (s.shape, i.shape, i.tobytes(), hashlib.sha1(s).digest())
+		sig = self._entries.get(key)
+		if sig is not None:
+			self.hits += 1
+			self._entries.move_to_end(key)
+			return sig
+		self.misses += 1
+		sig = np.asarray(self.func(s, h))
+		if sig.nbytes > self.L:
+			return sig
+		sig.flags.writeable = False
+		self._entries[key] = sig
+		self.nbytes += sig.nbytes
+		while self.nbytes > self.B:
+			self.nbytes -= self._entries.popitem(last=False)[1].nbytes
+		return sig
+
+	def clear(self):
+		'''Removes all entries and resets the statistics.'''
+		self._entries.clear()
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+
+	def info(self):
+		'''Returns the cache statistics as dictionary of hits, misses, size, bytes and capacity in bytes.'''
+		return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'bytes': self.nbytes, 'capacity': self.B}
+
+
+inelastic_cache = cross_section_cache(inelastic_hadron_proton_scattering)
+
+
+def cached_inelastic_hadron_proton_scattering(s, h):
+	'''
+	Returns the inelastic hadron-proton scattering cross section from a shared cache.
+
+		Parameters
+		----------
+		s : array_like
+			The squared center of mass energy in GeV
+		h : {'p', 'pi', 'k'} or array_like of int
+			The incident hadron on the proton target, species codes broadcast against `s`
+
+		Returns
+		-------
+		ndarray
+			The inelastic hadron-proton scattering cross section in mb, read only
+	'''
+	return inelastic_cache(s, h)
+
+
+def charm_quark_parameters(E, o = 'good', p = None):
+	'''
+	Returns the energy dependent parameters of the charm quark differential cross section.
+
+		Parameters
+		----------
+		E : array_like
 			The projectile energy Ep as viewed from target rest coordinates in GeV
 		o : {'good', 'bad'}, optional
 			The option to use either good or bad parameters
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for energies outside of the fitted range, which are clipped to it under `clip` and
+			extrapolated otherwise unless raising
 
 		Returns
 		-------
-		float
-			The charm quark differential cross section for production from proton-proton collisions in mb
+		tuple of ndarray
+			The normalization in mb, the power index, the threshold index and the fixed exponent `m`
 	'''
-	if E < 3e4 or E > 1e11:
-		warn(f'{E} is outside of bounds {3e4} to {1e11}')
+	E = np.asarray(E, dtype=float)
+	E, _ = bd.check(E, (E < 3e4) | (E > 1e11), 'E', 3e4, 1e11, p)
 	match o.lower():
 		case 'good':
 			a1 = 0.403
@@ -137,50 +306,279 @@ def charm_quark_differential_production(x, E, o = 'good'):
 			n1 = 8.486
 			n2 = 0.107
 		case _:
-			raise ValueError(f'`{o.lowe()}` is not a valid option, use `good` or `bad` instead')
-	a = a1 * np.log(E) - a2
+			raise ValueError(f'`{o.lower()}` is not a valid option, use `good` or `bad` instead')
+	a = (a1 * np.log(E) - a2) / 14.5 / 22.32
 	b = b1 - b2 * np.log(E) - 1
 	n = n1 - n2 * np.log(E)
 	m = 1.2
-	return a * x**b * (1 - x**m)**n / 14.5 / 22.32
+	return a, b, n, m
 
 
-def charmed_hadron_differential_production(x, E, h, N = 100):
+def charm_quark_differential_production(x, E, o = 'good', p = None):
 	'''
-	Returns the charmed hadron differential cross section for production in proton-proton collisions.
+	Returns the charm quark differential cross section for production in proton-proton collisions.
 
 		Parameters
 		----------
-		x : float
+		x : array_like
 			The energy ratio Ec / Ep of charm quark to incident proton in target rest coordinates
-		E : float
+		E : array_like
 			The projectile energy Ep as viewed from target rest coordinates in GeV
-		h : {'d0', 'd+', 'd+s', 'lam+c'}
-			The type of hadron produced
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad parameters
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
+
+		Returns
+		-------
+		ndarray
+			The charm quark differential cross section for production from proton-proton collisions in mb
+	'''
+	x = np.asarray(x, dtype=float)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	a, b, n, m = charm_quark_parameters(E, o, p)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(bad, 0.0, a * x**b * (1 - x**m)**n)
+
+
+def charmed_hadron_threshold_factor(x, E, h):
+	'''
+	Returns the kinematic threshold factor of charmed hadron production.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
+
+		Returns
+		-------
+		ndarray
+			The dimensionless threshold factor, zero below the hadron mass
+	'''
+	m = sp.m[sp.code(h, sp.CHARMED)]
+	x = np.asarray(x, dtype=float)
+	E = np.asarray(E, dtype=float)
+	with np.errstate(divide='ignore'):
+		return np.sqrt(np.clip(1 - m / (x * E), 0.0, None))
+
+
+def charmed_hadron_fragmentation_convolution(x, E, h, N = 100, B = 1024, o = 'good', p = None):
+	'''
+	Returns the convolution of charm quark cross section and fragmentation function without threshold factor.
+
+	The integral from `x` to one is evaluated for all cells at once on a shared quadrature
+	`z = x + (1 - x) * v` with `N` uniform nodes `v` in the unit interval, passing at most
+	`B` cells per tensor operation to bound memory.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
+		N : int, optional
+			The number of steps for integration accuracy
+		B : int, optional
+			The number of cells evaluated per pass
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad parameters
+
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for energies outside of the fitted range of the charm quark parameters
+		Returns
+		-------
+		ndarray
+			The fragmentation convolution in mb
+	'''
+	i = sp.code(h, sp.CHARMED)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	shape = x.shape
+	x = x.ravel()
+	i = i.ravel()
+	a, b, n, k = charm_quark_parameters(E.ravel(), o, p)
+	v = np.linspace(0, 1, N)
+	w = np.full(N, 1 / (N - 1))
+	w[[0, -1]] /= 2
+	sig = np.empty(x.size)
+	for q in range(0, x.size, B):
+		j = slice(q, q + B)
+		z = x[j, None] + (1 - x[j, None]) * v
+		r = np.log(x[j, None] / z)
+		with np.errstate(divide='ignore'):
+			y = a[j, None] * np.exp(b[j, None] * r + n[j, None] * np.log1p(- np.exp(k * r)))
+		y = y * ff.charmed_hadron_fragmentation_function(z, i[j, None]) / z
+		sig[j] = (1 - x[j]) * (y @ w)
+	return sig.reshape(shape)
+
+
+def charmed_hadron_stacked_convolution(x, E, h = sp.CHARMED, N = 100, B = 1024, o = 'good', p = None):
+	'''
+	Returns the fragmentation convolutions of several charmed hadrons sharing the charm quark cross section.
+
+	The quadrature nodes of `charmed_hadron_fragmentation_convolution` only depend on `x`, so the
+	charm quark cross section is evaluated once per cell and weighted by the fragmentation function
+	of every requested hadron.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : array_like of int or str, optional
+			The types of hadron produced, stacked along a new leading axis
+		N : int, optional
+			The number of steps for integration accuracy
+		B : int, optional
+			The number of cells evaluated per pass
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad parameters
+
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for energies outside of the fitted range of the charm quark parameters
+		Returns
+		-------
+		ndarray
+			The fragmentation convolutions in mb, one for every hadron in `h`
+	'''
+	i = np.atleast_1d(sp.code(h, sp.CHARMED))
+	x, E = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float))
+	shape = x.shape
+	x = x.ravel()
+	a, b, n, k = charm_quark_parameters(E.ravel(), o, p)
+	v = np.linspace(0, 1, N)
+	w = np.full(N, 1 / (N - 1))
+	w[[0, -1]] /= 2
+	sig = np.empty((i.size, x.size))
+	for q in range(0, x.size, B):
+		j = slice(q, q + B)
+		z = x[j, None] + (1 - x[j, None]) * v
+		r = np.log(x[j, None] / z)
+		with np.errstate(divide='ignore'):
+			y = a[j, None] * np.exp(b[j, None] * r + n[j, None] * np.log1p(- np.exp(k * r))) / z
+		sig[:, j] = (1 - x[j]) * ((y * ff.charmed_hadron_fragmentation_function(z, i[:, None, None])) @ w)
+	return sig.reshape(i.shape + shape)
+
+
+def charmed_hadron_adaptive_convolution(x, E, h, tol = 1e-6, o = 'good', L = 40, full = False, p = None):
+	'''
+	Returns the fragmentation convolution from adaptive quadrature to a requested tolerance.
+
+	The integral from `x` to one is taken over `log(z)`, split at the fragmentation peak
+	`z = 1 - sqrt(eps)`. Every panel is integrated with the 15 point Kronrod extension of the
+	7 point Gauss-Legendre rule, and panels whose two estimates differ by more than their share
+	of `tol` relative to the cell total are bisected, so only cells and regions that need
+	resolution are refined.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
+		tol : float, optional
+			The requested relative error bound
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad parameters
+		L : int, optional
+			The maximal number of bisections
+		full : bool, optional
+			The option to also return the number of integrand evaluations per cell
+
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for energies outside of the fitted range of the charm quark parameters
+		Returns
+		-------
+		ndarray
+			The fragmentation convolution in mb
+		ndarray of int, optional
+			The number of integrand evaluations per cell, only if `full` is set
+	'''
+	i = sp.code(h, sp.CHARMED)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	shape = x.shape
+	lx = np.log(x.ravel())
+	i = i.ravel()
+	a, b, n, k = charm_quark_parameters(E.ravel(), o, p)
+	def quad(c, p, q):
+		u = (p + q)[:, None] / 2 + (q - p)[:, None] / 2 * _kronrod_nodes
+		r = lx[c, None] - u
+		with np.errstate(divide='ignore'):
+			y = a[c, None] * np.exp(b[c, None] * r + n[c, None] * np.log1p(- np.exp(k * r)))
+		y = y * ff.charmed_hadron_fragmentation_function(np.exp(u), i[c, None])
+		return (q - p) / 2 * (y @ _kronrod_weights), (q - p) / 2 * (y @ _gauss_weights)
+	cells = np.arange(lx.size)
+	span = np.maximum(- lx, np.finfo(float).tiny)
+	peak = np.log(1 - np.sqrt(sp.eps[i]))
+	split = lx < peak
+	c = np.concatenate([cells, cells[split]])
+	lo = np.concatenate([lx, peak[split]])
+	hi = np.concatenate([np.where(split, peak, 0.0), np.zeros(np.count_nonzero(split))])
+	sig = np.zeros(lx.size)
+	count = np.zeros(lx.size, dtype=int)
+	for _ in range(L):
+		fine, coarse = quad(c, lo, hi)
+		count += _kronrod_nodes.size * np.bincount(c, None, lx.size).astype(int)
+		scale = np.abs(sig + np.bincount(c, fine, lx.size))
+		ok = np.abs(fine - coarse) <= tol * scale[c] * (hi - lo) / span[c]
+		sig += np.bincount(c[ok], fine[ok], lx.size)
+		c, lo, hi = c[~ok], lo[~ok], hi[~ok]
+		if c.size == 0:
+			break
+		m = (lo + hi) / 2
+		c = np.concatenate([c, c])
+		lo, hi = np.concatenate([lo, m]), np.concatenate([m, hi])
+	else:
+		warn(f'{np.unique(c).size} cells did not reach relative error {tol:.2e} after {L} bisections')
+		sig += np.bincount(c, quad(c, lo, hi)[0], lx.size)
+	if full:
+		return sig.reshape(shape), count.reshape(shape)
+	return sig.reshape(shape)
+
+
+def charmed_hadron_differential_production(x, E, h, N = 100, B = 1024, o = 'good', tol = None, p = None):
+	'''
+	Returns the charmed hadron differential cross section for production in proton-proton collisions.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Ec / Ep of charm quark to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
 		N : int, optional
 			The number of steps for integration accuracy
+		B : int, optional
+			The number of cells evaluated per pass
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad parameters
+		tol : float, optional
+			The requested relative error of adaptive quadrature replacing the fixed `N` steps, if given
 
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for energies outside of the fitted range of the charm quark parameters
 		Returns
 		-------
-		float
+		ndarray
 			The charmed hadron differential cross section for production from proton-proton collisions in mb
 	'''
-	match h.lower():
-		case 'd0':
-			m   = 1.86
-		case 'd+':
-			m   = 1.87
-		case 'd+s':
-			m   = 1.97
-		case 'lam+c':
-			m   = 2.29
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `d0`, `d+`, `d+s` or `lam+c` instead')
-	if m > x * E:
-		u = 0.0
+	i = sp.code(h, sp.CHARMED)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	u = charmed_hadron_threshold_factor(x, E, i)
+	sig = np.zeros(u.shape)
+	c = u > 0
+	if tol is None:
+		sig[c] = u[c] * charmed_hadron_fragmentation_convolution(x[c], E[c], i[c], N, B, o, p)
 	else:
-		u = (1 - m / (x * E))**(1/2)
-	z = np.linspace(x, 1, N)
-	y = (charm_quark_differential_production(x / z, E) * ff.charmed_hadron_fragmentation_function(z, h) / z)
-	sig = np.trapezoid(y, z)
-	return u * sig
+		sig[c] = u[c] * charmed_hadron_adaptive_convolution(x[c], E[c], i[c], tol, o, p=p)
+	return sig
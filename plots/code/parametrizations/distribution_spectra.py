@@ -15,44 +15,68 @@ Parametrizations of spectral distributions as described in the thesis document.
 	charmed_hadron_decay_neutrinos
 		Returns the charmed hadron to neutrino singular decay spectrum
 
+	hadron_production
+		Returns the proton-proton to hadron singular production spectrum for any species
+
+	hadron_decay_neutrinos
+		Returns the hadron to neutrino singular decay spectrum for any species
+
+	stacked_hadron_production
+		Returns the proton-proton to hadron singular production spectra of several species in one pass
+
+	energy_bin_edges
+		Returns logarithmic bin edges centred on the given energies
+
+	decay_bin_average
+		Returns the hadron to neutrino decay spectrum integrated over hadron bins and averaged over neutrino bins
+
+	meson_decay_transfer
+		Returns the bin averaged pion or kaon to neutrino decay transfer matrix
+
+	charmed_hadron_decay_transfer
+		Returns the bin averaged charmed hadron to neutrino decay transfer matrix
+
+	hadron_decay_transfer
+		Returns the bin averaged hadron to neutrino decay transfer matrix for any species
+
 '''
 import numpy as np
-from warnings import warn
+from scipy.special import spence
 
+import code.parametrizations.bounds as bd
 import code.parametrizations.cross_sections as cr
 import code.parametrizations.fragmentation_function as ff
+import code.parametrizations.species as sp
 
 
-def meson_production(x, E, h):
+def meson_production(x, E, h, p = None):
 	'''
 	Returns the proton-proton to pion or kaon singular production spectrum.
 
 		Parameters
 		----------
-		x : float
+		x : array_like
 			The energy ratio Eh / Ep of produced meson to incident proton in target rest coordinates
-		E : float
+		E : array_like
 			The projectile energy Ep as viewed from target rest coordinates in GeV
-		h : {'pi', 'k'}
-			The type of charged meson produced
+		h : {'pi', 'k'} or array_like of int
+			The type of charged meson produced, species codes broadcast against `x` and `E`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
 
 		Returns
 		-------
-		float
+		ndarray
 			The proton-proton to pion or kaon singular production spectrum in 1 / GeV
 	'''
-	match h.lower():
-		case 'pi':
-			m = 0.140
-			f = 1
-		case 'k':
-			m = 0.494
-			f = 0.12
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `pi` or `k` instead')
-	if x < 0 or x > 1:
-		warn(f'`{x}` is outside of bounds {0.0} and {1.0}')
-		return 0.0
+	i = sp.code(h, sp.MESONS)
+	m = sp.m[i]
+	f = sp.F[i]
+	x = np.asarray(x, dtype=float)
+	E = np.asarray(E, dtype=float)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	bad = bad | (x <= 0) | (x >= 1)
+	x = np.where(bad, 0.5, x)
 	B0 = 0.25
 	a0 = 0.98
 	r0 = 2.6
@@ -64,119 +88,385 @@ def meson_production(x, E, h):
 	B = B0 + C
 	a = a0 / np.sqrt(C)
 	r = r0 / np.sqrt(C)
-	if m > x * E:
-		u = 0.0
-	else:
-		u = (1 - m / (x * E))**(1/2)
+	with np.errstate(divide='ignore'):
+		u = np.sqrt(np.clip(1 - m / (x * E), 0.0, None))
 	v = 1 - x**a
 	w = 1 + r * x**a * v
-	F = 4 * a * B * x**(a - 1) * (v / w)**4 * (1 / v + r * (1 - 2 * x**a) / w) * u
-	return f * F / E
+	with np.errstate(divide='ignore', invalid='ignore'):
+		F = 4 * a * B * x**(a - 1) * (v / w)**4 * (1 / v + r * (1 - 2 * x**a) / w) * u
+	return np.where(bad, 0.0, f * F / E)
 
 
-def meson_decay_neutrinos(Enu, Eh, h):
+def meson_decay_neutrinos(Enu, Eh, h, p = None):
 	'''
 	Returns the pion or kaon to neutrino singular decay spectrum.
 
 		Parameters
 		----------
-		Enu : float
+		Enu : array_like
 			The energy of produced neutrinos as viewed from target rest coordinates in GeV
-		Eh : float
+		Eh : array_like
 			The energy of decayed mesons as viewed from target rest coordinates in GeV
-		h : {'pi', 'k'}
-			The type of meson initital state observed
+		h : {'pi', 'k'} or array_like of int
+			The type of meson initital state observed, species codes broadcast against `Enu` and `Eh`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
 
 		Returns
 		-------
-		float
+		ndarray
 			The pion or kaon to neutrino singular decay spectrum in 1 / GeV
 	'''
-	match h.lower():
-		case 'pi':
-			m = 0.140
-			f = 0.9999
-		case 'k':
-			m = 0.494
-			f = 0.6356
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid hadron identifyer, use `pi` or `k` instead')
-	l = 0.106**2 / m**2
+	i = sp.code(h, sp.MESONS)
+	Enu, Eh, i = np.broadcast_arrays(np.asarray(Enu, dtype=float), np.asarray(Eh, dtype=float), i)
+	l = sp.l[i]
 	y = Enu / Eh
-	if y > 1 - l:
-		warn(f'{y} exceeds bound {1 - l}')
-		return 0.0
-	return f / (Eh * (1 - l))
+	bad = bd.forbidden(y, y > 1 - l, 'Enu / Eh', None, 1 - l, p)
+	return np.where(bad, 0.0, _meson_decay(y, Eh, i))
 
 
-def charmed_hadron_production(x, E, h, N = 100):
+def charmed_hadron_production(x, E, h, N = 100, o = 'good', tol = None, p = None):
 	'''
 	Returns the proton-proton to charmed hadron singular production spectrum.
 
 		Parameters
 		----------
-		x : float
+		x : array_like
 			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
-		E : float
+		E : array_like
 			The projectile energy Ep as viewed from target rest coordinates in GeV
-		h : {'d0', 'd+', 'd+s', 'lam+c'}
-			The type of hadron produced
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
 		N : int, optional
 			The number of steps for integration accuracy
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		tol : float, optional
+			The requested relative error of adaptive quadrature replacing the fixed `N` steps, if given
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
 
 		Returns
 		-------
-		float
+		ndarray
 			The proton-proton to charmed hadron singular production spectrum in 1 / GeV
 	'''
-	if x < 0 or x > 1:
-		warn(f'`{x}` is outside of bounds {0.0} to {1.0}')
-		return 0.0
-	prod = cr.charmed_hadron_differential_production(x, E, h, N)
-	M = 0.938
+	i = sp.code(h, sp.CHARMED)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	prod = np.zeros(x.shape)
+	prod[~bad] = cr.charmed_hadron_differential_production(x[~bad], E[~bad], i[~bad], N, o=o, tol=tol, p=p)
+	M = sp.m[sp.PROTON]
 	s = 2 * (E * M + M**2)
-	return prod / (E * cr.inelastic_hadron_proton_scattering(s, 'p'))
+	return prod / (E * cr.cached_inelastic_hadron_proton_scattering(s, 'p'))
 
 
-def charmed_hadron_decay_neutrinos(Enu, Eh, h):
+def charmed_hadron_decay_neutrinos(Enu, Eh, h, p = None):
 	'''
 	Returns the charmed hadron to neutrino singular decay spectrum.
 
 		Parameters
 		----------
-		Enu : float
+		Enu : array_like
 			The energy of produced neutrinos as viewed from target rest coordinates in GeV
-		Eh : float
+		Eh : array_like
 			The energy of decayed charmed hadrons as viewed from target rest coordinates in GeV
-		h : {'d0', 'd+', 'd+s', 'lam+c'}
-			The type of hadronic initial state observed
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic initial state observed, species codes broadcast against `Enu` and `Eh`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
 
 		Returns
 		-------
-		float
+		ndarray
 			The charmed hadron to neutrino singular decay spectrum in 1 / GeV
 	'''
-	match h.lower():
-		case 'd0':
-			l = 0.67**2 / 1.86**2
-			f = 0.067
-		case 'd+':
-			l = 0.63**2 / 1.87**2
-			f = 0.176
-		case 'd+s':
-			l = 0.84**2 / 1.97**2
-			f = 0.065
-		case 'lam+c':
-			l = 1.27**2 / 2.29**2
-			f = 0.045
-		case _:
-			raise ValueError(f'`{h.lower()}` is an invalid charmed hadron identifyer, use `d0`, `d+`, `d+s` or `lam+c` instead')
+	i = sp.code(h, sp.CHARMED)
+	Enu, Eh, i = np.broadcast_arrays(np.asarray(Enu, dtype=float), np.asarray(Eh, dtype=float), i)
+	l = sp.l[i]
 	y = Enu / Eh
-	if y > 1 - l:
-		warn(f'{y} exceeds bound {1 - l}')
-		return 0.0
+	bad = bd.forbidden(y, y > 1 - l, 'Enu / Eh', None, 1 - l, p)
+	return np.where(bad, 0.0, _charmed_hadron_decay(np.where(bad, 0.0, y), Eh, i))
+
+
+def hadron_production(x, E, h, N = 100, o = 'good', tol = None, p = None):
+	'''
+	Returns the proton-proton to hadron singular production spectrum for any species.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadron produced, species codes broadcast against `x` and `E`
+		N : int, optional
+			The number of steps for integration accuracy
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		tol : float, optional
+			The requested relative error of adaptive quadrature replacing the fixed `N` steps, if given
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
+
+		Returns
+		-------
+		ndarray
+			The proton-proton to hadron singular production spectrum in 1 / GeV
+	'''
+	i = sp.code(h, sp.HADRONS)
+	x, E, i = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float), i)
+	c = (i == sp.PI) | (i == sp.K)
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	prod = np.zeros(x.shape)
+	prod[c & ~bad] = meson_production(x[c & ~bad], E[c & ~bad], i[c & ~bad], p)
+	prod[~c & ~bad] = charmed_hadron_production(x[~c & ~bad], E[~c & ~bad], i[~c & ~bad], N, o, tol, p)
+	return prod
+
+
+def hadron_decay_neutrinos(Enu, Eh, h, p = None):
+	'''
+	Returns the hadron to neutrino singular decay spectrum for any species.
+
+		Parameters
+		----------
+		Enu : array_like
+			The energy of produced neutrinos as viewed from target rest coordinates in GeV
+		Eh : array_like
+			The energy of decayed hadrons as viewed from target rest coordinates in GeV
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic initial state observed, species codes broadcast against `Enu` and `Eh`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
+
+		Returns
+		-------
+		ndarray
+			The hadron to neutrino singular decay spectrum in 1 / GeV
+	'''
+	i = sp.code(h, sp.HADRONS)
+	Enu, Eh, i = np.broadcast_arrays(np.asarray(Enu, dtype=float), np.asarray(Eh, dtype=float), i)
+	c = (i == sp.PI) | (i == sp.K)
+	l = sp.l[i]
+	y = Enu / Eh
+	bad = bd.forbidden(y, y > 1 - l, 'Enu / Eh', None, 1 - l, p)
+	dec = np.zeros(Enu.shape)
+	dec[c & ~bad] = _meson_decay(y[c & ~bad], Eh[c & ~bad], i[c & ~bad])
+	dec[~c & ~bad] = _charmed_hadron_decay(y[~c & ~bad], Eh[~c & ~bad], i[~c & ~bad])
+	return dec
+
+
+def stacked_hadron_production(x, E, h = sp.HADRONS, N = 100, o = 'good', tol = None, p = None):
+	'''
+	Returns the proton-proton to hadron singular production spectra of several species in one pass.
+
+	Bounds, the proton inelastic cross section and the charm quark cross section of the fragmentation
+	convolution are evaluated once and shared by all requested species.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : array_like of int or str, optional
+			The types of hadron produced, stacked along a new leading axis
+		N : int, optional
+			The number of steps for integration accuracy
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		tol : float, optional
+			The relative tolerance of adaptive quadrature for charmed hadrons, fixed steps `N` if `None`
+		p : {'mask', 'clip', 'raise'}, optional
+			The policy for out of bounds values, the default of `bounds` if `None`
+
+		Returns
+		-------
+		ndarray
+			The proton-proton to hadron singular production spectra in 1 / GeV, one for every hadron in `h`
+	'''
+	i = np.atleast_1d(sp.code(h, sp.HADRONS))
+	x, E = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float))
+	bad = bd.forbidden(x, (x < 0) | (x > 1), 'x', 0.0, 1.0, p)
+	xs = x[~bad]
+	Es = E[~bad]
+	c = (i == sp.PI) | (i == sp.K)
+	prod = np.zeros((i.size, xs.size))
+	if np.any(c):
+		prod[c] = meson_production(xs[None, :], Es[None, :], i[c, None], p)
+	if not np.all(c) and tol is not None:
+		prod[~c] = [charmed_hadron_production(xs, Es, j, N, o, tol, p) for j in i[~c]]
+	elif not np.all(c):
+		u = cr.charmed_hadron_threshold_factor(xs[None, :], Es[None, :], i[~c, None])
+		conv = cr.charmed_hadron_stacked_convolution(xs, Es, i[~c], N, o=o, p=p)
+		M = sp.m[sp.PROTON]
+		s = 2 * (Es * M + M**2)
+		prod[~c] = u * conv / (Es * cr.cached_inelastic_hadron_proton_scattering(s, 'p'))
+	out = np.zeros(i.shape + x.shape)
+	out[:, ~bad] = prod
+	return out
+
+
+def _meson_decay(y, Eh, i):
+	'''Returns the pion or kaon to neutrino decay spectrum for energy fractions within bounds.'''
+	l = sp.l[i]
+	f = sp.f[i]
+	return f / (Eh * (1 - l))
+
+
+def _charmed_hadron_decay(y, Eh, i):
+	'''Returns the charmed hadron to neutrino decay spectrum for energy fractions within bounds.'''
+	l = sp.l[i]
+	f = sp.f[i]
 	a = 1 - l
 	b = 1 - 2 * l
 	D = 1 - 8 * l - 12 * l**2 * np.log(l) + 8 * l**3 - l**4
 	F = (6 * b * a**2 - 4 * a**3 - 12 * l**2 * a + 12 * l**2 * y - 6 * b * y**2 + 4 * y**3 + 12 * l**2 * np.log((1 - y) / l)) / D
 	return f * F / Eh
+
+
+def _meson_decay_primitive(y, i):
+	'''Returns `q(y)` of the double antiderivative `Eh * q(Enu / Eh)` of the pion or kaon decay spectrum.'''
+	c = 1 - sp.l[i]
+	f = sp.f[i]
+	y = np.minimum(y, c)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(y > 0, f * y / c * (1 + np.log(c / y)), 0.0)
+
+
+def _charmed_hadron_decay_primitive(y, i):
+	'''Returns `q(y)` of the double antiderivative `Eh * q(Enu / Eh)` of the charmed hadron decay spectrum.'''
+	l = sp.l[i]
+	f = sp.f[i]
+	a = 1 - l
+	b = 1 - 2 * l
+	D = 1 - 8 * l - 12 * l**2 * np.log(l) + 8 * l**3 - l**4
+	C = 6 * b * a**2 - 4 * a**3 - 12 * l**2 * a
+	def G(u):
+		return f * (C * u + 6 * l**2 * u**2 - 2 * b * u**3 + u**4 - 12 * l**2 * ((1 - u) * np.log1p(- u) + u + u * np.log(l))) / D
+	def H(u):
+		return f * ((C - 12 * l**2 * np.log(l)) * np.log(u) + 6 * l**2 * u - b * u**2 + u**3 / 3 + 12 * l**2 * ((1 - u) * np.log1p(- u) / u - spence(1 - u))) / D
+	y = np.minimum(y, a)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(y > 0, y * (G(a) / a + H(a) - H(y)), 0.0)
+
+
+def energy_bin_edges(E):
+	'''
+	Returns logarithmic bin edges centred on the given energies.
+
+		Parameters
+		----------
+		E : array_like
+			The ascending energy grid in GeV
+
+		Returns
+		-------
+		ndarray
+			The geometric means of neighbouring energies, extended by half a step at both ends
+	'''
+	lE = np.log(np.asarray(E, dtype=float))
+	m = (lE[1:] + lE[:-1]) / 2
+	return np.exp(np.concatenate([[2 * lE[0] - m[0]], m, [2 * lE[-1] - m[-1]]]))
+
+
+def decay_bin_average(Enu0, Enu1, Eh0, Eh1, h):
+	'''
+	Returns the hadron to neutrino decay spectrum integrated over hadron bins and averaged over neutrino bins.
+
+		Parameters
+		----------
+		Enu0, Enu1 : array_like
+			The lower and upper neutrino energy bin edges in GeV
+		Eh0, Eh1 : array_like
+			The lower and upper hadron energy bin edges in GeV, broadcast against `Enu0` and `Enu1`
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or array_like of int
+			The type of hadronic initial state observed, species codes broadcast against the bin edges
+
+		Returns
+		-------
+		ndarray
+			The bin averaged transfer from a hadron spectrum constant over each bin to the neutrino spectrum
+	'''
+	i = sp.code(h, sp.HADRONS)
+	c = (i == sp.PI) | (i == sp.K)
+	def Q(e, E):
+		y = e / E
+		return E * np.where(c, _meson_decay_primitive(y, np.where(c, i, sp.PI)), _charmed_hadron_decay_primitive(y, np.where(c, sp.D0, i)))
+	R = Q(Enu1, Eh1) - Q(Enu0, Eh1) - Q(Enu1, Eh0) + Q(Enu0, Eh0)
+	return np.maximum(R, 0.0) / (Enu1 - Enu0)
+
+
+def _transfer(Enu, Eh, h, allowed):
+	'''Returns the bin averaged decay transfer matrix of any species among the allowed codes.'''
+	i = sp.code(h, allowed)
+	e = np.asarray(Enu, dtype=float)[:, None]
+	E = np.asarray(Eh, dtype=float)[None, :]
+	return decay_bin_average(e[:-1], e[1:], E[:, :-1], E[:, 1:], i)
+
+
+def meson_decay_transfer(Enu, Eh, h):
+	'''
+	Returns the bin averaged pion or kaon to neutrino decay transfer matrix.
+
+		Parameters
+		----------
+		Enu : array_like
+			The ascending neutrino energy bin edges in GeV
+		Eh : array_like
+			The ascending meson energy bin edges in GeV
+		h : {'pi', 'k'} or int
+			The type of meson initital state observed
+
+		Returns
+		-------
+		ndarray
+			The matrix mapping a meson spectrum constant over each bin to the bin averaged neutrino spectrum,
+			integrating the decay spectrum exactly over both energy bins
+	'''
+	return _transfer(Enu, Eh, h, sp.MESONS)
+
+
+def charmed_hadron_decay_transfer(Enu, Eh, h):
+	'''
+	Returns the bin averaged charmed hadron to neutrino decay transfer matrix.
+
+		Parameters
+		----------
+		Enu : array_like
+			The ascending neutrino energy bin edges in GeV
+		Eh : array_like
+			The ascending charmed hadron energy bin edges in GeV
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or int
+			The type of hadronic initial state observed
+
+		Returns
+		-------
+		ndarray
+			The matrix mapping a hadron spectrum constant over each bin to the bin averaged neutrino spectrum,
+			integrating the decay spectrum exactly over both energy bins
+	'''
+	return _transfer(Enu, Eh, h, sp.CHARMED)
+
+
+def hadron_decay_transfer(Enu, Eh, h):
+	'''
+	Returns the bin averaged hadron to neutrino decay transfer matrix for any species.
+
+		Parameters
+		----------
+		Enu : array_like
+			The ascending neutrino energy bin edges in GeV
+		Eh : array_like
+			The ascending hadron energy bin edges in GeV
+		h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or int
+			The type of hadronic initial state observed
+
+		Returns
+		-------
+		ndarray
+			The matrix mapping a hadron spectrum constant over each bin to the bin averaged neutrino spectrum,
+			integrating the decay spectrum exactly over both energy bins
+	'''
+	return _transfer(Enu, Eh, h, sp.HADRONS)
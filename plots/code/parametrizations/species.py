@@ -0,0 +1,116 @@
+'''
+Registry of hadron species and their constants as described in the thesis document.
+
+Every species carries an integer code indexing the constant arrays below, so kernels broadcast over
+a species axis by fancy indexing instead of dispatching on strings. The six secondary hadrons come
+first, the proton as projectile and target of all collisions is appended last.
+
+	Constants
+	---------
+	NAMES
+		The lowercase identifyers accepted by all parametrizations
+	TITLES
+		The labels used in tabulated file headers
+	FILES
+		The file names used for tabulated spectra
+	PI, K, D0, DPLUS, DPLUSS, LAMPLUSC, PROTON
+		The integer codes of all species
+	HADRONS, MESONS, CHARMED, PROJECTILES
+		The integer codes of secondary hadrons, light mesons, charmed hadrons and scattering projectiles
+	m
+		The masses in GeV
+	tau
+		The mean lifetimes in s
+	l
+		The squared mass ratios of invisible decay products to the decaying hadron
+	f
+		The branching fractions to neutrinos in decay
+	F
+		The light meson production fractions relative to pions
+	N
+		The fragmentation function normalizations
+	eps
+		The fragmentation function hardness parameters
+	proxy
+		The codes of projectiles whose cross section approximates scattering off protons
+	P, R1, R2, sh
+		The total cross section parameters of scattering projectiles in mb and GeV**2
+
+	Functions
+	---------
+	code
+		Returns the integer codes of given species identifyers
+
+'''
+import numpy as np
+
+
+NAMES = ('pi', 'k', 'd0', 'd+', 'd+s', 'lam+c', 'p')
+TITLES = ('pi', 'K', 'D0', 'D+', 'D+s', 'Lam+c', 'p')
+FILES = ('pi', 'K', 'D0', 'Dplus', 'DplusS', 'LAMplusC', 'p')
+
+PI, K, D0, DPLUS, DPLUSS, LAMPLUSC, PROTON = range(7)
+
+HADRONS = np.array([PI, K, D0, DPLUS, DPLUSS, LAMPLUSC])
+MESONS = np.array([PI, K])
+CHARMED = np.array([D0, DPLUS, DPLUSS, LAMPLUSC])
+PROJECTILES = np.array([PROTON, PI, K])
+
+nan = np.nan
+
+m   = np.array([0.140, 0.494, 1.86, 1.87, 1.97, 2.29, 0.938])
+tau = np.array([26.03e-9, 12.38e-9, 0.410e-12, 1.033e-12, 0.501e-12, 0.203e-12, np.inf])
+l   = np.array([0.106**2 / 0.140**2, 0.106**2 / 0.494**2, 0.67**2 / 1.86**2, 0.63**2 / 1.87**2, 0.84**2 / 1.97**2, 1.27**2 / 2.29**2, nan])
+f   = np.array([0.9999, 0.6356, 0.067, 0.176, 0.065, 0.045, nan])
+F   = np.array([1, 0.12, nan, nan, nan, nan, nan])
+N   = np.array([nan, nan, 0.577, 0.238, 0.0327, 0.0067, nan])
+eps = np.array([nan, nan, 0.101, 0.104, 0.0322, 0.00418, nan])
+
+proxy = np.array([PI, K, K, K, K, K, PROTON])
+
+P   = np.array([18.75, 16.36, nan, nan, nan, nan, 34.41])
+R1  = np.array([ 9.56,  4.29, nan, nan, nan, nan, 13.07])
+R2  = np.array([1.767, 3.408, nan, nan, nan, nan,  7.39])
+sh  = np.array([10.23, 12.62, nan, nan, nan, nan, 15.98])
+
+
+def code(h, allowed = None):
+	'''
+	Returns the integer codes of given species identifyers.
+
+		Parameters
+		----------
+		h : str, int or array_like
+			The species as lowercase identifyer or integer code, arrays broadcast as species axis
+		allowed : array_like, optional
+			The codes accepted by the calling parametrization, all species if `None`
+
+		Returns
+		-------
+		ndarray
+			The integer species codes
+
+		Raises
+		------
+		ValueError
+			If any identifyer is unknown or not among the allowed codes
+	'''
+	if allowed is None:
+		allowed = np.arange(len(NAMES))
+	if isinstance(h, (str, int, np.integer)):
+		i = NAMES.index(h.lower()) if isinstance(h, str) and h.lower() in NAMES else h
+		valid = not isinstance(i, str) and i in allowed
+		i = np.asarray(i if valid else -1)
+	else:
+		h = np.asarray(h)
+		if h.dtype.kind in 'US':
+			i = np.vectorize(lambda s: NAMES.index(s.lower()) if s.lower() in NAMES else -1, otypes=[int])(h)
+		else:
+			i = h.astype(int)
+		ok = np.zeros(len(NAMES) + 1, dtype=bool)
+		ok[allowed] = True
+		valid = np.all(ok[np.clip(i, -1, len(NAMES))])
+	if not valid:
+		names = [f'`{NAMES[k]}`' for k in allowed]
+		raise ValueError(f'`{h}` is an invalid hadron identifyer, use {", ".join(names[:-1])} or {names[-1]} instead')
+	return i
@@ -0,0 +1,345 @@
+'''
+Monte Carlo population synthesis of magnetars with batches of sources evaluated across worker processes.
+
+Source parameters are drawn in batches from independent generators seeded by the run seed and the batch
+index, so a run is reproducible regardless of the number of workers. Every batch is evaluated as one
+magnetar ensemble and reduced to time integrated neutrino spectra, which update the running mean and
+quantile estimates per species and energy in batch order and are then discarded. Memory therefore stays
+constant in the number of samples.
+
+	Classes
+	-------
+	quantile_stream
+		Estimates quantiles of a stream of arrays elementwise with five markers per quantile
+
+	Functions
+	---------
+		sample_parameters
+			Returns magnetar and ejecta parameters drawn from the given distributions
+
+		population_batch
+			Returns the time integrated neutrino spectra of one batch of sampled magnetars
+
+		magnetar_population
+			Saves running quantiles and mean of integrated neutrino spectra of a magnetar population
+
+'''
+import numpy as np
+
+import concurrent.futures as cf
+import multiprocessing as mp
+import collections
+import itertools
+import time
+import os
+
+import code.parametrizations.cross_sections as cr
+import code.parametrizations.species as sp
+import code.store as st
+import code.scan as sc
+
+
+_MAGNETAR = ('R', 'B', 'o', 'chi', 'I')
+_EJECTA = ('f', 'b', 'M')
+_DISTRIBUTIONS = {
+	'B': ('lognormal', 14.5, 0.3),
+	'o': ('loguniform', 1e3, 1e4),
+	'b': ('uniform', 5e-2, 2e-1),
+	'M': ('loguniform', 1e0, 1e1),
+}
+
+
+class quantile_stream:
+	'''
+	Estimates quantiles of a stream of arrays elementwise with five markers per quantile.
+
+	Implements the P-squared algorithm of Jain and Chlamtac (1985), which keeps the minimum, the maximum,
+	the quantile and two intermediate marker heights per element and adjusts them by piecewise parabolic
+	interpolation for every observation. Memory is independent of the number of observations.
+
+	Attributes
+	----------
+	Q : ndarray
+		The estimated quantiles as probabilities
+	n : int
+		The number of observations
+
+	Methods
+	-------
+	__init__
+		Constructs the quantile estimator for arrays of a given shape
+
+	update
+		Adds observations in order
+
+	quantiles
+		Returns the current quantile estimates
+
+	'''
+
+	def __init__(self, Q, shape):
+		'''
+		Constructs the quantile estimator for arrays of a given shape.
+
+		Parameters
+		----------
+		Q : array_like
+			The estimated quantiles as probabilities strictly between 0 and 1
+		shape : tuple of int
+			The shape of every observation
+		'''
+		self.Q = np.atleast_1d(np.asarray(Q, dtype=float))
+		if np.any((self.Q <= 0) | (self.Q >= 1)):
+			raise ValueError(f'quantiles must be strictly between 0 and 1, got {self.Q}')
+		self.n = 0
+		self._shape = tuple(shape)
+		self._buf = []
+		p = self.Q[:, None]
+		self._dd = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)])
+		self._d = 1 + 4 * self._dd
+		self._q = None
+		self._k = None
+
+	def _add(self, x):
+		'''
+		Adds a single flattened observation to the markers.
+
+		Parameters
+		----------
+		x : ndarray
+			The flattened observation
+
+		Returns
+		-------
+			None
+		'''
+		q = self._q
+		k = self._k
+		q[:, 0] = np.minimum(q[:, 0], x)
+		q[:, 4] = np.maximum(q[:, 4], x)
+		c = (x >= q[:, 1:4]).sum(axis=1)
+		k[:, 1:] += np.arange(1, 5)[None, :, None] > c[:, None, :]
+		self._d += self._dd
+		for i in (1, 2, 3):
+			d = self._d[:, i, None] - k[:, i]
+			up = (d >= 1) & (k[:, i + 1] - k[:, i] > 1)
+			down = (d <= -1) & (k[:, i - 1] - k[:, i] < -1)
+			if not (up.any() or down.any()):
+				continue
+			s = up.astype(float) - down
+			q0, qi, q1 = q[:, i - 1], q[:, i], q[:, i + 1]
+			k0, ki, k1 = k[:, i - 1], k[:, i], k[:, i + 1]
+			par = qi + s / (k1 - k0) * ((ki - k0 + s) * (q1 - qi) / (k1 - ki) + (k1 - ki - s) * (qi - q0) / (ki - k0))
+			lin = qi + s * np.where(s > 0, (q1 - qi) / (k1 - ki), (q0 - qi) / (k0 - ki))
+			q[:, i] = np.where(up | down, np.where((q0 < par) & (par < q1), par, lin), qi)
+			k[:, i] += s
+
+	def update(self, x):
+		'''
+		Adds observations in order.
+
+		Parameters
+		----------
+		x : array_like
+			The observations stacked along a leading axis, each of the shape given on construction
+
+		Returns
+		-------
+			None
+		'''
+		x = np.asarray(x, dtype=float).reshape((-1,) + self._shape)
+		for row in x.reshape(len(x), -1):
+			self.n += 1
+			if self._q is None:
+				self._buf.append(row)
+				if len(self._buf) == 5:
+					q = np.sort(np.stack(self._buf), axis=0)
+					self._q = np.repeat(q[None], len(self.Q), axis=0)
+					self._k = np.broadcast_to(np.arange(1.0, 6.0)[None, :, None], self._q.shape).copy()
+					self._buf = []
+				continue
+			self._add(row)
+
+	def quantiles(self):
+		'''
+		Returns the current quantile estimates.
+
+		Returns
+		-------
+		ndarray
+			The quantile estimates of shape (len(Q), *shape), exact for fewer than five observations
+		'''
+		if self.n == 0:
+			raise ValueError('no observations to estimate quantiles from')
+		if self._q is None:
+			return np.quantile(np.stack(self._buf), self.Q, axis=0).reshape((-1,) + self._shape)
+		return self._q[:, 2].reshape((-1,) + self._shape)
+
+
+def sample_parameters(n, g, P = None):
+	'''
+	Returns magnetar and ejecta parameters drawn from the given distributions.
+
+	Parameters
+	----------
+	n : int
+		The number of samples
+	g : numpy.random.Generator
+		The random number generator
+	P : dict, optional
+		The distributions keyed by parameter name, each a fixed value or a tuple `('uniform', lo, hi)`,
+		`('loguniform', lo, hi)`, `('normal', mean, std)` or `('lognormal', mean, std)` with mean and
+		standard deviation of the decimal logarithm. Defaults to a log-normal field strength around
+		10**14.5 G, log-uniform initial angular frequency and ejecta mass and uniform velocity fraction
+
+	Returns
+	-------
+	dict
+		The sampled parameters as arrays of length `n`
+	'''
+	P = _DISTRIBUTIONS if P is None else P
+	bad = set(P) - set(_MAGNETAR + _EJECTA)
+	if bad:
+		raise ValueError(f'`{", ".join(sorted(bad))}` are not valid population parameters, use any of `{", ".join(_MAGNETAR + _EJECTA)}` instead')
+	res = {}
+	for k in sorted(P):
+		v = P[k]
+		if not isinstance(v, tuple):
+			res[k] = np.full(n, float(v))
+			continue
+		match v[0]:
+			case 'uniform':
+				res[k] = g.uniform(v[1], v[2], n)
+			case 'loguniform':
+				res[k] = np.exp(g.uniform(np.log(v[1]), np.log(v[2]), n))
+			case 'normal':
+				res[k] = g.normal(v[1], v[2], n)
+			case 'lognormal':
+				res[k] = 10**g.normal(v[1], v[2], n)
+			case _:
+				raise ValueError(f'`{v[0]}` is not a valid distribution of `{k}`, use `uniform`, `loguniform`, `normal` or `lognormal` instead')
+	return res
+
+
+def population_batch(i, n, s = 0, P = None, Kt = 500, KE = 100, K = 100, w = (1e3, 1e7), f = 1e-1, b = 1e-1, M = 1e1, D = False, O = False, N = 100, T = False):
+	'''
+	Returns the time integrated neutrino spectra of one batch of sampled magnetars.
+
+	Sampled grids never repeat, so the shared inelastic cross section cache is cleared afterwards
+	instead of filling up with entries of every batch.
+
+	Parameters
+	----------
+	i : int
+		The batch index, drawn from the generator seeded by `s` and `i`
+	n : int
+		The number of sources in the batch
+	s : int, optional
+		The seed of the run
+	P : dict, optional
+		The parameter distributions as taken by `sample_parameters`
+	Kt : int, optional
+		The number of points in time
+	KE : int, optional
+		The number of hadron energy values
+	K : int, optional
+		The number of neutrino energy values
+	w : tuple of float, optional
+		The lower and upper temporal bounds of integration in s, interpolated within cells
+	f, b, M : float, optional
+		The acceleration efficiency, ejecta velocity fraction and ejecta mass in solar masses used
+		unless drawn from `P`
+	D, O, N, T
+		As for `magnetar.hadron_spectra`
+
+	Returns
+	-------
+	ndarray
+		The integrated neutrino spectra in 1 / GeV of shape (n, hadrons, K)
+	'''
+	import code.magnetar as mg
+	g = np.random.default_rng(np.random.SeedSequence(s, spawn_key=(i,)))
+	p = sample_parameters(n, g, P)
+	ej = {'f': f, 'b': b, 'M': M}
+	ej.update({k: p[k].reshape(-1, 1, 1) for k in _EJECTA if k in p})
+	ens = mg.magnetar_ensemble(**{k: p[k] for k in _MAGNETAR if k in p})
+	if len(ens) != n:
+		ens = ens[np.zeros(n, dtype=int)]
+	t = np.logspace(1, 8, Kt)
+	E = np.logspace(5, 12, K)
+	try:
+		spec = ens.neutrino_spectra(t, np.logspace(5, 12, KE), E, D = D, O = O, N = N, T = T, **ej)
+	finally:
+		cr.inelastic_cache.clear()
+	C = mg.cumulative_time_integral(spec, t)
+	return np.moveaxis(mg.time_integral_at(C, spec, t, w[1]) - mg.time_integral_at(C, spec, t, w[0]), 1, 0)[..., 0]
+
+
+def magnetar_population(reg, n = 1000, k = 8, s = 0, P = None, Q = (0.05, 0.16, 0.5, 0.84, 0.95), W = None, S = 1, C = 10, **kwargs):
+	'''
+	Saves running quantiles and mean of integrated neutrino spectra of a magnetar population.
+
+	Batches are submitted to `W` worker processes with at most two pending per worker and reduced in
+	batch order, so results depend on the seed and batch size only. Quantiles are estimated from the
+	decimal logarithm of the spectra. Both tables are saved every `C` batches and at the end.
+
+	Parameters
+	----------
+	reg : string
+		The directory string to which files are saved
+	n : int, optional
+		The number of sampled magnetars
+	k : int, optional
+		The number of magnetars per batch
+	s : int, optional
+		The seed of the run
+	P : dict, optional
+		The parameter distributions as taken by `sample_parameters`
+	Q : sequence of float, optional
+		The estimated quantiles as probabilities
+	W : int, optional
+		The number of worker processes, all available cores divided by `S` if `None`
+	S : int, optional
+		The number of threads per worker process
+	C : int, optional
+		The number of batches between saves of the running results
+	**kwargs
+		The spectrum options passed to `population_batch`
+
+	Returns
+	-------
+		None
+	'''
+	if W is None:
+		W = max(1, (os.cpu_count() or 1) // S)
+	if n < 1 or k < 1 or W < 1 or S < 1:
+		raise ValueError(f'`n`, `k`, `W` and `S` must be positive, got {n}, {k}, {W} and {S}')
+	P = _DISTRIBUTIONS if P is None else P
+	K = kwargs.get('K', 100)
+	E = np.logspace(5, 12, K)
+	H = [sp.FILES[i] for i in sp.HADRONS]
+	qs = quantile_stream(Q, (len(H), K))
+	tot = np.zeros((len(H), K))
+	L = -(-n // k)
+	info = f'# Population:\n#     n = {n}\n#     s = {s}\n' + '\n'.join(f'#     {p} = {v}' for p, v in sorted(P.items()))
+	dist = {p: list(v) if isinstance(v, tuple) else v for p, v in P.items()}
+	axes = [('species', '', H), ('energy', 'GeV', E)]
+	start = time.perf_counter()
+	with sc.thread_limit(S), cf.ProcessPoolExecutor(max_workers=W, mp_context=mp.get_context('spawn')) as pool:
+		batches = iter(range(L))
+		jobs = collections.deque(pool.submit(population_batch, i, min(k, n - i * k), s, P, **kwargs) for i in itertools.islice(batches, 2 * W))
+		for i in range(L):
+			spec = jobs.popleft().result()
+			j = next(batches, None)
+			if j is not None:
+				jobs.append(pool.submit(population_batch, j, min(k, n - j * k), s, P, **kwargs))
+			tot += spec.sum(axis=0)
+			qs.update(np.log10(np.maximum(spec, 1e-300)))
+			rate = qs.n / (time.perf_counter() - start) * 3600
+			print(f'# {qs.n} / {n} magnetars   {rate:.1f} magnetars / h')
+			if (i + 1) % C == 0 or i + 1 == L:
+				q = qs.quantiles()
+				q = np.moveaxis(np.where(q > -299, 10**q, 0.0), 0, -1)
+				el = time.perf_counter() - start
+				st.save(f'{reg}/quantiles', q, axes + [('quantile', '', qs.Q)], '1/GeV', 'Integrated Spectrum Quantiles', info, elapsed = el, samples = qs.n, seed = s, distributions = dist)
+				st.save(f'{reg}/mean', tot / qs.n, axes, '1/GeV', 'Mean Integrated Spectrum', info, elapsed = el, samples = qs.n, seed = s, distributions = dist)
@@ -0,0 +1,205 @@
+'''
+Parallel parameter scans of the magnetar model over a bounded pool of worker processes.
+
+	Functions
+	---------
+		parameter_grid
+			Returns the list of scan points spanned by all combinations of the given parameter values
+
+		point_directory
+			Returns the directory name of a single scan point
+
+		thread_limit
+			Limits the threads of numerical libraries in spawned worker processes within a block
+
+		scan_point
+			Runs the hadron, neutrino and integrated neutrino spectra and optional events of a single scan point
+
+		magnetar_scan
+			Runs a parameter scan of the magnetar model across worker processes with resumption
+
+'''
+import numpy as np
+from warnings import warn
+
+import concurrent.futures as cf
+import multiprocessing as mp
+import contextlib
+import itertools
+import datetime
+import time
+import os
+
+
+_MAGNETAR = ('R', 'B', 'o', 'chi', 'I', 'm')
+_HADRONS = ('Kt', 'KE', 'f', 'b', 'M', 'D', 'O', 'N', 'T')
+_NEUTRINOS = ('K',)
+_THREADS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS', 'NUMBA_NUM_THREADS')
+
+
+def parameter_grid(**kwargs):
+	'''
+	Returns the list of scan points spanned by all combinations of the given parameter values.
+
+	Parameters
+	----------
+	**kwargs
+		The parameter names with either a single value or a list of values each
+
+	Returns
+	-------
+	list of dict
+		The scan points in row major order of the given parameters
+	'''
+	keys = list(kwargs)
+	vals = [v if isinstance(v, (list, tuple, np.ndarray)) else [v] for v in kwargs.values()]
+	return [dict(zip(keys, c)) for c in itertools.product(*vals)]
+
+
+def point_directory(p):
+	'''
+	Returns the directory name of a single scan point.
+
+	Parameters
+	----------
+	p : dict
+		The parameters of the scan point
+
+	Returns
+	-------
+	string
+		The directory name listing all parameters in sorted order, floats by their shortest exact repr
+	'''
+	return '_'.join(f'{k}={float(v)!r}' if isinstance(v, (float, np.floating)) else f'{k}={str(v).replace(" ", "-")}' for k, v in sorted(p.items()))
+
+
+@contextlib.contextmanager
+def thread_limit(S):
+	'''
+	Limits the threads of numerical libraries in spawned worker processes within a block.
+
+	The thread environment variables are read by BLAS, OpenMP and numba at import, so they apply to
+	processes spawned within the block and are restored on leaving it.
+
+	Parameters
+	----------
+	S : int
+		The number of threads per worker process
+
+	Returns
+	-------
+		None
+	'''
+	env = {k: os.environ.get(k) for k in _THREADS}
+	os.environ.update({k: str(S) for k in _THREADS})
+	try:
+		yield
+	finally:
+		for k, v in env.items():
+			if v is None:
+				os.environ.pop(k, None)
+			else:
+				os.environ[k] = v
+
+
+def scan_point(p, reg, F = None):
+	'''
+	Runs the hadron, neutrino and integrated neutrino spectra and optional events of a single scan point.
+
+	Completion is marked by a `done.txt` file written last, so interrupted points are recomputed.
+
+	Parameters
+	----------
+	p : dict
+		The parameters of the scan point, passed on to the magnetar object and spectrum functions
+	reg : string
+		The directory string under which the scan point directory is created
+	F : dict, optional
+		The paths of effective area tables keyed by flavor, folded with the integrated spectra if given
+
+	Returns
+	-------
+	float
+		The elapsed time in s
+	'''
+	import code.magnetar as mg
+	import code.detector as dt
+	bad = set(p) - set(_MAGNETAR + _HADRONS + _NEUTRINOS)
+	if bad:
+		raise ValueError(f'`{", ".join(sorted(bad))}` are not valid scan parameters, use any of `{", ".join(_MAGNETAR + _HADRONS + _NEUTRINOS)}` instead')
+	start = time.perf_counter()
+	out = os.path.join(reg, point_directory(p))
+	os.makedirs(out, exist_ok=True)
+	mag = mg.magnetar(**{k: v for k, v in p.items() if k in _MAGNETAR})
+	mg.magnetar_hadron_spectrum(mag, out, **{k: v for k, v in p.items() if k in _HADRONS})
+	mg.magnetar_neutrino_spectrum(mag, out, **{k: v for k, v in p.items() if k in _NEUTRINOS})
+	mg.magnetar_integrated_neutrino_spectrum(mag, out)
+	if F is not None:
+		dt.detector_events(f'{out}/integrate', f'{out}/events', F)
+	end = time.perf_counter()
+	with open(os.path.join(out, 'done.tmp'), 'w') as file:
+		file.write(f'# Scan Point - {datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}\n')
+		file.write(f'# {p}\n')
+		file.write(f'# Elapsed Time / s\n')
+		file.write(f'# {end - start}')
+	os.replace(os.path.join(out, 'done.tmp'), os.path.join(out, 'done.txt'))
+	return end - start
+
+
+def magnetar_scan(P, reg, W = None, S = 1, F = None):
+	'''
+	Runs a parameter scan of the magnetar model across worker processes with resumption.
+
+	Points with a `done.txt` file in their directory are skipped, so an interrupted scan resumes where
+	it stopped. Workers are spawned with one BLAS and numba thread each unless `S` is changed, so that
+	`W` workers use `W * S` cores in total. Per point timings and the throughput are printed and appended
+	to `scan.txt` in `reg`.
+
+	Parameters
+	----------
+	P : list of dict or dict
+		The scan points, or the parameter values spanning a grid as taken by `parameter_grid`
+	reg : string
+		The directory string under which all scan point directories are created
+	W : int, optional
+		The number of worker processes, all available cores divided by `S` if `None`
+	S : int, optional
+		The number of threads per worker process
+	F : dict, optional
+		The paths of effective area tables keyed by flavor, folded with the integrated spectra of every point if given
+
+	Returns
+	-------
+	dict
+		The elapsed times in s of all points computed in this run, keyed by point directory
+	'''
+	if isinstance(P, dict):
+		P = parameter_grid(**P)
+	if W is None:
+		W = max(1, (os.cpu_count() or 1) // S)
+	if W < 1 or S < 1:
+		raise ValueError(f'`W` and `S` must be positive, got {W} and {S}')
+	os.makedirs(reg, exist_ok=True)
+	todo = [p for p in P if not os.path.exists(os.path.join(reg, point_directory(p), 'done.txt'))]
+	print(f'# Scan: {len(P) - len(todo)} of {len(P)} points done, {len(todo)} left on {W} workers')
+	res = {}
+	start = time.perf_counter()
+	with thread_limit(S), cf.ProcessPoolExecutor(max_workers=W, mp_context=mp.get_context('spawn')) as pool:
+		jobs = {pool.submit(scan_point, p, reg, F): p for p in todo}
+		with open(os.path.join(reg, 'scan.txt'), 'a') as file:
+			for job in cf.as_completed(jobs):
+				name = point_directory(jobs[job])
+				try:
+					res[name] = job.result()
+				except Exception as err:
+					warn(f'scan point `{name}` failed with `{err!r}`')
+					continue
+				rate = len(res) / (time.perf_counter() - start) * 3600
+				line = f'{name}   {res[name]:.3f} s   {rate:.1f} points / h'
+				print(f'# {len(res)} / {len(todo)}   {line}')
+				file.write(f'{line}\n')
+				file.flush()
+	end = time.perf_counter()
+	if res:
+		print(f'# Scan: {len(res)} points in {end - start:.1f} s, {len(res) / (end - start) * 3600:.1f} points / h')
+	return res
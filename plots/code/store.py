@@ -0,0 +1,393 @@
+'''
+Binary storage of tabulated spectra as raw `.npy` arrays with a JSON metadata block.
+
+A table stored under `path` consists of `path.npy`, readable by `np.load` with memory mapping, and
+`path.json`, holding the title, unit, axes, creation date and free text description such as the
+printed magnetar parameters.
+
+	Classes
+	-------
+	dataset
+		Collects a stored table with its labelled axes for selections read lazily from disk
+
+	Functions
+	---------
+		save
+			Saves an array with its axes and description to the binary store
+
+		load
+			Returns a memory mapped array and its metadata from the binary store
+
+		annotate
+			Adds entries to the metadata block of a stored table
+
+		export_text
+			Prints a stored table to tabulated text files as written by previous versions
+
+'''
+import numpy as np
+
+import datetime
+import json
+import os
+
+
+def save(path, a, axes, unit = '', title = '', info = '', **kwargs):
+	'''
+	Saves an array with its axes and description to the binary store.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+	a : array_like
+		The tabulated values
+	axes : sequence of tuple
+		The name, unit and values of every axis of `a` in order, values may be strings for labels
+	unit : string, optional
+		The unit of the tabulated values
+	title : string, optional
+		The title of the table
+	info : string, optional
+		The free text description such as printed model parameters
+	**kwargs
+		Further entries of the metadata block, must be serializable to JSON
+
+	Returns
+	-------
+		None
+	'''
+	a = np.asarray(a)
+	if len(axes) != a.ndim:
+		raise ValueError(f'`axes` describes {len(axes)} axes but the array has {a.ndim}')
+	for n, (name, _, val) in enumerate(axes):
+		if len(val) != a.shape[n]:
+			raise ValueError(f'axis `{name}` has {len(val)} values but the array has {a.shape[n]} along it')
+	meta = {
+		'title': title,
+		'unit': unit,
+		'shape': list(a.shape),
+		'axes': [{'name': name, 'unit': u, 'values': np.asarray(val).tolist()} for name, u, val in axes],
+		'info': info,
+		'created': datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S'),
+	}
+	meta.update(kwargs)
+	os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+	with open(f'{path}.tmp.npy', 'wb') as file:
+		np.save(file, np.ascontiguousarray(a))
+	with open(f'{path}.tmp.json', 'w') as file:
+		json.dump(meta, file, indent=1)
+	os.replace(f'{path}.tmp.npy', f'{path}.npy')
+	os.replace(f'{path}.tmp.json', f'{path}.json')
+
+
+def load(path, m = True):
+	'''
+	Returns a memory mapped array and its metadata from the binary store.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+	m : bool, optional
+		The option to map the array read only from disk instead of reading it into memory
+
+	Returns
+	-------
+	ndarray
+		The tabulated values
+	dict
+		The metadata block with axis values converted to arrays
+	'''
+	a = np.load(f'{path}.npy', mmap_mode='r' if m else None)
+	with open(f'{path}.json') as file:
+		meta = json.load(file)
+	for ax in meta['axes']:
+		ax['values'] = np.asarray(ax['values'])
+	return a, meta
+
+
+def annotate(path, **kwargs):
+	'''
+	Adds entries to the metadata block of a stored table.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+	**kwargs
+		The entries added or replaced, must be serializable to JSON
+
+	Returns
+	-------
+		None
+	'''
+	with open(f'{path}.json') as file:
+		meta = json.load(file)
+	meta.update(kwargs)
+	with open(f'{path}.tmp.json', 'w') as file:
+		json.dump(meta, file, indent=1)
+	os.replace(f'{path}.tmp.json', f'{path}.json')
+
+
+def _header(file, meta, name = None):
+	'''
+	Prints the commented header of a text table.
+
+	Parameters
+	----------
+	file : file
+		The open text file
+	meta : dict
+		The metadata block of the stored table
+	name : string, optional
+		The label printed in front of the title
+
+	Returns
+	-------
+		None
+	'''
+	label = f'`{name}` ' if name is not None else ''
+	file.write(f'# {label}{meta["title"]} / {meta["unit"]} - {meta["created"]}\n')
+	if meta['info']:
+		file.write(f'{meta["info"]}\n')
+
+
+def export_text(path, out = None):
+	'''
+	Prints a stored table to tabulated text files as written by previous versions.
+
+	A leading `species` axis is split into one file per species in the directory `out`. Tables over
+	energy and time are printed as matrices with a separate `axes.txt`, all others as columns led by
+	their longer axis.
+
+	Parameters
+	----------
+	path : string
+		The path of the table without file extension
+	out : string, optional
+		The directory or file path without extension to print to, `path` if `None`
+
+	Returns
+	-------
+		None
+	'''
+	a, meta = load(path)
+	out = path if out is None else out
+	axes = meta['axes']
+	if axes[0]['name'] == 'species':
+		os.makedirs(out, exist_ok=True)
+		blocks = [(str(s), a[i], f'{out}/{s}.txt') for i, s in enumerate(axes[0]['values'])]
+		axes = axes[1:]
+	else:
+		os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+		blocks = [(None, a, f'{out}.txt')]
+	for name, b, fname in blocks:
+		with open(fname, 'w') as file:
+			_header(file, meta, name)
+			if b.ndim == 2 and axes[-1]['name'] == 'time':
+				for ax, side in zip(axes, ('vertical', 'horizontal')):
+					file.write(f'# {ax["name"].capitalize()} / {ax["unit"]} ({side} axis)\n')
+				np.savetxt(file, b)
+				continue
+			if b.ndim == 2:
+				k = int(b.shape[1] > b.shape[0])
+				x, cols, c = axes[k], np.moveaxis(b, k, 0), axes[1 - k]['values']
+				labels = [str(v) if c.dtype.kind in 'US' else ' - '.join(f'{u:.0e}' for u in np.atleast_1d(v)) for v in c]
+			else:
+				x, cols, labels = axes[0], b[:, None], ['']
+			file.write(f'# {x["name"].capitalize()} / {x["unit"]} ')
+			file.write(' '.join(f'# {meta["title"]} ({l}) / {meta["unit"]}' if l else f'# {meta["title"]} / {meta["unit"]}' for l in labels))
+			file.write('\n')
+			np.savetxt(file, np.column_stack((x['values'], cols)), delimiter='   ')
+	if axes[-1]['name'] == 'time' and len(axes) == 2:
+		with open(f'{out}/axes.txt' if blocks[0][0] is not None else f'{out}.axes.txt', 'w') as file:
+			file.write(f'# {meta["title"]} / {meta["unit"]} - {meta["created"]}\n{meta["info"]}')
+			for ax, side in zip(axes[::-1], ('horizontal', 'vertical')):
+				file.write(f'\n# {ax["name"].capitalize()} / {ax["unit"]} ({side} axis)\n')
+				np.savetxt(file, ax['values'], newline=' ')
+			if 'elapsed' in meta:
+				file.write(f'\n# Elapsed Time / s\n')
+				file.write(f'# {meta["elapsed"]}')
+
+
+class dataset:
+	'''
+	Collects a stored table with its labelled axes for selections read lazily from disk.
+
+	Attributes
+	----------
+	path : string
+		The path of the table without file extension, `None` for selections held in memory
+	meta : dict
+		The metadata block with axis values converted to arrays
+	names : tuple of string
+		The axis names in order
+	title : string
+		The title of the table
+	unit : string
+		The unit of the tabulated values
+
+	Methods
+	-------
+	__init__
+		Constructs the dataset from a stored table without reading the array
+
+	__array__
+		Returns the tabulated values read into memory
+
+	axis
+		Returns the values of an axis
+
+	index
+		Returns the index of the nearest axis value or matching label
+
+	sel
+		Returns the dataset restricted to labels, nearest values or closed windows along axes
+
+	'''
+
+	def __init__(self, path):
+		'''
+		Constructs the dataset from a stored table without reading the array.
+
+		Parameters
+		----------
+		path : string
+			The path of the table without file extension
+		'''
+		a, meta = load(path)
+		self._set(a, meta, path)
+
+	def _set(self, a, meta, path):
+		'''
+		Sets all attributes from an array and its metadata block.
+
+		Parameters
+		----------
+		a : ndarray
+			The tabulated values, memory mapped or held in memory
+		meta : dict
+			The metadata block with axis values converted to arrays
+		path : string
+			The path of the table without file extension
+		'''
+		self.path = path
+		self.meta = meta
+		self.names = tuple(ax['name'] for ax in meta['axes'])
+		self.title = meta['title']
+		self.unit = meta['unit']
+		self._a = a
+
+	def __repr__(self):
+		'''Defines string output for printing the dataset object.'''
+		axes = ', '.join(f'{ax["name"]}: {len(ax["values"])}' for ax in self.meta['axes'])
+		return f'dataset({self.title} / {self.unit}; {axes})'
+
+	def __array__(self, dtype = None, copy = None):
+		'''
+		Returns the tabulated values read into memory.
+
+		Parameters
+		----------
+		dtype : data-type, optional
+			The requested data type
+		copy : bool, optional
+			Ignored, the values are always read into a new array
+
+		Returns
+		-------
+		ndarray
+			The tabulated values
+		'''
+		return np.array(self._a, dtype=dtype)
+
+	def axis(self, name):
+		'''
+		Returns the values of an axis.
+
+		Parameters
+		----------
+		name : string
+			The axis name
+
+		Returns
+		-------
+		ndarray
+			The axis values
+		'''
+		if name not in self.names:
+			raise ValueError(f'`{name}` is not an axis of the dataset, use any of `{", ".join(self.names)}` instead')
+		return self.meta['axes'][self.names.index(name)]['values']
+
+	def index(self, name, v):
+		'''
+		Returns the index of the nearest axis value or matching label.
+
+		Parameters
+		----------
+		name : string
+			The axis name
+		v : float or string
+			The value or label looked up
+
+		Returns
+		-------
+		int
+			The index along the axis
+		'''
+		val = self.axis(name)
+		if val.dtype.kind in 'US':
+			if str(v) not in val:
+				raise ValueError(f'`{v}` is not a label of axis `{name}`, use any of `{", ".join(val)}` instead')
+			return int(np.flatnonzero(val == str(v))[0])
+		if val.ndim > 1:
+			raise ValueError(f'axis `{name}` has no scalar values to look up')
+		return int(np.abs(val - v).argmin())
+
+	def sel(self, **kwargs):
+		'''
+		Returns the dataset restricted to labels, nearest values or closed windows along axes.
+
+		Only the selected part of the table is read from disk. A single value or label drops its axis,
+		a list of values or labels keeps the nearest entries and a tuple `(lo, hi)` keeps the closed window.
+
+		Parameters
+		----------
+		**kwargs
+			The axis names with a value, label, list of either or window tuple each
+
+		Returns
+		-------
+		dataset
+			The selected part of the table held in memory
+		'''
+		a = self._a
+		meta = dict(self.meta)
+		axes = [dict(ax) for ax in meta['axes']]
+		sel = {}
+		for name, v in kwargs.items():
+			val = self.axis(name)
+			if isinstance(v, tuple):
+				if len(v) != 2:
+					raise ValueError(f'window for axis `{name}` must be a tuple `(lo, hi)`, got {v}')
+				i = np.flatnonzero((val >= v[0]) & (val <= v[1]))
+				sel[name] = slice(i[0], i[-1] + 1) if len(i) else slice(0, 0)
+			elif isinstance(v, (list, np.ndarray)):
+				sel[name] = [self.index(name, u) for u in v]
+			else:
+				sel[name] = self.index(name, v)
+		k = 0
+		for n, ax in enumerate(self.meta['axes']):
+			i = sel.get(ax['name'], slice(None))
+			a = a[(slice(None),) * k + (i,)]
+			if isinstance(i, int):
+				meta['selected'] = dict(meta.get('selected', {}), **{ax['name']: ax['values'][i].tolist()})
+				axes[n] = None
+			else:
+				axes[n]['values'] = ax['values'][i]
+				k += 1
+		meta['axes'] = [ax for ax in axes if ax is not None]
+		out = dataset.__new__(dataset)
+		out._set(np.array(a), meta, None)
+		return out
@@ -0,0 +1,244 @@
+'''
+Interpolation tables of the charmed hadron production spectrum with an on-disk cache.
+
+	Classes
+	-------
+	production_table
+		Collects a spline lookup of the charmed hadron production spectrum on logarithmic axes
+
+	Functions
+	---------
+	tabulated_charmed_hadron_production
+		Returns the proton-proton to charmed hadron singular production spectrum from a cached table
+
+	tabulated_stacked_hadron_production
+		Returns the proton-proton to hadron singular production spectra of several species with cached charm tables
+
+'''
+import numpy as np
+from scipy.interpolate import RectBivariateSpline
+from warnings import warn, catch_warnings, simplefilter
+
+import hashlib
+import inspect
+import os
+
+import code.parametrizations.bounds as bd
+import code.parametrizations.cross_sections as cr
+import code.parametrizations.distribution_spectra as ds
+import code.parametrizations.fragmentation_function as ff
+import code.parametrizations.species as sp
+
+
+class production_table:
+	'''
+	Collects a spline lookup of the charmed hadron production spectrum on logarithmic axes.
+
+	The smooth part `log(E * F / (a * u))` of the spectrum `F`, with the threshold factor `u` and
+	the charm quark normalization `a` taken out, is sampled on a uniform grid in log E and in the
+	logit `log(x / (1 - x))`, which resolves both the small x power law and the fall off towards
+	`x = 1`. The grid is doubled until a bicubic spline reproduces the direct quadrature within the
+	relative tolerance at all cell and edge midpoints. Queries outside the tabulated domain are
+	passed on to the direct quadrature. Tables are written to a temporary file of the process and
+	renamed, so that parallel workers never read a partially written table.
+
+	Attributes
+	----------
+	h : {'d0', 'd+', 'd+s', 'lam+c'}
+		The type of hadron produced
+	o : {'good', 'bad'}
+		The option to use either good or bad charm quark parameters
+	N : int
+		The number of steps for integration accuracy
+	tol : float
+		The requested relative error bound
+	X : tuple of float
+		The tabulated range of energy ratios x
+	Y : tuple of float
+		The tabulated range of projectile energies in GeV
+	err : float
+		The largest relative error found at the check points
+	key : string
+		The hash of all parameters and the source code of the parametrizations and this class
+
+	Methods
+	-------
+	__init__
+		Loads the table from disk or builds and stores it
+
+	__call__
+		Returns the tabulated production spectrum
+
+	'''
+
+	def __init__(self, h, o = 'good', N = 100, tol = 1e-4, X = (1e-10, 0.99), Y = (3e4, 1e12), reg = 'code/tabulate/cache'):
+		'''
+		Loads the table from disk or builds and stores it.
+
+		Parameters
+		----------
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or int
+			The type of hadron produced
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		N : int, optional
+			The number of steps for integration accuracy
+		tol : float, optional
+			The requested relative error bound
+		X : tuple of float, optional
+			The tabulated range of energy ratios x
+		Y : tuple of float, optional
+			The tabulated range of projectile energies in GeV
+		reg : string, optional
+			The directory string to which tables are saved
+		'''
+		self.h = sp.NAMES[int(sp.code(h, sp.CHARMED))]
+		self.o = o.lower()
+		self.N = N
+		self.tol = tol
+		self.X = X
+		self.Y = Y
+		src = ''.join(inspect.getsource(mod) for mod in (bd, cr, ds, ff, sp)) + inspect.getsource(production_table)
+		par = f'{self.h} {self.o} {N} {tol} {X} {Y}'
+		self.key = hashlib.sha1((par + src).encode()).hexdigest()[:16]
+		file = f'{reg}/{self.h}-{self.o}-{self.key}.npz'
+		if os.path.exists(file):
+			with np.load(file) as data:
+				lx, lE, g, err = data['lx'], data['lE'], data['g'], float(data['err'])
+		else:
+			lx, lE, g, err = self._build()
+			os.makedirs(reg, exist_ok=True)
+			tmp = f'{file}.{os.getpid()}.tmp'
+			with open(tmp, 'wb') as out:
+				np.savez(out, lx=lx, lE=lE, g=g, err=err)
+			os.replace(tmp, file)
+		self.err = err
+		self._spline = RectBivariateSpline(lx, lE, g)
+
+	def _sample(self, lx, lE):
+		'''Returns the smooth logarithmic part of the production spectrum on logit x and log E axes.'''
+		x, E = np.broadcast_arrays(1 / (1 + np.exp(- lx)), np.exp(lE))
+		M = sp.m[sp.PROTON]
+		s = 2 * (E * M + M**2)
+		with catch_warnings():
+			simplefilter('ignore')
+			conv = cr.charmed_hadron_fragmentation_convolution(x, E, self.h, self.N, o=self.o)
+			a = cr.charm_quark_parameters(E, self.o)[0]
+		return np.log(conv / (a * cr.cached_inelastic_hadron_proton_scattering(s, 'p')))
+
+	def _build(self, Kx = 33, KE = 17, K = 1025):
+		'''Returns axes, samples and achieved error of a grid doubled until the tolerance is met.'''
+		while True:
+			lx = np.linspace(np.log(self.X[0] / (1 - self.X[0])), np.log(self.X[1] / (1 - self.X[1])), Kx)
+			lE = np.linspace(np.log(self.Y[0]), np.log(self.Y[1]), KE)
+			g = self._sample(lx[:, None], lE[None, :])
+			spl = RectBivariateSpline(lx, lE, g)
+			mx = (lx[1:] + lx[:-1]) / 2
+			mE = (lE[1:] + lE[:-1]) / 2
+			err = 0.0
+			for cx, cE in [(mx, mE), (mx, lE), (lx, mE)]:
+				dev = spl(cx, cE) - self._sample(cx[:, None], cE[None, :])
+				err = max(err, np.max(np.abs(np.nan_to_num(np.expm1(dev), nan=np.inf))))
+			if err <= self.tol:
+				return lx, lE, g, err
+			if Kx >= K:
+				warn(f'`{self.h}` table reached {Kx} x {KE} nodes with relative error {err:.2e} above {self.tol:.2e}')
+				return lx, lE, g, err
+			Kx = 2 * Kx - 1
+			KE = 2 * KE - 1
+
+	def __call__(self, x, E):
+		'''
+		Returns the tabulated production spectrum.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+
+		Returns
+		-------
+		ndarray
+			The proton-proton to charmed hadron singular production spectrum in 1 / GeV
+		'''
+		x, E = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float))
+		ins = (x >= self.X[0]) & (x <= self.X[1]) & (E >= self.Y[0]) & (E <= self.Y[1])
+		out = np.zeros(x.shape)
+		xi = x[ins]
+		Ei = E[ins]
+		u = cr.charmed_hadron_threshold_factor(xi, Ei, self.h)
+		a = cr.charm_quark_parameters(Ei, self.o)[0]
+		out[ins] = u * a * np.exp(self._spline.ev(np.log(xi / (1 - xi)), np.log(Ei))) / Ei
+		if not np.all(ins):
+			out[~ins] = ds.charmed_hadron_production(x[~ins], E[~ins], self.h, self.N, self.o)
+		return out
+
+
+_tables = {}
+
+
+def tabulated_charmed_hadron_production(x, E, h, N = 100, o = 'good', tol = 1e-4):
+	'''
+	Returns the proton-proton to charmed hadron singular production spectrum from a cached table.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV
+		h : {'d0', 'd+', 'd+s', 'lam+c'} or int
+			The type of hadron produced
+		N : int, optional
+			The number of steps for integration accuracy
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		tol : float, optional
+			The requested relative error bound
+
+		Returns
+		-------
+		ndarray
+			The proton-proton to charmed hadron singular production spectrum in 1 / GeV
+	'''
+	key = (int(sp.code(h, sp.CHARMED)), o.lower(), N, tol)
+	if key not in _tables:
+		_tables[key] = production_table(h, o, N, tol)
+	return _tables[key](x, E)
+
+
+def tabulated_stacked_hadron_production(x, E, h = sp.HADRONS, N = 100, o = 'good', tol = 1e-4):
+	'''
+	Returns the proton-proton to hadron singular production spectra of several species with cached charm tables.
+
+		Parameters
+		----------
+		x : array_like
+			The energy ratio Eh / Ep of produced hadron to incident proton in target rest coordinates
+		E : array_like
+			The projectile energy Ep as viewed from target rest coordinates in GeV, broadcast against `x`
+		h : array_like of int or str, optional
+			The types of hadron produced, stacked along a new leading axis
+		N : int, optional
+			The number of steps for integration accuracy
+		o : {'good', 'bad'}, optional
+			The option to use either good or bad charm quark parameters
+		tol : float, optional
+			The requested relative error bound
+
+		Returns
+		-------
+		ndarray
+			The proton-proton to hadron singular production spectra in 1 / GeV, one for every hadron in `h`
+	'''
+	i = np.atleast_1d(sp.code(h, sp.HADRONS))
+	x, E = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(E, dtype=float))
+	prod = np.empty(i.shape + x.shape)
+	for q, k in enumerate(i):
+		if k in sp.CHARMED:
+			prod[q] = tabulated_charmed_hadron_production(x, E, k, N, o, tol)
+		else:
+			prod[q] = ds.meson_production(x, E, k)
+	return prod
@@ -0,0 +1,354 @@
+'''
+Sparse transfer operators mapping spectra between energy grids.
+
+	Classes
+	-------
+	transfer_operator
+		Collects a kernel with triangular support in sparse form together with its quadrature weights
+
+	convolution_operator
+		Collects a kernel of the energy ratio on uniform logarithmic grids, applied by fast Fourier transform
+
+	Functions
+	---------
+	hadron_production_operator
+		Returns the operator mapping a proton spectrum to the hadron spectrum
+
+	hadron_decay_operator
+		Returns the operator mapping a hadron spectrum to the bin averaged neutrino spectrum
+
+	hadron_production_convolution
+		Returns the convolution mapping a proton spectrum to the hadron spectrum
+
+	hadron_decay_convolution
+		Returns the convolution mapping a hadron spectrum to the bin averaged neutrino spectrum
+
+'''
+import numpy as np
+from scipy.signal import fftconvolve
+from scipy.sparse import csr_matrix
+
+import code.parametrizations.distribution_spectra as ds
+import code.parametrizations.species as sp
+
+
+class transfer_operator:
+	'''
+	Collects a kernel with triangular support in sparse form together with its quadrature weights.
+
+	The kernels of production and decay vanish beyond a kinematic limit, so the nonzero entries of
+	every row form a contiguous tail of columns. Only those entries are evaluated and stored in a
+	compressed sparse row matrix, and the quadrature weights are kept as a vector scaling the input,
+	so that applying the operator costs as many operations as there are nonzero entries. Kernels of
+	several species sharing the support are stacked as blocks of rows of a single matrix.
+
+	Attributes
+	----------
+	K : csr_matrix
+		The kernel evaluated on its support, with the rows of all stacked kernels
+	stack : tuple of int
+		The leading shape of stacked kernels, empty for a single kernel
+	w : ndarray
+		The quadrature weights of the columns
+	shape : tuple of int
+		The number of rows and columns
+	nnz : int
+		The number of stored kernel entries
+
+	Methods
+	-------
+	__init__
+		Evaluates the kernel on its support
+
+	__matmul__
+		Returns the weighted kernel applied to spectra along the first axis
+
+	toarray
+		Returns the weighted kernel as dense matrix
+
+	'''
+
+	def __init__(self, func, start, n, w = None):
+		'''
+		Evaluates the kernel on its support.
+
+		Parameters
+		----------
+		func : callable
+			The kernel of row and column index arrays, evaluated elementwise along the last axis
+		start : array_like of int
+			The first column of nonzero entries for every row
+		n : int
+			The number of columns
+		w : array_like, optional
+			The quadrature weights of the columns, all one if `None`
+		'''
+		start = np.clip(np.asarray(start, dtype=int), 0, n)
+		m = start.size
+		length = n - start
+		indptr = np.concatenate([[0], np.cumsum(length)])
+		j = np.repeat(np.arange(m), length)
+		k = np.arange(indptr[-1]) - np.repeat(indptr[:-1], length) + np.repeat(start, length)
+		data = np.asarray(func(j, k), dtype=float)
+		self.stack = data.shape[:-1]
+		c = int(np.prod(self.stack))
+		indptr = np.concatenate([[0], (indptr[1:] + indptr[-1] * np.arange(c)[:, None]).ravel()])
+		self.K = csr_matrix((data.ravel(), np.tile(k, c), indptr), shape=(c * m, n))
+		self.w = np.ones(n) if w is None else np.asarray(w, dtype=float)
+		self.shape = (m, n)
+		self.nnz = self.K.nnz
+
+	def __matmul__(self, S):
+		'''
+		Returns the weighted kernel applied to spectra along the first axis.
+
+		Parameters
+		----------
+		S : array_like
+			The spectrum on the column grid, with further axes kept as they are
+
+		Returns
+		-------
+		ndarray
+			The spectrum on the row grid, preceded by the axes of stacked kernels
+		'''
+		S = np.asarray(S, dtype=float)
+		out = self.K @ (self.w[:, None] * S.reshape(S.shape[0], -1))
+		return out.reshape(self.stack + (self.shape[0],) + S.shape[1:])
+
+	def toarray(self):
+		'''Returns the weighted kernel as dense matrix, preceded by the axes of stacked kernels.'''
+		return (self.K.toarray() * self.w[None, :]).reshape(self.stack + self.shape)
+
+
+def hadron_production_operator(Eh, Ep, h, w, func = None):
+	'''
+	Returns the operator mapping a proton spectrum to the hadron spectrum.
+
+	Parameters
+	----------
+	Eh : array_like
+		The ascending hadron energy grid in GeV
+	Ep : array_like
+		The ascending proton energy grid in GeV
+	h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}, int or array_like of int
+		The type of hadron produced, or several types stacked along a new leading axis
+	w : array_like
+		The quadrature weights of the proton energy grid in GeV
+	func : callable, optional
+		The production spectrum of energy ratio, proton energy and hadron type, `hadron_production` if `None`
+		or `stacked_hadron_production` for several types
+
+	Returns
+	-------
+	transfer_operator
+		The production kernel restricted to energy ratios `Eh / Ep` below one
+	'''
+	Eh = np.asarray(Eh, dtype=float)
+	Ep = np.asarray(Ep, dtype=float)
+	if func is None:
+		func = ds.hadron_production if np.ndim(sp.code(h, sp.HADRONS)) == 0 else ds.stacked_hadron_production
+	start = np.searchsorted(Ep, Eh, side='right')
+	return transfer_operator(lambda j, k: func(Eh[j] / Ep[k], Ep[k], h), start, Ep.size, w)
+
+
+def hadron_decay_operator(Enu, Eh, h):
+	'''
+	Returns the operator mapping a hadron spectrum to the bin averaged neutrino spectrum.
+
+	Parameters
+	----------
+	Enu : array_like
+		The ascending neutrino energy bin edges in GeV
+	Eh : array_like
+		The ascending hadron energy bin edges in GeV
+	h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or int
+		The type of hadronic initial state observed
+
+	Returns
+	-------
+	transfer_operator
+		The bin averaged decay kernel restricted to hadron bins reaching the neutrino bin, see `decay_bin_average`
+	'''
+	e = np.asarray(Enu, dtype=float)
+	E = np.asarray(Eh, dtype=float)
+	i = sp.code(h, sp.HADRONS)
+	start = np.searchsorted(E[1:], e[:-1] / (1 - sp.l[i]), side='right')
+	return transfer_operator(lambda j, k: ds.decay_bin_average(e[j], e[j + 1], E[k], E[k + 1], i), start, E.size - 1)
+
+
+class convolution_operator:
+	'''
+	Collects a kernel of the energy ratio on uniform logarithmic grids, applied by fast Fourier transform.
+
+	On two logarithmic grids of equal step the ratio of row to column energy only depends on the
+	difference of their indices, so a kernel of the ratio alone is a Toeplitz matrix and acts as a
+	discrete convolution in log energy. A residual dependence on the column energy is handled by
+	sampling the kernel at `B` band centres, evenly spaced in log energy, and blending neighbouring
+	bands with linear hat functions. Each band costs one convolution of O(n log n) operations.
+	Spectra spanning many decades are tilted by a power of the energy, the median logarithmic slope
+	of the input, before the transform and tilted back afterwards, which keeps the round off of the transform
+	relative to each output value instead of the largest one.
+
+	Attributes
+	----------
+	k : ndarray
+		The kernel of every band at all index differences from `1 - n` to `m - 1`, with stacked kernels in between
+	phi : ndarray
+		The hat functions of every band on the column grid
+	w : ndarray
+		The quadrature weights of the columns
+	shape : tuple of int
+		The number of rows and columns
+	B : int
+		The number of energy bands
+
+	Methods
+	-------
+	__init__
+		Samples the kernel at all energy ratios and band centres
+
+	__matmul__
+		Returns the weighted kernel applied to spectra along the first axis
+
+	toarray
+		Returns the weighted kernel as dense matrix
+
+	'''
+
+	def __init__(self, func, Ea, Eb, w = None, B = 1, lim = np.inf):
+		'''
+		Samples the kernel at all energy ratios and band centres.
+
+		Parameters
+		----------
+		func : callable
+			The kernel of energy ratio `Ea / Eb` and column energy `Eb`, evaluated elementwise along the last axis
+		Ea : array_like
+			The uniform logarithmic row energy grid in GeV
+		Eb : array_like
+			The uniform logarithmic column energy grid in GeV, with the same step as `Ea`
+		w : array_like, optional
+			The quadrature weights of the columns, all one if `None`
+		B : int, optional
+			The number of energy bands sampling the column energy dependence
+		lim : float, optional
+			The energy ratio at and beyond which the kernel vanishes
+
+		Raises
+		------
+		ValueError
+			If the grids are not logarithmic with a shared step
+		'''
+		la = np.log(np.asarray(Ea, dtype=float))
+		lb = np.log(np.asarray(Eb, dtype=float))
+		m = la.size
+		n = lb.size
+		step = (lb[-1] - lb[0]) / (n - 1)
+		for l in (la, lb):
+			if l.size > 1 and not np.allclose(np.diff(l), step, rtol=1e-6, atol=0.0):
+				raise ValueError(f'grids are not logarithmic with shared step {np.exp(step):.6g}')
+		x = np.exp(la[0] - lb[0] + step * np.arange(1 - n, m))
+		c = np.linspace(lb[0], lb[-1], B) if B > 1 else np.array([(lb[0] + lb[-1]) / 2])
+		self.phi = np.array([np.interp(lb, c, np.eye(B)[b]) for b in range(B)])
+		ins = x < lim
+		k = [np.asarray(func(x[ins], np.exp(c[b])), dtype=float) for b in range(B)]
+		self.k = np.zeros((B,) + k[0].shape[:-1] + x.shape)
+		self.k[..., ins] = k
+		self.w = np.ones(n) if w is None else np.asarray(w, dtype=float)
+		self.shape = (m, n)
+		self.B = B
+		self._x = x
+		self._la = la
+		self._lb = lb
+
+	def __matmul__(self, S):
+		'''
+		Returns the weighted kernel applied to spectra along the first axis.
+
+		Parameters
+		----------
+		S : array_like
+			The spectrum on the column grid, with further axes kept as they are
+
+		Returns
+		-------
+		ndarray
+			The spectrum on the row grid, preceded by the axes of stacked kernels
+		'''
+		S = np.asarray(S, dtype=float)
+		m, n = self.shape
+		tail = (1,) * (S.ndim - 1)
+		stack = self.k.shape[1:-1]
+		v = np.abs(self.w * S.reshape(n, -1).sum(axis=1))
+		with np.errstate(divide='ignore', invalid='ignore'):
+			slope = np.diff(np.log(v)) / np.diff(self._lb)
+		slope = slope[np.isfinite(slope)]
+		g = 0.0 if slope.size == 0 else - np.median(slope)
+		k = self.k * self._x**g
+		u = (self.phi * self.w * np.exp(g * self._lb)).reshape((self.B,) + (1,) * len(stack) + (n,) + tail) * S
+		full = fftconvolve(k.reshape(k.shape + tail), u, axes=1 + len(stack))
+		lag = (slice(None),) * (1 + len(stack)) + (slice(n - 1, n - 1 + m),)
+		return full[lag].sum(axis=0) * np.exp(- g * self._la).reshape((m,) + tail)
+
+	def toarray(self):
+		'''Returns the weighted kernel as dense matrix, preceded by the axes of stacked kernels.'''
+		m, n = self.shape
+		d = np.arange(m)[:, None] - np.arange(n)[None, :] + n - 1
+		return np.einsum('b...jk,bk->...jk', self.k[..., d], self.phi) * self.w
+
+
+def hadron_production_convolution(Eh, Ep, h, w, func = None, B = 16):
+	'''
+	Returns the convolution mapping a proton spectrum to the hadron spectrum.
+
+	Parameters
+	----------
+	Eh : array_like
+		The uniform logarithmic hadron energy grid in GeV
+	Ep : array_like
+		The uniform logarithmic proton energy grid in GeV, with the same step as `Eh`
+	h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'}, int or array_like of int
+		The type of hadron produced, or several types stacked along a new leading axis
+	w : array_like
+		The quadrature weights of the proton energy grid in GeV
+	func : callable, optional
+		The production spectrum of energy ratio, proton energy and hadron type, `hadron_production` if `None`
+		or `stacked_hadron_production` for several types
+	B : int, optional
+		The number of proton energy bands
+
+	Returns
+	-------
+	convolution_operator
+		The production kernel `Ep * func` blended between bands, with `1 / Ep` moved into the weights
+	'''
+	Ep = np.asarray(Ep, dtype=float)
+	if func is None:
+		func = ds.hadron_production if np.ndim(sp.code(h, sp.HADRONS)) == 0 else ds.stacked_hadron_production
+	return convolution_operator(lambda x, E: E * func(x, E, h), Eh, Ep, np.asarray(w, dtype=float) / Ep, B, 1.0)
+
+
+def hadron_decay_convolution(Enu, Eh, h):
+	'''
+	Returns the convolution mapping a hadron spectrum to the bin averaged neutrino spectrum.
+
+	Parameters
+	----------
+	Enu : array_like
+		The uniform logarithmic neutrino energy bin edges in GeV
+	Eh : array_like
+		The uniform logarithmic hadron energy bin edges in GeV, with the same step as `Enu`
+	h : {'pi', 'k', 'd0', 'd+', 'd+s', 'lam+c'} or int
+		The type of hadronic initial state observed
+
+	Returns
+	-------
+	convolution_operator
+		The bin averaged decay kernel, exact since it only depends on the ratio of bin edges, see `decay_bin_average`
+	'''
+	e = np.asarray(Enu, dtype=float)
+	E = np.asarray(Eh, dtype=float)
+	r = np.sqrt(E[1] / E[0])
+	i = sp.code(h, sp.HADRONS)
+	return convolution_operator(lambda x, E: ds.decay_bin_average(x / r, x * r, 1 / r, r, i), np.sqrt(e[1:] * e[:-1]), np.sqrt(E[1:] * E[:-1]))
@@ -1,4 +1,7 @@
-#import code.evaluate
-#import code.magnetar
-#import code.nucleus
+import runpy
+
+#import code.benchmark
+import code.evaluate
+runpy.run_module('code.magnetar', run_name='__main__')
+import code.nucleus
 import code.graphics